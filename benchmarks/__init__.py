@@ -0,0 +1,15 @@
+"""
+Headless performance benchmarks.  Run from the top of the repository:
+
+    python -m benchmarks                      # run every scenario
+    python -m benchmarks idle stomp           # run some of them
+    python -m benchmarks --save-baseline      # store the results as the baseline
+
+Importing this package switches SDL to its dummy video and audio drivers,
+so it must be imported before anything from data.
+"""
+
+import os
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
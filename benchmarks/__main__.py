@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+from . import runner, scenarios
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Headless gameplay benchmarks')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run (default: all of {})'.format(
+                            ', '.join(scenarios.SCENARIOS)))
+    parser.add_argument('--frames', type=int, default=None,
+                        help='frames per scenario (default: per scenario)')
+    parser.add_argument('--map', default=None,
+                        help='run on this tmx file instead of level1')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline json to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results in the baseline file')
+    parser.add_argument('--tolerance', type=float, default=runner.DEFAULT_TOLERANCE,
+                        help='allowed relative regression (default: %(default)s)')
+    parser.add_argument('--json', metavar='FILE', default=None,
+                        help='also write the raw results to a json file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = args.scenarios or list(scenarios.SCENARIOS)
+    for name in names:
+        if name not in scenarios.SCENARIOS:
+            sys.exit('Unknown scenario: {}'.format(name))
+
+    results = runner.run(names, args.frames, args.map)
+    print(runner.format_results(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        runner.save_baseline(args.baseline, results)
+        print('Saved baseline to {}'.format(args.baseline))
+        return
+
+    baseline = runner.load_baseline(args.baseline)
+    if baseline is None:
+        print('No baseline at {}, run with --save-baseline to create one.'.format(args.baseline))
+        return
+    rows, regressed = runner.compare(results, baseline, args.tolerance)
+    print('')
+    print(runner.format_comparison(rows))
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+"""
+Render equivalence checks.  Plays the same deterministic input through
+the reference renderer and one or more alternatives, captures the screen
+at chosen frames and compares the captures pixel by pixel, timing the
+draw phase of each renderer as it goes:
+
+    python -m benchmarks.golden                        # every alternative
+    python -m benchmarks.golden camera --capture 1,120,450 --scenario stomp
+    python -m benchmarks.golden --replay run.rec --save frames/
+    python -m benchmarks.golden rescale --render-scale 0.5
+    python -m benchmarks.golden --against $(git rev-list --max-parents=0 HEAD)
+
+An alternative is a function taking the booted Control and swapping in
+its rendering path, usually by replacing the level's draw_level.  Add new
+ones to RENDERERS, with any environment the game needs to start with for
+them in ENVIRONMENTS.  The frame captured is the one presented to the
+window, after any scaling.  Only the renderers in SCALED draw at the
+--render-scale; the others are checked at render scale 1.
+
+The reference is the current tree's own renderer, so on its own this only
+catches regressions against the current look.  --against REV plays the
+reference's input through level1 in REV, exported from git, see
+revision.py, and compares the frames it shows with the reference's, to
+catch changes in behaviour or rendering since REV.  Only scenarios that
+start level1 as it loads can be played there, and the player is never
+put back on the ground, as REV can't do the same.
+"""
+
+from __future__ import division
+import argparse
+import multiprocessing
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+from collections import OrderedDict
+from . import runner, scenarios
+
+DEFAULT_CAPTURES = (1, 60, 240, 599)
+
+
+def draw_with_camera_offset(level, surface):
+    """
+    Draw every sprite straight to the screen, offset by the viewport,
+    without culling or batching.
+    """
+    from data import perf
+
+    with perf.phase('draw'):
+        viewport = level.viewport
+        offset = -viewport.x, -viewport.y
+        blit = surface.blit
+        blit(level.map_image, (0, 0), viewport)
+        for sprite in level.dead_enemy_group1:
+            blit(sprite.image, sprite.rect.move(offset))
+        blit(level.player.image, level.player.rect.move(offset))
+        for group in (level.dead_enemy_group2, level.sprites, level.stars, level.item_boxes):
+            for sprite in group:
+                blit(sprite.image, sprite.rect.move(offset))
+
+
+def use_camera_offset(control):
+    control.state.draw_level = types.MethodType(draw_with_camera_offset, control.state)
+
+
+def draw_rescaled(level, surface):
+    """
+    Draw the view at the render scale, scaling the whole map and every
+    sprite again each frame rather than keeping scaled copies.
+    """
+    import pygame as pg
+    from data import perf, quality, setup
+
+    with perf.phase('draw'):
+        display = setup.DISPLAY
+        scale = quality.SETTINGS['render scale']
+        target = display.low_res(scale)
+        level.render_view()
+        width, height = level.map_image.get_size()
+        map_image = display.scale(level.map_image, (int(width * scale), int(height * scale)))
+        x = int(level.viewport.x * scale)
+        y = int(level.viewport.y * scale)
+        target.blit(map_image, (0, 0), pg.Rect((x, y), target.get_size()))
+        for image, rect in level.visible_sprites():
+            width, height = image.get_size()
+            size = max(1, int(width * scale)), max(1, int(height * scale))
+            target.blit(display.scale(image, size),
+                        (int(rect.x * scale) - x, int(rect.y * scale) - y))
+
+
+def use_rescaled(control):
+    control.state.draw_level = types.MethodType(draw_rescaled, control.state)
+
+
+def use_textures(control):
+    """
+    Check the level composited by the SDL2 software renderer.
+    """
+    from data import setup, textures
+
+    if not setup.DISPLAY.textured:
+        raise RuntimeError(textures.UNAVAILABLE)
+    setup.DISPLAY.keep_frames = True
+
+
+def textures_available():
+    from data import textures
+
+    return textures.AVAILABLE
+
+
+RENDERERS = OrderedDict([('reference', None),
+                         ('camera', use_camera_offset),
+                         ('rescale', use_rescaled),
+                         ('texture', use_textures)])
+ENVIRONMENTS = {'texture': {'BOUNCY_RENDERER': 'software'}}
+SCALED = ('rescale',)
+
+
+class FrameCapture(object):
+    """
+    Wraps an input source (a scenarios.ScriptedInput or replay.Replay),
+    grabbing the frame the display presented on each wanted frame, and
+    keeping each frame's input as (events, held keys, ticks).  Frames are
+    counted from 1; a frame's capture is taken when the next frame's input
+    is read, or at the end of the run.
+    """
+    def __init__(self, source, display, frames):
+        self.source = source
+        self.display = display
+        self.size = None
+        self.wanted = set(frames)
+        self.frame = 0
+        self.captures = {}
+        self.inputs = []
+
+    @property
+    def finished(self):
+        return self.source.finished
+
+    def capture(self):
+        import pygame as pg
+
+        if self.frame in self.wanted:
+            if self.display.textured:
+                frame = self.display.last_frame
+            else:
+                frame = self.display.window
+            self.size = frame.get_size()
+            self.captures[self.frame] = pg.image.tostring(frame, 'RGB')
+
+    def next_frame(self):
+        from data import replay
+
+        self.capture()
+        self.frame += 1
+        events, keys, ticks = self.source.next_frame()
+        self.inputs.append(([(event.type, event.key) for event in events],
+                            replay.pressed_keys(keys), ticks))
+        return events, keys, ticks
+
+
+def capture_frames(renderer, frames, captures, scenario_name='run', replay_path=None,
+                   map_path=None, render_scale=1, respawn=True):
+    """
+    Run one renderer and return its captures, draw timings and input.
+    Meant to be run in its own process, see run().
+    """
+    os.environ.update(ENVIRONMENTS.get(renderer, {}))
+    from data import setup, perf, quality, replay
+
+    if renderer in SCALED or renderer == 'reference':
+        quality.SETTINGS['render scale'] = render_scale
+
+    scenario = scenarios.SCENARIOS[scenario_name]
+    if replay_path:
+        source = replay.Replay(replay_path)
+        control, level_name = runner.start_control(map_path, start_state=source.start_state)
+    else:
+        control, level_name = runner.start_control(map_path, scenario.map_options)
+        if scenario.setup:
+            scenario.setup(control.state)
+        source = scenarios.ScriptedInput(control, scenario.policy, frames,
+                                         respawn=respawn and scenario.finish)
+    if RENDERERS[renderer]:
+        RENDERERS[renderer](control)
+
+    control.replay = capture = FrameCapture(source, setup.DISPLAY, captures)
+    control.max_frames = frames
+    perf.PROFILER.size = frames
+    perf.PROFILER.reset()
+    perf.PROFILER.enabled = True
+    control.main()
+    capture.capture()
+
+    stats = dict((name, (average, p99)) for name, average, p99, worst
+                 in perf.PROFILER.stats())
+    return {'captures': capture.captures,
+            'frames': capture.frame,
+            'size': capture.size or setup.SCREEN.get_size(),
+            'draw': stats.get('draw', (0.0, 0.0)),
+            'frame': stats['frame'],
+            'inputs': capture.inputs}
+
+
+def compare_frames(reference, other, tolerance=0):
+    """
+    Compare two RGB strings.  Returns (pixels differing by more than
+    tolerance in any channel, the largest channel difference).
+    """
+    if reference == other:
+        return 0, 0
+    reference = bytearray(reference)
+    other = bytearray(other)
+    different = 0
+    largest = 0
+    for i in range(0, len(reference), 3):
+        difference = max(abs(reference[i] - other[i]),
+                         abs(reference[i + 1] - other[i + 1]),
+                         abs(reference[i + 2] - other[i + 2]))
+        if difference > tolerance:
+            different += 1
+        if difference > largest:
+            largest = difference
+    return different, largest
+
+
+def save_frame(path, data, size):
+    import pygame as pg
+
+    pg.image.save(pg.image.fromstring(data, size, 'RGB'), path)
+
+
+def run(renderers, frames, captures, scenario_name='run', replay_path=None, map_path=None,
+        render_scale=1, respawn=True):
+    """
+    Run the reference and each alternative in a fresh process and return
+    {renderer: result}.
+    """
+    results = OrderedDict()
+    for renderer in ['reference'] + [name for name in renderers if name != 'reference']:
+        pool = multiprocessing.Pool(1, maxtasksperchild=1)
+        try:
+            results[renderer] = pool.apply(capture_frames, (renderer, frames, captures,
+                                                            scenario_name, replay_path,
+                                                            map_path, render_scale, respawn))
+        finally:
+            pool.close()
+            pool.join()
+    return results
+
+
+def run_revision(revision, inputs, frames, captures, seed=0):
+    """
+    Play inputs through level1 in revision, exported from git to a
+    temporary directory, and return its captures like capture_frames.
+    """
+    top = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    directory = tempfile.mkdtemp()
+    try:
+        archive = subprocess.Popen(['git', 'archive', revision], cwd=top,
+                                   stdout=subprocess.PIPE)
+        subprocess.check_call(['tar', '-x', '-C', directory], stdin=archive.stdout)
+        archive.stdout.close()
+        if archive.wait():
+            raise RuntimeError('git archive {} failed'.format(revision))
+        job = os.path.join(directory, 'golden-job.pickle')
+        output = os.path.join(directory, 'golden-captures.pickle')
+        with open(job, 'wb') as f:
+            pickle.dump({'inputs': inputs, 'frames': frames, 'captures': captures,
+                         'seed': seed}, f, pickle.HIGHEST_PROTOCOL)
+        subprocess.check_call([sys.executable, os.path.join(top, 'benchmarks', 'revision.py'),
+                               job, output], cwd=directory)
+        with open(output, 'rb') as f:
+            result = pickle.load(f)
+    finally:
+        shutil.rmtree(directory)
+    result.update({'draw': (0.0, 0.0), 'frame': (0.0, 0.0)})
+    return result
+
+
+def report(results, tolerance=0, max_pixels=0, save_dir=None):
+    """
+    Return the report lines and whether every alternative matched.
+    """
+    reference = results['reference']
+    lines = ['{:<12}{:>8}{:>12}{:>12}{:>12}{:>12}'.format(
+        'renderer', 'frames', 'draw ms', 'draw p99', 'frame ms', 'vs ref')]
+    matched = True
+    mismatches = []
+    for name, result in results.items():
+        draw_average, draw_p99 = result['draw']
+        speedup = reference['draw'][0] / draw_average if draw_average else 0.0
+        lines.append('{:<12}{:>8}{:>12.3f}{:>12.3f}{:>12.3f}{:>11.2f}x'.format(
+            name, result['frames'], draw_average, draw_p99, result['frame'][0], speedup))
+        if name == 'reference':
+            continue
+        for frame in sorted(reference['captures']):
+            if frame not in result['captures']:
+                mismatches.append('{} frame {}: not captured'.format(name, frame))
+                matched = False
+                continue
+            different, largest = compare_frames(reference['captures'][frame],
+                                                result['captures'][frame], tolerance)
+            if different > max_pixels:
+                matched = False
+                mismatches.append('{} frame {}: {} pixels differ (largest difference {})'.format(
+                    name, frame, different, largest))
+
+    if save_dir:
+        if not os.path.isdir(save_dir):
+            os.makedirs(save_dir)
+        for name, result in results.items():
+            for frame, data in result['captures'].items():
+                path = os.path.join(save_dir, '{}-{:05d}.png'.format(name, frame))
+                save_frame(path, data, result['size'])
+
+    lines.append('')
+    if len(results) > 1:
+        lines.extend(mismatches or ['All {} captured frames match.'.format(
+            len(reference['captures']))])
+    return lines, matched
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.golden',
+                                     description='Compare renderers frame by frame')
+    parser.add_argument('renderers', nargs='*', metavar='renderer',
+                        help='alternatives to check (default: all of {})'.format(
+                            ', '.join(name for name in RENDERERS if name != 'reference')))
+    parser.add_argument('--scenario', default='run', choices=list(scenarios.SCENARIOS),
+                        help='input script to play (default: %(default)s)')
+    parser.add_argument('--replay', default=None, help='play a recording instead')
+    parser.add_argument('--map', default=None, help='run on this tmx file')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--capture', default=','.join(str(f) for f in DEFAULT_CAPTURES),
+                        help='frames to compare (default: %(default)s)')
+    parser.add_argument('--tolerance', type=int, default=0,
+                        help='allowed difference per colour channel')
+    parser.add_argument('--max-pixels', type=int, default=0,
+                        help='pixels per frame allowed to exceed the tolerance')
+    parser.add_argument('--render-scale', type=float, default=1, choices=(1, 0.75, 0.5),
+                        help='draw the reference and the renderers in {} at this scale'.format(
+                            ', '.join(SCALED)))
+    parser.add_argument('--save', metavar='DIR', default=None,
+                        help='write the captured frames as png files')
+    parser.add_argument('--against', metavar='REV', default=None,
+                        help='compare the reference with level1 played in this git revision')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    renderers = args.renderers
+    if args.against:
+        scenario = scenarios.SCENARIOS[args.scenario]
+        if args.map or scenario.map_options:
+            sys.exit('--against only plays level1')
+        if args.replay:
+            from data import replay
+
+            if replay.Replay(args.replay).start_state != 'level1':
+                sys.exit('--against only plays recordings started on level1')
+        elif scenario.setup:
+            sys.exit('--against can only play scenarios without a setup, such as run or idle')
+        if args.render_scale != 1:
+            sys.exit('--against only compares at render scale 1')
+    elif not renderers:
+        renderers = [name for name in RENDERERS if name != 'reference']
+        if args.render_scale != 1:
+            renderers = [name for name in renderers if name in SCALED]
+        if 'texture' in renderers and not textures_available():
+            print('Skipping texture: pygame has no SDL2 renderer.')
+            renderers.remove('texture')
+    for name in renderers:
+        if name not in RENDERERS:
+            sys.exit('Unknown renderer: {}'.format(name))
+        if args.render_scale != 1 and name not in SCALED:
+            sys.exit('{} only draws at render scale 1'.format(name))
+    captures = [int(frame) for frame in args.capture.split(',') if frame]
+
+    results = run(renderers, args.frames, captures, args.scenario, args.replay, args.map,
+                  args.render_scale, respawn=not args.against)
+    if args.against:
+        reference = results['reference']
+        results[args.against] = run_revision(args.against, reference['inputs'],
+                                             reference['frames'], captures)
+    lines, matched = report(results, args.tolerance, args.max_pixels, args.save)
+    print('\n'.join(lines))
+    if not matched:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
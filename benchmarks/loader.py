@@ -0,0 +1,324 @@
+"""
+Micro-benchmarks for the pytmx loader.  Each synthetic map in a matrix of
+formats, sizes, tileset counts and unique tile counts is loaded with
+pytmx.load_pygame, timing each stage on its own:
+
+    python -m benchmarks.loader
+    python -m benchmarks.loader --formats csv,zlib --sizes 400x120 --repeat 5
+    python -m benchmarks.loader --save-baseline     # then compare later runs
+
+Stages are timed by temporarily wrapping the functions that do the work,
+and each stage excludes the time spent in the stages it calls (so
+'layer decode' doesn't include 'register_gid').  The wrappers add a little
+per-call overhead, mostly to register_gid, so 'total' comes from separate
+unwrapped loads, which also use the loader's thread pool.
+"""
+
+from __future__ import division
+import argparse
+import gc
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from collections import OrderedDict
+from . import mapgen, runner
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'loader_baseline.json')
+
+# format name: (encoding, compression)
+FORMATS = OrderedDict([('xml', ('xml', None)),
+                       ('csv', ('csv', None)),
+                       ('base64', ('base64', None)),
+                       ('zlib', ('base64', 'zlib')),
+                       ('gzip', ('base64', 'gzip'))])
+
+STAGES = ['xml parse', 'layer decode', 'register_gid', 'tileset parse',
+          'object parse', 'image load', 'slice images', 'smart_convert', 'other']
+
+# the space background sheet has 22x17 tiles, all of them opaque
+TILESET_IMAGE = 'spacebackground.png'
+TILESET_COLUMNS = 22
+TILES_PER_TILESET = 22 * 17
+
+
+class StageTimer(object):
+    """
+    Times calls to functions patched with wrap().  Nested stages are
+    subtracted from the stage that called them.
+    """
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.stack = []
+        self.patches = []
+
+    def wrap(self, owner, attribute, stage):
+        original = owner.__dict__[attribute]
+        timer = self
+
+        def timed(*args, **kwargs):
+            frame = [timeit.default_timer(), 0.0]
+            timer.stack.append(frame)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer.stack.pop()
+                elapsed = timeit.default_timer() - frame[0]
+                timer.totals[stage] += elapsed - frame[1]
+                if timer.stack:
+                    timer.stack[-1][1] += elapsed
+
+        setattr(owner, attribute, timed)
+        self.patches.append((owner, attribute, original))
+
+    def wrap_iterator(self, owner, attribute, stage):
+        """
+        Wrap a function returning an iterator, timing each step of the
+        iterator, for parsers that do their work as they are iterated.
+        """
+        original = owner.__dict__[attribute]
+        timer = self
+
+        def timed_steps(iterator):
+            while True:
+                frame = [timeit.default_timer(), 0.0]
+                timer.stack.append(frame)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    timer.stack.pop()
+                    elapsed = timeit.default_timer() - frame[0]
+                    timer.totals[stage] += elapsed - frame[1]
+                    if timer.stack:
+                        timer.stack[-1][1] += elapsed
+                yield item
+
+        def timed(*args, **kwargs):
+            return timed_steps(iter(original(*args, **kwargs)))
+
+        setattr(owner, attribute, timed)
+        self.patches.append((owner, attribute, original))
+
+    def restore(self):
+        for owner, attribute, original in reversed(self.patches):
+            setattr(owner, attribute, original)
+        self.patches = []
+
+
+def instrument(timer):
+    import pygame as pg
+    from pytmx import pytmx, tmxloader
+
+    timer.wrap_iterator(pytmx.ElementTree, 'iterparse', 'xml parse')
+    timer.wrap(pytmx.TiledLayer, 'parse', 'layer decode')
+    timer.wrap(pytmx.TiledMap, 'register_gid', 'register_gid')
+    timer.wrap(pytmx.TiledTileset, 'parse', 'tileset parse')
+    timer.wrap(pytmx.TiledObjectGroup, 'add_object', 'object parse')
+    timer.wrap(pg.image, 'load', 'image load')
+    timer.wrap(tmxloader, '_load_images_pygame', 'slice images')
+    timer.wrap(tmxloader, 'smart_convert', 'smart_convert')
+    timer.wrap(pytmx.TiledMap, 'load', 'other')
+
+
+def write_map(path, width, height, tilesets, unique_tiles, format_name, layers=2):
+    """
+    Write a map whose layers cycle through unique_tiles gids spread evenly
+    over the given number of copies of the space background tileset.
+    """
+    encoding, compression = FORMATS[format_name]
+    if unique_tiles > tilesets * TILES_PER_TILESET:
+        raise ValueError('{} tilesets only hold {} tiles'.format(
+            tilesets, tilesets * TILES_PER_TILESET))
+
+    per_tileset = -(-unique_tiles // tilesets)
+    gids = [1 + (i // per_tileset) * TILES_PER_TILESET + i % per_tileset
+            for i in range(unique_tiles)]
+    directory = os.path.dirname(os.path.abspath(path))
+    source = os.path.relpath(os.path.abspath(os.path.join(mapgen.GRAPHICS, TILESET_IMAGE)),
+                             directory).replace(os.sep, '/')
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<map version="1.0" orientation="orthogonal" width="{}" height="{}" '
+             'tilewidth="{}" tileheight="{}">'.format(width, height, mapgen.TILE_SIZE,
+                                                      mapgen.TILE_SIZE)]
+    for i in range(tilesets):
+        lines.append(' <tileset firstgid="{}" name="tileset{}" tilewidth="{}" '
+                     'tileheight="{}">'.format(1 + i * TILES_PER_TILESET, i,
+                                               mapgen.TILE_SIZE, mapgen.TILE_SIZE))
+        lines.append('  <image source="{}" width="1600" height="1200"/>'.format(source))
+        lines.append(' </tileset>')
+    for layer in range(layers):
+        data = [gids[(i * 7 + layer) % unique_tiles] for i in range(width * height)]
+        lines.append(' <layer name="Layer {}" width="{}" height="{}">'.format(
+            layer, width, height))
+        lines.extend(mapgen.encode_layer(data, width, encoding, compression))
+        lines.append(' </layer>')
+    lines.append(' <objectgroup name="Objects">')
+    for i in range(width // 2):
+        lines.append('  <object name="blocker" gid="{}" x="{}" y="{}"/>'.format(
+            gids[i % unique_tiles], i * 2 * mapgen.TILE_SIZE, height * mapgen.TILE_SIZE))
+    lines.append(' </objectgroup>')
+    lines.append('</map>')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def time_load(path, repeat):
+    """
+    Return {stage: ms} for loading path, the best of repeat loads per stage.
+    """
+    import pytmx
+
+    best = {}
+    for i in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        pytmx.load_pygame(path, pixelalpha=True)
+        total = timeit.default_timer() - start
+        best['total'] = min(best.get('total', total), total)
+
+        gc.collect()
+        timer = StageTimer()
+        instrument(timer)
+        try:
+            # the timer's stack is per thread, so time stages on one
+            pytmx.load_pygame(path, pixelalpha=True, workers=1)
+        finally:
+            timer.restore()
+        for stage, seconds in timer.totals.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    return dict((stage, 1000 * seconds) for stage, seconds in best.items())
+
+
+def case_name(format_name, size, tilesets, unique_tiles):
+    return '{} {}x{} t{} u{}'.format(format_name, size[0], size[1], tilesets, unique_tiles)
+
+
+def run(formats, sizes, tileset_counts, unique_counts, repeat=3):
+    """
+    Time every combination that fits and return {case: {stage: ms}}.
+    """
+    import pygame as pg
+
+    pg.display.init()
+    pg.display.set_mode((1, 1), 0, 32)
+
+    results = OrderedDict()
+    directory = tempfile.mkdtemp()
+    try:
+        for size, tilesets, unique_tiles, format_name in itertools.product(
+                sizes, tileset_counts, unique_counts, formats):
+            if unique_tiles > tilesets * TILES_PER_TILESET:
+                continue
+            name = case_name(format_name, size, tilesets, unique_tiles)
+            path = os.path.join(directory, name.replace(' ', '_') + '.tmx')
+            write_map(path, size[0], size[1], tilesets, unique_tiles, format_name)
+            results[name] = time_load(path, repeat)
+            print('{:<28}{:>10.1f} ms'.format(name, results[name]['total']))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def format_results(results):
+    columns = STAGES + ['total']
+    width = max([len('case')] + [len(name) for name in results]) + 1
+    lines = [('{:<%d}' % width).format('case') +
+             ''.join('{:>14}'.format(stage) for stage in columns)]
+    for name, stages in results.items():
+        lines.append(('{:<%d}' % width).format(name) +
+                     ''.join('{:>14.2f}'.format(stages[stage]) for stage in columns))
+    return '\n'.join(lines)
+
+
+def compare(results, baseline, tolerance=runner.DEFAULT_TOLERANCE):
+    """
+    Compare stage times with a baseline, returning rows for
+    runner.format_comparison and whether anything regressed.
+    """
+    rows = []
+    regressed = False
+    for name, stages in results.items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            rows.append((name, '-', None, None, None, 'no baseline'))
+            continue
+        for stage in STAGES + ['total']:
+            previous, current = base.get(stage), stages[stage]
+            if previous is None:
+                continue
+            change = (current - previous) / previous if previous else 0.0
+            bad = runner.is_regression('phase:' + stage, current, previous, tolerance)
+            regressed = regressed or bad
+            rows.append((name, stage, previous, current, change,
+                         'REGRESSED' if bad else 'ok'))
+    return rows, regressed
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def parse_list(text, convert=str):
+    return [convert(item) for item in text.split(',') if item]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loader',
+                                     description='pytmx loader micro-benchmarks')
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help='comma separated, from: {}'.format(', '.join(FORMATS)))
+    parser.add_argument('--sizes', default='100x30,400x120',
+                        help='map sizes in tiles (default: %(default)s)')
+    parser.add_argument('--tilesets', default='1,4',
+                        help='tileset counts (default: %(default)s)')
+    parser.add_argument('--unique', default='16,256',
+                        help='unique tile counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='loads per case, the best is kept (default: %(default)s)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline json to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results in the baseline file')
+    parser.add_argument('--tolerance', type=float, default=runner.DEFAULT_TOLERANCE,
+                        help='allowed relative regression (default: %(default)s)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    formats = parse_list(args.formats)
+    for format_name in formats:
+        if format_name not in FORMATS:
+            sys.exit('Unknown format: {}'.format(format_name))
+
+    results = run(formats, parse_list(args.sizes, parse_size),
+                  parse_list(args.tilesets, int), parse_list(args.unique, int),
+                  args.repeat)
+    print('')
+    print(format_results(results))
+
+    if args.save_baseline:
+        runner.save_baseline(args.baseline, results)
+        print('Saved baseline to {}'.format(args.baseline))
+        return
+
+    baseline = runner.load_baseline(args.baseline)
+    if baseline is None:
+        print('No baseline at {}, run with --save-baseline to create one.'.format(args.baseline))
+        return
+    rows, regressed = compare(results, baseline, args.tolerance)
+    print('')
+    print(runner.format_comparison(rows))
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
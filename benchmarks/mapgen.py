@@ -0,0 +1,333 @@
+"""
+Procedural stress maps.  Writes TMX files with the same tilesets and
+object conventions as resources/tmx/level1.tmx, so Level can load them:
+
+    python -m benchmarks.mapgen big.tmx --width 1020 --height 30 --enemies 80
+
+Tile layers are the space background first, then any extra layers (full
+layers of background tiles, to add overdraw), then the terrain.  Objects
+are placed the way Tiled stores tile objects, with y at the bottom of
+the tile.
+
+With --chunk-size the map is written as an infinite map, its layers in
+square chunks the way Tiled stores them, leaving out chunks without tiles.
+"""
+
+from __future__ import division
+import argparse
+import base64
+import gzip
+import io
+import os
+import random
+import struct
+import zlib
+
+TILE_SIZE = 70
+GRAPHICS = os.path.join('resources', 'graphics')
+
+# (name, firstgid, image, image width, image height)
+TILESETS = [('spritesheet1', 1, 'spritesheet1.png', 910, 910),
+            ('spacebackground', 170, 'spacebackground.png', 1600, 1200)]
+
+BACKGROUND = [(192, 193, 194), (214, 215, 216)]
+GROUND_LEFT = 144
+GROUND = 158
+GROUND_RIGHT = 142
+PILLAR = 140
+DOOR_TOP = 148
+DOOR_BOTTOM = 161
+
+# gids Tiled gave each kind of object in level1
+BLOCKER_GID = 2
+PLAYER_GID = 6
+ENEMY_GID = 10
+ITEM_BOX_GID = 98
+
+ENCODINGS = ('csv', 'base64', 'xml')
+COMPRESSIONS = (None, 'zlib', 'gzip')
+
+
+class Segment(object):
+    """
+    A run of ground tiles with its top surface on the given row.
+    """
+    def __init__(self, start, length, row):
+        self.start = start
+        self.length = length
+        self.row = row
+
+    @property
+    def end(self):
+        return self.start + self.length
+
+
+class MapGenerator(object):
+    """
+    Lays out ground segments left to right with gaps between them, and
+    some floating platforms above, then scatters enemies and item boxes
+    over them.  The same parameters and seed always give the same map.
+    """
+    def __init__(self, width=102, height=30, enemies=8, item_box_density=0.02,
+                 layers=2, seed=0):
+        if width < 20 or height < 12:
+            raise ValueError('Maps must be at least 20x12 tiles')
+        if layers < 2:
+            raise ValueError('Maps need a background and a terrain layer')
+        self.width = width
+        self.height = height
+        self.enemy_count = enemies
+        self.item_box_density = item_box_density
+        self.layer_count = layers
+        self.random = random.Random(seed)
+        self.segments = []
+        self.platforms = []
+        self.objects = []
+        self.terrain = [0] * (width * height)
+        self.make_segments()
+        self.make_terrain()
+        self.make_objects()
+
+    def make_segments(self):
+        top = self.height // 3
+        bottom = self.height - 4
+        row = min(bottom, self.height - 8)
+        start = 1
+        while start < self.width - 8:
+            length = min(self.random.randint(6, 30), self.width - 2 - start)
+            segment = Segment(start, length, row)
+            self.segments.append(segment)
+            if length >= 8 and self.random.random() < 0.4:
+                offset = self.random.randint(1, length - 6)
+                self.platforms.append(Segment(start + offset,
+                                              self.random.randint(3, 5),
+                                              row - self.random.randint(3, 4)))
+            start += length + self.random.randint(2, 4)
+            row = max(top, min(bottom, row + self.random.randint(-2, 2)))
+
+    def set_tile(self, col, row, gid):
+        if 0 <= col < self.width and 0 <= row < self.height:
+            self.terrain[row * self.width + col] = gid
+
+    def make_terrain(self):
+        for segment in self.segments + self.platforms:
+            for col in range(segment.start, segment.end):
+                self.set_tile(col, segment.row, GROUND)
+            self.set_tile(segment.start, segment.row, GROUND_LEFT)
+            self.set_tile(segment.end - 1, segment.row, GROUND_RIGHT)
+
+        for segment in self.segments:
+            pillars = [segment.start + 2, segment.start + 3]
+            if segment.length >= 10:
+                pillars.extend([segment.end - 4, segment.end - 3])
+            for col in pillars:
+                for row in range(segment.row + 1, self.height):
+                    self.set_tile(col, row, PILLAR)
+
+        last = self.segments[-1]
+        self.set_tile(last.end - 2, last.row - 2, DOOR_TOP)
+        self.set_tile(last.end - 2, last.row - 1, DOOR_BOTTOM)
+
+    def add_object(self, name, gid, col, bottom_row, object_type=None):
+        self.objects.append((name, object_type, gid, col * TILE_SIZE, bottom_row * TILE_SIZE))
+
+    def make_objects(self):
+        first = self.segments[0]
+        self.add_object('player start point', PLAYER_GID, first.start + 2, first.row - 3)
+
+        for segment in self.segments + self.platforms:
+            for col in range(segment.start, segment.end):
+                self.add_object('blocker', BLOCKER_GID, col, segment.row + 1)
+            self.add_object('enemy blocker', BLOCKER_GID, segment.start - 1, segment.row)
+            self.add_object('enemy blocker', BLOCKER_GID, segment.end, segment.row)
+
+            for col in range(segment.start + 1, segment.end - 1):
+                if self.random.random() < self.item_box_density:
+                    self.add_object('item box', ITEM_BOX_GID, col, segment.row - 3)
+
+        # keep the start clear, enemies go anywhere else weighted by length
+        walkable = [(segment, col) for segment in self.segments[1:] + self.platforms
+                    for col in range(segment.start + 1, segment.end - 1)]
+        if not walkable:
+            walkable = [(first, col) for col in range(first.start + 5, first.end - 1)]
+        for i in range(self.enemy_count if walkable else 0):
+            segment, col = self.random.choice(walkable)
+            self.add_object('enemy1', ENEMY_GID, col, segment.row, object_type='enemy')
+
+        last = self.segments[-1]
+        self.add_object('door', DOOR_BOTTOM, last.end - 2, last.row)
+        self.add_object('door', DOOR_TOP, last.end - 2, last.row - 1)
+
+    def background_layer(self, shift=0):
+        gids = []
+        for row in range(self.height):
+            pattern = BACKGROUND[row % 2]
+            gids.extend(pattern[(col + shift) % 3] for col in range(self.width))
+        return gids
+
+    def layers(self):
+        """
+        Return a list of (name, gids) tile layers, bottom first.
+        """
+        layers = [('Background', self.background_layer())]
+        for i in range(self.layer_count - 2):
+            layers.append(('Extra {}'.format(i + 1), self.background_layer(i + 1)))
+        layers.append(('Terrain', self.terrain))
+        return layers
+
+    def to_tmx(self, path, encoding='base64', compression='zlib', chunk_size=None):
+        """
+        Return the map as TMX for a file at path (tileset images are
+        referenced relative to it), infinite with layers in chunks of
+        chunk_size tiles if given.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError('Unknown encoding: {}'.format(encoding))
+        if compression not in COMPRESSIONS:
+            raise ValueError('Unknown compression: {}'.format(compression))
+        if compression and encoding != 'base64':
+            raise ValueError('Only base64 data can be compressed')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        infinite = ' infinite="1"' if chunk_size else ''
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<map version="1.0" orientation="orthogonal" width="{}" height="{}" '
+                 'tilewidth="{}" tileheight="{}"{} backgroundcolor="#00004e">'.format(
+                     self.width, self.height, TILE_SIZE, TILE_SIZE, infinite)]
+        for name, firstgid, image, width, height in TILESETS:
+            source = os.path.relpath(os.path.abspath(os.path.join(GRAPHICS, image)), directory)
+            lines.append(' <tileset firstgid="{}" name="{}" tilewidth="{}" tileheight="{}">'.format(
+                firstgid, name, TILE_SIZE, TILE_SIZE))
+            lines.append('  <image source="{}" width="{}" height="{}"/>'.format(
+                source.replace(os.sep, '/'), width, height))
+            lines.append(' </tileset>')
+
+        for name, gids in self.layers():
+            lines.append(' <layer name="{}" width="{}" height="{}">'.format(
+                name, self.width, self.height))
+            if chunk_size:
+                lines.extend(encode_chunks(gids, self.width, self.height, chunk_size,
+                                           encoding, compression))
+            else:
+                lines.extend(encode_layer(gids, self.width, encoding, compression))
+            lines.append(' </layer>')
+
+        lines.append(' <objectgroup name="Objects" width="{}" height="{}">'.format(
+            self.width, self.height))
+        for name, object_type, gid, x, y in self.objects:
+            object_type = ' type="{}"'.format(object_type) if object_type else ''
+            lines.append('  <object name="{}"{} gid="{}" x="{}" y="{}"/>'.format(
+                name, object_type, gid, x, y))
+        lines.append(' </objectgroup>')
+        lines.append('</map>')
+        return '\n'.join(lines) + '\n'
+
+
+def data_tag(encoding, compression):
+    if encoding == 'xml':
+        return '  <data>'
+    attributes = ' compression="{}"'.format(compression) if compression else ''
+    return '  <data encoding="{}"{}>'.format(encoding, attributes)
+
+
+def encode_gids(gids, width, encoding, compression):
+    """
+    Return the lines of the contents of a <data> or <chunk> element.
+    """
+    if encoding == 'xml':
+        return ['   <tile gid="{}"/>'.format(gid) for gid in gids]
+    if encoding == 'csv':
+        rows = [','.join(str(gid) for gid in gids[i:i + width])
+                for i in range(0, len(gids), width)]
+        return [',\n'.join(rows)]
+    data = struct.pack('<{}I'.format(len(gids)), *gids)
+    if compression == 'zlib':
+        data = zlib.compress(data)
+    elif compression == 'gzip':
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+            f.write(data)
+        data = buffer.getvalue()
+    return ['   ' + base64.b64encode(data).decode('ascii')]
+
+
+def encode_layer(gids, width, encoding, compression):
+    """
+    Return the lines of a layer's <data> element.
+    """
+    lines = [data_tag(encoding, compression)]
+    lines.extend(encode_gids(gids, width, encoding, compression))
+    lines.append('  </data>')
+    return lines
+
+
+def encode_chunks(gids, width, height, size, encoding, compression):
+    """
+    Return the lines of an infinite layer's <data> element, its chunks
+    padded with empty tiles past the map's edges.
+    """
+    lines = [data_tag(encoding, compression)]
+    for top in range(0, height, size):
+        for left in range(0, width, size):
+            chunk = []
+            for row in range(top, top + size):
+                for col in range(left, left + size):
+                    inside = row < height and col < width
+                    chunk.append(gids[row * width + col] if inside else 0)
+            if any(chunk):
+                lines.append('  <chunk x="{}" y="{}" width="{}" height="{}">'.format(
+                    left, top, size, size))
+                lines.extend(encode_gids(chunk, size, encoding, compression))
+                lines.append('  </chunk>')
+    lines.append('  </data>')
+    return lines
+
+
+def generate(path, width=102, height=30, enemies=8, item_box_density=0.02, layers=2,
+             seed=0, encoding='base64', compression='zlib', chunk_size=None):
+    """
+    Write a stress map to path and return the generator used.
+    """
+    generator = MapGenerator(width, height, enemies, item_box_density, layers, seed)
+    with open(path, 'w') as f:
+        f.write(generator.to_tmx(path, encoding, compression, chunk_size))
+    return generator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.mapgen',
+                                     description='Write a procedural stress map')
+    parser.add_argument('path', help='tmx file to write')
+    parser.add_argument('--width', type=int, default=102, help='width in tiles')
+    parser.add_argument('--height', type=int, default=30, help='height in tiles')
+    parser.add_argument('--enemies', type=int, default=8)
+    parser.add_argument('--item-boxes', type=float, default=0.02, dest='item_box_density',
+                        help='chance of an item box over each ground tile')
+    parser.add_argument('--layers', type=int, default=2, help='tile layers, at least 2')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--encoding', choices=ENCODINGS, default='base64')
+    parser.add_argument('--compression', choices=('none', 'zlib', 'gzip'), default=None,
+                        help='compress base64 data (default: zlib for base64, else none)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='write an infinite map with layers in chunks of this many tiles')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    compression = args.compression
+    if compression is None:
+        compression = 'zlib' if args.encoding == 'base64' else 'none'
+    if compression == 'none':
+        compression = None
+    generator = generate(args.path, args.width, args.height, args.enemies,
+                         args.item_box_density, args.layers, args.seed,
+                         args.encoding, compression, args.chunk_size)
+    names = [obj[0] for obj in generator.objects]
+    print('Wrote {}: {}x{} tiles, {} layers, {} blockers, {} enemies, {} item boxes'.format(
+        args.path, generator.width, generator.height, generator.layer_count,
+        names.count('blocker'), names.count('enemy1'), names.count('item box')))
+
+
+if __name__ == '__main__':
+    main()
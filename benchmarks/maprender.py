@@ -0,0 +1,92 @@
+"""
+Times rendering a whole map with different numbers of threads, and checks
+each result is identical to the serial one:
+
+    python -m benchmarks.maprender
+    python -m benchmarks.maprender --workers 1,2,4,8 --size 400x120 --repeat 5
+
+tilerender.WORKERS stays at 1 unless this shows threads are faster on a
+multi-core machine.
+"""
+
+from __future__ import division
+import argparse
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+import timeit
+from . import mapgen
+
+
+def time_render(renderer, surface, workers, repeat):
+    """
+    Return the best of repeat renders, in ms.
+    """
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        renderer.render(surface, workers)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1000 * best
+
+
+def run(worker_counts, size, layers, repeat):
+    """
+    Return [(workers, ms, identical)] for rendering a generated map.
+    """
+    import pygame as pg
+    from data import tilerender
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'render.tmx')
+        mapgen.generate(path, size[0], size[1], layers=layers)
+        renderer = tilerender.Renderer(path)
+        serial = pg.Surface(renderer.size)
+        renderer.render(serial, 1)
+        expected = pg.image.tostring(serial, 'RGB')
+        results = []
+        for workers in worker_counts:
+            surface = pg.Surface(renderer.size)
+            ms = time_render(renderer, surface, workers, repeat)
+            results.append((workers, ms, pg.image.tostring(surface, 'RGB') == expected))
+        return results
+    finally:
+        shutil.rmtree(directory)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.maprender',
+                                     description='Time map rendering over threads')
+    parser.add_argument('--workers', default='1,2,4',
+                        help='comma separated thread counts (default: %(default)s)')
+    parser.add_argument('--size', default='230x40',
+                        help='map size in tiles, WxH (default: %(default)s)')
+    parser.add_argument('--layers', type=int, default=3,
+                        help='tile layers (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='renders per thread count, the best is kept (default: %(default)s)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import pygame as pg
+    pg.init()
+    pg.display.set_mode((1, 1))
+    size = tuple(int(n) for n in args.size.lower().split('x'))
+    results = run([int(n) for n in args.workers.split(',')], size, args.layers, args.repeat)
+    print('{} cores'.format(multiprocessing.cpu_count()))
+    print('{:>8} {:>10} {:>8} {:>10}'.format('workers', 'ms', 'speedup', 'identical'))
+    serial = results[0][1]
+    for workers, ms, identical in results:
+        print('{:>8} {:>10.2f} {:>7.2f}x {:>10}'.format(workers, ms, serial / ms,
+                                                        'yes' if identical else 'NO'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Plays recorded input through level1 in a checkout of another revision
+of the game, capturing frames for benchmarks.golden --against.  Run by
+golden with the checkout as the working directory:
+
+    python benchmarks/revision.py inputs.pickle captures.pickle
+
+Older revisions have no replay support, so this imports nothing from the
+benchmarks and drives their unchanged Control from outside, through the
+pygame functions it calls: the events, held keys and clock come from the
+recording, and frames are taken as they are shown with
+pg.display.update.  It relies only on what the first revision of the
+game already had, so any later one can be checked too.
+"""
+
+import os
+import pickle
+import random
+import sys
+import threading
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+sys.path.insert(0, os.getcwd())
+
+# the mixer calls back into Python from SDL's audio thread, which needs
+# Python 2's thread support set up first, as data.setup now does
+thread = threading.Thread(target=lambda: None)
+thread.start()
+thread.join()
+
+import pygame as pg
+
+
+class KeyTuple(tuple):
+    """
+    pg.key.get_pressed() from a set of held keys.
+    """
+    def __new__(cls, held):
+        return tuple.__new__(cls, [1 if key in held else 0 for key in range(512)])
+
+
+class Clock(object):
+    """
+    Stands in for pg.time.Clock, never waiting.
+    """
+    def tick(self, fps=0):
+        return 0
+
+    def get_fps(self):
+        return 0.0
+
+
+class Driver(object):
+    def __init__(self, inputs, frames, captures):
+        self.inputs = inputs
+        self.frames = min(frames, len(inputs))
+        self.wanted = set(captures)
+        self.frame = 0
+        self.keys = KeyTuple(())
+        self.ticks = 0.0
+        self.captures = {}
+        self.size = None
+        self.control = None
+
+    def get_events(self, *args, **kwargs):
+        # frames are counted from 1, as in golden.FrameCapture
+        events, held, self.ticks = self.inputs[self.frame]
+        self.frame += 1
+        self.keys = KeyTuple(set(held))
+        return [pg.event.Event(event_type, key=key) for event_type, key in events]
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_ticks(self):
+        return self.ticks
+
+    def update(self, *args):
+        if self.frame in self.wanted:
+            screen = pg.display.get_surface()
+            self.size = screen.get_size()
+            self.captures[self.frame] = pg.image.tostring(screen, 'RGB')
+        if self.frame >= self.frames or self.control.state.done:
+            self.control.done = True
+
+    def install(self):
+        set_mode = pg.display.set_mode
+
+        def set_mode_32(size=(0, 0), flags=0, depth=0):
+            # the dummy video driver defaults to 8 bits, with a palette
+            return set_mode(size, flags, depth or 32)
+
+        pg.display.set_mode = set_mode_32
+        pg.event.get = self.get_events
+        pg.key.get_pressed = self.get_pressed
+        pg.time.get_ticks = self.get_ticks
+        pg.time.Clock = Clock
+        pg.display.update = self.update
+        pg.display.flip = self.update
+
+
+def run(inputs, frames, captures, seed=0):
+    driver = Driver(inputs, frames, captures)
+    driver.install()
+    from data import setup, tools
+    from data.states import level
+
+    if hasattr(setup, 'DISPLAY'):
+        control = tools.Control(setup.ORIGINAL_CAPTION, setup.DISPLAY)
+    else:
+        control = tools.Control(setup.ORIGINAL_CAPTION)
+    control.setup_states({'level1': level.Level('level1')}, 'level1')
+    # later revisions start the state in setup_states
+    if not hasattr(control.state, 'player'):
+        control.state.startup(0.0, tools.create_game_data_dict())
+    driver.control = control
+    random.seed(seed)
+    control.main()
+    return {'captures': driver.captures, 'frames': driver.frame, 'size': driver.size}
+
+
+def main():
+    with open(sys.argv[1], 'rb') as f:
+        job = pickle.load(f)
+    result = run(job['inputs'], job['frames'], job['captures'], job['seed'])
+    with open(sys.argv[2], 'wb') as f:
+        pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Run scenarios in fresh processes and compare the results with a baseline.
+"""
+
+from __future__ import division
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+# metric: (higher is better, absolute slack ignored when comparing)
+METRICS = {'fps': (True, 0.0),
+           'mean': (False, 0.05),
+           'p99': (False, 0.1),
+           'peak_rss_mb': (False, 1.0),
+           'net_blocks_per_frame': (False, 5.0)}
+PHASE_SLACK = 0.05
+DEFAULT_TOLERANCE = 0.15
+
+
+def count_live_blocks():
+    """
+    Return how many blocks are live: the interpreter's allocated blocks
+    where available, otherwise the gc-tracked objects allocated and not
+    freed since the last collection (call with gc disabled).  Differences
+    between two readings are net growth, so objects made and freed within
+    a frame don't show up in them.
+    """
+    if hasattr(sys, 'getallocatedblocks'):
+        return sys.getallocatedblocks()
+    return gc.get_count()[0]
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def start_control(map_path=None, map_options=None, start_state=None):
+    """
+    Build a headless, uncapped Control started on level1, on a tmx file
+    or on a map generated from mapgen options.  Returns the control and
+    the name of the level state.
+    """
+    from data import setup, tools
+    from data import constants as c
+    from data.main import make_state_dict
+    from data.states import level
+
+    state_dict = make_state_dict()
+    level_name = c.LEVEL1
+    directory = None
+    if map_options and not map_path:
+        from . import mapgen
+
+        directory = tempfile.mkdtemp()
+        map_path = os.path.join(directory, 'generated.tmx')
+        mapgen.generate(map_path, **map_options)
+    if map_path:
+        level_name = os.path.splitext(os.path.basename(map_path))[0]
+        setup.TMX[level_name] = map_path
+        state_dict[level_name] = level.Level(level_name)
+
+    control = tools.Control(setup.ORIGINAL_CAPTION, setup.DISPLAY)
+    control.fps = 0
+    try:
+        control.setup_states(state_dict, start_state or level_name)
+    finally:
+        if directory:
+            shutil.rmtree(directory)
+    return control, level_name
+
+
+def run_scenario(name, frames=None, map_path=None):
+    """
+    Boot Control headlessly, run one scenario and return its results.
+    Meant to be run in its own process, see run().
+    """
+    from data import tools, perf
+    from . import scenarios
+
+    scenario = scenarios.SCENARIOS[name]
+    frames = frames or scenario.frames
+    control, level_name = start_control(map_path, scenario.map_options)
+    if scenario.setup:
+        scenario.setup(control.state)
+    control.replay = source = scenarios.ScriptedInput(control, scenario.policy, frames,
+                                                      respawn=scenario.finish)
+
+    perf.PROFILER.size = frames
+    perf.PROFILER.reset()
+    perf.PROFILER.enabled = True
+
+    gc.collect()
+    gc.disable()
+    live_blocks = count_live_blocks()
+    try:
+        control.main()
+    finally:
+        live_blocks = count_live_blocks() - live_blocks
+        gc.enable()
+
+    result = tools.frame_summary(control.frame_times, control.elapsed)
+    result['peak_rss_mb'] = peak_rss_mb()
+    result['net_blocks_per_frame'] = live_blocks / max(result['frames'], 1)
+    result['phases'] = dict((phase, average) for phase, average, p99, worst
+                            in perf.PROFILER.stats())
+    result['map'] = level_name
+    result['respawns'] = source.respawns
+    # a shortened run isn't expected to get to the door
+    if frames >= scenario.frames:
+        scenario.check(control.state, source)
+    return result
+
+
+def run(names, frames=None, map_path=None):
+    """
+    Run each named scenario in a fresh process, so peak memory and
+    loading costs aren't shared between them.
+    """
+    results = {}
+    for name in names:
+        pool = multiprocessing.Pool(1, maxtasksperchild=1)
+        try:
+            results[name] = pool.apply(run_scenario, (name, frames, map_path))
+        finally:
+            pool.close()
+            pool.join()
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, tolerances=None):
+    baseline = load_baseline(path) or {}
+    baseline.setdefault('tolerances', tolerances or {})
+    baseline.setdefault('scenarios', {}).update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def is_regression(metric, current, base, tolerance):
+    higher_is_better, slack = METRICS.get(metric, (False, PHASE_SLACK))
+    if higher_is_better:
+        return current < base * (1 - tolerance) - slack
+    return current > base * (1 + tolerance) + slack
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results with a baseline.  Tolerances are relative; a
+    'tolerances' dict in the baseline file overrides the default per metric
+    (phases are named 'phase:<name>').  Returns (rows, regressed), where
+    each row is (scenario, metric, baseline, current, change, status).
+    """
+    tolerances = baseline.get('tolerances', {})
+    rows = []
+    regressed = False
+    for name, result in sorted(results.items()):
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            rows.append((name, '-', None, None, None, 'no baseline'))
+            continue
+        pairs = [(metric, result[metric], base.get(metric)) for metric in sorted(METRICS)]
+        pairs.extend(('phase:' + phase, value, base.get('phases', {}).get(phase))
+                     for phase, value in sorted(result['phases'].items()))
+        for metric, current, previous in pairs:
+            if previous is None:
+                continue
+            change = (current - previous) / previous if previous else 0.0
+            bad = is_regression(metric, current, previous,
+                                tolerances.get(metric, tolerance))
+            regressed = regressed or bad
+            rows.append((name, metric, previous, current, change,
+                         'REGRESSED' if bad else 'ok'))
+    return rows, regressed
+
+
+def format_results(results):
+    lines = ['{:<8}{:>9}{:>9}{:>9}{:>9}{:>10}{:>10}'.format(
+        'scenario', 'frames', 'fps', 'mean ms', 'p99 ms', 'rss MB', 'net blk/f')]
+    for name, r in sorted(results.items()):
+        lines.append('{:<8}{:>9}{:>9.1f}{:>9.2f}{:>9.2f}{:>10.1f}{:>10.1f}'.format(
+            name, r['frames'], r['fps'], r['mean'], r['p99'],
+            r['peak_rss_mb'], r['net_blocks_per_frame']))
+    lines.append('net blk/f: growth in live blocks per frame, not every allocation')
+    return '\n'.join(lines)
+
+
+def format_comparison(rows):
+    width = max([len('scenario')] + [len(row[0]) for row in rows]) + 1
+    row_format = '{:<%d}{:<26}{:>10}{:>10}{:>9}  {}' % width
+    value_format = '{:<%d}{:<26}{:>10.2f}{:>10.2f}{:>8.1f}%%  {}' % width
+    lines = [row_format.format('scenario', 'metric', 'baseline', 'current', 'change', 'status')]
+    for name, metric, previous, current, change, status in rows:
+        if previous is None:
+            lines.append(row_format.format(name, metric, '-', '-', '-', status))
+        else:
+            lines.append(value_format.format(name, metric, previous, current,
+                                             change * 100, status))
+    return '\n'.join(lines)
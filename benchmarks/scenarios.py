@@ -0,0 +1,221 @@
+"""
+Named gameplay scenarios.  Each one boots a level, optionally changes it
+(more enemies, bouncy mode) and drives it with a scripted input policy: a
+function of (control, frame) returning the keys to hold that frame.  A
+scenario can also play on a generated map, given as mapgen options.
+
+Only pygame and modules that don't touch the display are imported here.
+Anything needing data.setup is imported inside the functions, once the
+benchmark process has started.
+"""
+
+from __future__ import division
+import random
+from collections import OrderedDict
+import pygame as pg
+from data import constants as c
+from data.replay import KeyState
+
+
+class Scenario(object):
+    """
+    A scenario with finish set plays until the player reaches the door,
+    respawning it whenever it falls to its death (see respawn_if_falling),
+    and check() fails if it didn't get there.
+    """
+    def __init__(self, name, description, policy, setup=None, frames=1200,
+                 map_options=None, finish=False):
+        self.name = name
+        self.description = description
+        self.policy = policy
+        self.setup = setup
+        self.frames = frames
+        self.map_options = map_options
+        self.finish = finish
+
+    def check(self, level, source):
+        """
+        Raise AssertionError if the scenario should have finished the
+        level and didn't.
+        """
+        if self.finish and not completed(level):
+            raise AssertionError('{} stopped at x={} after {} frames and {} respawns, '
+                                 'short of the door at x={}'.format(
+                                     self.name, level.player.rect.right, source.frame,
+                                     source.respawns, level.doors.sprites()[0].rect.x))
+
+
+def completed(level):
+    """
+    Return whether the level ended at the door rather than in a death.
+    """
+    return level.done and level.next == c.GAME_OVER and level.game_data[c.LIVES] > 0
+
+
+class ScriptedInput(object):
+    """
+    Drives Control the way a replay.Replay does, but from a policy.  Key
+    events are generated for keys that change between frames, and the
+    clock advances a fixed frame_ms per frame.  Finishes after the given
+    number of frames or when the level is done.  With respawn, a player
+    falling to its death is put back on the ground instead.
+    """
+    def __init__(self, control, policy, frames, frame_ms=1000 / 60, seed=0, respawn=False):
+        self.control = control
+        self.policy = policy
+        self.frames = frames
+        self.frame_ms = frame_ms
+        self.respawn = respawn
+        self.respawns = 0
+        self.frame = 0
+        self.ticks = 0.0
+        self.held = set()
+        random.seed(seed)
+
+    @property
+    def finished(self):
+        return self.frame >= self.frames or self.control.state.done
+
+    def next_frame(self):
+        if self.respawn and respawn_if_falling(self.control.state):
+            self.respawns += 1
+        held = set(self.policy(self.control, self.frame))
+        events = [pg.event.Event(pg.KEYUP, key=key) for key in self.held - held]
+        events.extend(pg.event.Event(pg.KEYDOWN, key=key) for key in held - self.held)
+        self.held = held
+        self.frame += 1
+        self.ticks += self.frame_ms
+        return events, KeyState(held), self.ticks
+
+
+def idle(control, frame):
+    """
+    Stand still.
+    """
+    return ()
+
+
+def run_right(control, frame):
+    """
+    Run right, jumping every three quarters of a second.
+    """
+    keys = [pg.K_RIGHT, c.RUN_BUTTON]
+    if frame % 45 < 20:
+        keys.append(c.JUMP_BUTTON)
+    return keys
+
+
+def run_over_gaps(control, frame):
+    """
+    Run right, jumping at the edge of each run of blockers.
+    """
+    level = control.state
+    ahead = level.player.rect.right + 35, level.player.rect.bottom + 35
+    keys = [pg.K_RIGHT, c.RUN_BUTTON]
+    if not any(blocker.rect.collidepoint(ahead) for blocker in level.blockers):
+        keys.append(c.JUMP_BUTTON)
+    return keys
+
+
+def traverse(control, frame):
+    """
+    Run towards the door, jumping over gaps, walls and walking enemies
+    ahead.  Above the door, it keeps going the way it faces until it has
+    come down.  The jump button is let go of for a frame on landing, so
+    it can jump again.
+    """
+    level = control.state
+    player = level.player
+    rect = player.rect
+    door = pg.Rect(level.doors.sprites()[0].rect).unionall(
+        [door.rect for door in level.doors])
+    if rect.bottom < door.top:
+        left = player.direction == c.LEFT
+    else:
+        left = door.centerx < rect.centerx
+    if left:
+        keys = [pg.K_LEFT, c.RUN_BUTTON]
+        ground = rect.left - 35, rect.bottom + 35
+        wall = pg.Rect(rect.left - 50, rect.top, 50, rect.height - 10)
+        danger = pg.Rect(rect.left - 210, rect.top - 70, 210, rect.height + 70)
+    else:
+        keys = [pg.K_RIGHT, c.RUN_BUTTON]
+        ground = rect.right + 35, rect.bottom + 35
+        wall = pg.Rect(rect.right, rect.top, 50, rect.height - 10)
+        danger = pg.Rect(rect.right, rect.top - 70, 210, rect.height + 70)
+    if player.state == c.WALKING and not player.allow_jump:
+        return keys
+    obstacles = list(level.blockers) + list(level.item_boxes)
+    if (not any(blocker.rect.collidepoint(ground) for blocker in level.blockers) or
+            any(obstacle.rect.colliderect(wall) for obstacle in obstacles) or
+            any(enemy.rect.colliderect(danger) for enemy in level.sprites
+                if enemy.state == c.WALKING)):
+        keys.append(c.JUMP_BUTTON)
+    return keys
+
+
+def respawn_if_falling(level):
+    """
+    Put the player back on the ground when it has fallen below every
+    blocker, so can only die: on the first blocker ahead of it with no
+    walking enemy near, or the last blocker if there are none.  Returns
+    whether it did.
+    """
+    player = level.player
+    blockers = sorted(level.blockers, key=lambda blocker: blocker.rect.x)
+    if not blockers or player.rect.top <= max(blocker.rect.bottom for blocker in blockers):
+        return False
+    enemies = [enemy.rect for enemy in level.sprites if enemy.state == c.WALKING]
+    ground = blockers[-1]
+    for blocker in blockers:
+        if (blocker.rect.left >= player.rect.left and
+                blocker.rect.inflate(420, 140).collidelist(enemies) == -1):
+            ground = blocker
+            break
+    player.rect.midbottom = ground.rect.midtop
+    player.x_vel = 0
+    player.damaged = False
+    player.enter_walking()
+    return True
+
+
+def walk_bouncy(control, frame):
+    """
+    Walk right, putting the bouncy shoes back on whenever they wear off.
+    """
+    player = control.state.player
+    if player.state != c.BOUNCY:
+        player.enter_bouncy_state(control.current_time)
+    return (pg.K_RIGHT,)
+
+
+def add_bouncy(level):
+    level.player.enter_bouncy_state(level.current_time)
+
+
+def add_crowd(level, count=400):
+    """
+    Drop a crowd of enemies over the first part of the level.
+    """
+    from data.sprites import enemies
+
+    left = level.player.rect.x + 200
+    for i in range(count):
+        x = left + (i * 37) % 4000
+        y = level.player.rect.bottom - 300 - (i % 5) * 90
+        level.sprites.add(enemies.Enemy(x, y, 'enemy1'))
+
+
+SCENARIOS = OrderedDict((scenario.name, scenario) for scenario in [
+    Scenario('idle', 'camera idle at the start point', idle),
+    Scenario('run', 'run and jump to the door', traverse, frames=1800, finish=True),
+    Scenario('stomp', 'bouncy shoes on, stomping enemies', walk_bouncy, add_bouncy),
+    Scenario('crowd', '400 extra enemies near the start', run_right, add_crowd),
+    Scenario('bigmap', 'run across a generated map of 230x40 tiles', traverse, frames=6000,
+             map_options={'width': 230, 'height': 40, 'enemies': 120, 'layers': 3},
+             finish=True),
+    Scenario('chunked', 'run across a generated infinite map in 16x16 chunks', traverse,
+             frames=6000, map_options={'width': 224, 'height': 48, 'enemies': 120,
+                                       'layers': 3, 'chunk_size': 16},
+             finish=True),
+])
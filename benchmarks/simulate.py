@@ -0,0 +1,256 @@
+"""
+Automated playtesting.  Runs many scripted or random attempts at a level
+across a pool of worker processes and reports how they went:
+
+    python -m benchmarks.simulate --attempts 1000 --policy random
+    python -m benchmarks.simulate --map big.tmx --policy gaps --workers 8
+
+Each worker loads the map and starts the level once, snapshotting it;
+every attempt, and every life within one, restores that snapshot rather
+than building new sprites, then steps the level directly at a fixed 60Hz
+tick, as fast as it will go.  Levels are render-free
+unless --render is given: no tile images, map surface or sprite images
+are made.  An attempt lasts until the player reaches the door, runs out
+of lives or hits the frame limit.
+"""
+
+from __future__ import division
+import argparse
+import os
+import json
+import multiprocessing
+import random
+import timeit
+from collections import OrderedDict
+from . import scenarios
+
+TICK = 1 / 60
+
+COMPLETED = 'completed'
+GAME_OVER = 'game over'
+TIMEOUT = 'timeout'
+OUTCOMES = (COMPLETED, GAME_OVER, TIMEOUT)
+
+# the loaded Level and its starting snapshot, per worker process
+WORKER = {}
+
+
+class RandomInput(object):
+    """
+    Policy mashing random keys, changing its mind every few frames.
+    """
+    def __init__(self, seed, hold_frames=(5, 40)):
+        self.random = random.Random(seed)
+        self.hold_frames = hold_frames
+        self.keys = ()
+        self.until = 0
+
+    def __call__(self, control, frame):
+        import pygame as pg
+        from data import constants as c
+
+        if frame >= self.until:
+            self.until = frame + self.random.randint(*self.hold_frames)
+            keys = [self.random.choice([pg.K_RIGHT, pg.K_RIGHT, pg.K_LEFT, None])]
+            if self.random.random() < 0.5:
+                keys.append(c.JUMP_BUTTON)
+            if self.random.random() < 0.5:
+                keys.append(c.RUN_BUTTON)
+            self.keys = [key for key in keys if key is not None]
+        return self.keys
+
+
+POLICIES = OrderedDict([('run', scenarios.run_right),
+                        ('gaps', scenarios.run_over_gaps),
+                        ('bouncy', scenarios.walk_bouncy),
+                        ('idle', scenarios.idle),
+                        ('random', RandomInput)])
+
+
+class Simulation(object):
+    """
+    Steps a level without Control.  Has the state and current_time
+    attributes the scenario policies read from a Control.
+    """
+    def __init__(self, level):
+        self.state = level
+        self.current_time = 0.0
+
+
+def start_worker(map_path=None, render=False):
+    """
+    Pool initializer: set up the game headless, load the map and start
+    the level once.
+    """
+    from data import setup, tools
+    from data import constants as c
+    from data.states import level
+
+    level_name = c.LEVEL1
+    if map_path:
+        level_name = os.path.splitext(os.path.basename(map_path))[0]
+        setup.TMX[level_name] = map_path
+    WORKER['level'] = level.Level(level_name, render)
+    WORKER['level'].startup(0.0, tools.create_game_data_dict())
+    WORKER['start'] = WORKER['level'].snapshot()
+
+
+def restart(level, checkpoint, game_data):
+    """
+    Restore the level to checkpoint with the given game data, leaving
+    the random module as it is.
+    """
+    random_state = random.getstate()
+    level.restore(checkpoint, game_data)
+    random.setstate(random_state)
+
+
+def run_attempt(args):
+    """
+    Play one attempt and return its result.
+    """
+    from data import tools
+    from data import constants as c
+    from data.replay import KeyState
+
+    attempt, policy_name, seed, max_frames = args
+    level = WORKER['level']
+    checkpoint = WORKER['start']
+    random.seed(seed)
+    policy = POLICIES[policy_name]
+    if policy is RandomInput:
+        policy = RandomInput(seed)
+
+    simulation = Simulation(level)
+    deaths = 0
+    frames = 0
+    furthest = 0
+    outcome = TIMEOUT
+    start = timeit.default_timer()
+    restart(level, checkpoint, tools.create_game_data_dict())
+    while outcome == TIMEOUT and frames < max_frames:
+        while not level.done and frames < max_frames:
+            keys = KeyState(policy(simulation, frames))
+            simulation.current_time += TICK * 1000
+            level.step(keys, simulation.current_time, TICK)
+            furthest = max(furthest, level.player.rect.right)
+            frames += 1
+        if not level.done:
+            break
+        if level.next == c.LIVES_LEFT:
+            deaths += 1
+            restart(level, checkpoint, level.game_data)
+        elif level.game_data[c.LIVES] <= 0:
+            deaths += 1
+            outcome = GAME_OVER
+        else:
+            outcome = COMPLETED
+
+    return {'attempt': attempt,
+            'seed': seed,
+            'outcome': outcome,
+            'deaths': deaths,
+            'frames': frames,
+            'seconds': frames * TICK,
+            'furthest': furthest,
+            'level width': level.level_rect.width,
+            'wall ms': 1000 * (timeit.default_timer() - start)}
+
+
+def run(attempts, policy_name='random', workers=None, max_frames=3600, seed=0,
+        map_path=None, render=False):
+    """
+    Run the attempts over a pool of workers and return their results in
+    attempt order, with the wall time taken.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    jobs = [(i, policy_name, seed + i, max_frames) for i in range(attempts)]
+    start = timeit.default_timer()
+    pool = multiprocessing.Pool(workers, start_worker, (map_path, render))
+    try:
+        results = list(pool.imap_unordered(run_attempt, jobs, chunksize=4))
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = timeit.default_timer() - start
+    results.sort(key=lambda result: result['attempt'])
+    return results, elapsed
+
+
+def summary(results, elapsed, workers):
+    """
+    Gather the attempts into a single report dict.
+    """
+    count = len(results)
+    frames = sum(result['frames'] for result in results)
+    outcomes = dict((outcome, sum(1 for result in results if result['outcome'] == outcome))
+                    for outcome in OUTCOMES)
+    completed = [result for result in results if result['outcome'] == COMPLETED]
+
+    def mean(values):
+        values = list(values)
+        return sum(values) / len(values) if values else 0.0
+
+    return {'attempts': count,
+            'workers': workers,
+            'outcomes': outcomes,
+            'completion rate': outcomes[COMPLETED] / count if count else 0.0,
+            'mean deaths': mean(result['deaths'] for result in results),
+            'mean seconds': mean(result['seconds'] for result in results),
+            'mean seconds to complete': mean(result['seconds'] for result in completed),
+            'mean progress': mean(result['furthest'] / result['level width']
+                                  for result in results),
+            'frames': frames,
+            'elapsed': elapsed,
+            'attempts per second': count / elapsed if elapsed else 0.0,
+            'frames per second': frames / elapsed if elapsed else 0.0}
+
+
+def format_summary(report):
+    lines = ['{attempts} attempts on {workers} workers in {elapsed:.1f}s '
+             '({attempts per second:.1f} attempts/s, {frames per second:.0f} frames/s)'.format(
+                 **report)]
+    lines.append('outcomes:        ' + ', '.join('{} {}'.format(report['outcomes'][outcome], outcome)
+                                                  for outcome in OUTCOMES))
+    lines.append('completion rate: {:.1%}'.format(report['completion rate']))
+    lines.append('mean deaths:     {:.2f}'.format(report['mean deaths']))
+    lines.append('mean progress:   {:.1%} of the level width'.format(report['mean progress']))
+    lines.append('mean time:       {:.1f}s, {:.1f}s when completed'.format(
+        report['mean seconds'], report['mean seconds to complete']))
+    return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.simulate',
+                                     description='Headless automated playtesting')
+    parser.add_argument('--attempts', type=int, default=100)
+    parser.add_argument('--policy', choices=list(POLICIES), default='random')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--max-frames', type=int, default=3600,
+                        help='frame limit per attempt (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first attempt, later ones count up')
+    parser.add_argument('--map', default=None, help='play this tmx file instead of level1')
+    parser.add_argument('--render', action='store_true',
+                        help='load and update images as the game does, for comparison')
+    parser.add_argument('--json', metavar='FILE', default=None,
+                        help='write the report and every attempt to a json file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workers = args.workers or multiprocessing.cpu_count()
+    results, elapsed = run(args.attempts, args.policy, workers, args.max_frames,
+                           args.seed, args.map, args.render)
+    report = summary(results, elapsed, workers)
+    print(format_summary(report))
+    if args.json:
+        report['results'] = results
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
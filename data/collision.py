@@ -6,7 +6,24 @@ import random
 import pygame as pg
 from . import constants as c
 from .sprites import powerup
-from . import tools, setup
+from . import tools, setup, perf
+
+
+def first_collision(sprite, *groups):
+    """
+    Return the first sprite colliding with sprite, checking the groups
+    in order, without building a group holding all of them.
+
+    The checks used to build a pg.sprite.Group of every group each time,
+    which was most of the time spent simulating a level, and picked among
+    several colliders by the group's hash order.  This finds the same
+    sprite whenever only one collides, and the first in order otherwise.
+    """
+    for group in groups:
+        collider = pg.sprite.spritecollideany(sprite, group)
+        if collider:
+            return collider
+    return None
 
 
 class CollisionHandler(object):
@@ -43,7 +60,8 @@ class CollisionHandler(object):
     def update(self, keys, current_time, dt):
         state_function = self.state_dict[self.player.state]
         state_function(keys, dt, current_time)
-        self.check_if_dead()
+        with perf.span('check_if_dead'):
+            self.check_if_dead()
 
     def update_walking_player(self, keys, dt, current_time):
         """
@@ -52,7 +70,8 @@ class CollisionHandler(object):
         self.current_time = current_time
         self.adjust_horizontal_motion(keys)
         self.player.rect.x += self.player.x_vel * dt
-        self.check_for_collision(False, True)
+        with perf.span('check_for_collision'):
+            self.check_for_collision(False, True)
 
         if self.player.x_vel > 0:
             if self.player.x_vel <= 25.0:
@@ -61,10 +80,14 @@ class CollisionHandler(object):
             if self.player.x_vel >= -25.0:
                 self.player.enter_standing()
 
-        self.check_for_ground(self.player)
-        self.adjust_item_box_position(dt)
-        self.adjust_sprite_position(dt)
-        self.adjust_powerup_position(dt)
+        with perf.span('check_for_ground'):
+            self.check_for_ground(self.player)
+        with perf.span('adjust_item_box_position'):
+            self.adjust_item_box_position(dt)
+        with perf.span('adjust_sprite_position'):
+            self.adjust_sprite_position(dt)
+        with perf.span('adjust_powerup_position'):
+            self.adjust_powerup_position(dt)
 
     def update_player_in_freefall(self, keys, dt, current_time):
         """
@@ -74,16 +97,21 @@ class CollisionHandler(object):
         self.adjust_horizontal_motion(keys, False)
 
         self.player.rect.x += self.player.x_vel * dt
-        self.check_for_collision(False, True)
+        with perf.span('check_for_collision'):
+            self.check_for_collision(False, True)
         self.player.rect.y += self.player.y_vel * dt
-        self.check_for_collision(True)
+        with perf.span('check_for_collision'):
+            self.check_for_collision(True)
 
         if self.player.y_vel < c.MAX_FALL_SPEED:
             self.player.y_vel += c.GRAVITY * dt
 
-        self.adjust_item_box_position(dt)
-        self.adjust_powerup_position(dt)
-        self.adjust_sprite_position(dt)
+        with perf.span('adjust_item_box_position'):
+            self.adjust_item_box_position(dt)
+        with perf.span('adjust_powerup_position'):
+            self.adjust_powerup_position(dt)
+        with perf.span('adjust_sprite_position'):
+            self.adjust_sprite_position(dt)
 
 
     def check_for_collision(self, vertical=False, horiz=False):
@@ -149,9 +177,7 @@ class CollisionHandler(object):
         """
         sprite.rect.y += 1
 
-        collideables = pg.sprite.Group(self.blockers, self.item_boxes)
-
-        if not pg.sprite.spritecollideany(sprite, collideables):
+        if not first_collision(sprite, self.blockers, self.item_boxes):
             sprite.enter_fall()
 
         sprite.rect.y -= 1
@@ -195,8 +221,9 @@ class CollisionHandler(object):
                     item_box.enter_opened_state()
                     x = item_box.rect.centerx
                     y = item_box.rect.top
-                    bouncy_star = powerup.BouncyStar(x, y)
+                    bouncy_star = powerup.BouncyStar(x, y, self.level.render)
                     self.stars.add(bouncy_star)
+                self.item_boxes.reindex(item_box)
 
     def adjust_powerup_position(self, dt):
         """
@@ -208,6 +235,7 @@ class CollisionHandler(object):
                 star.rect.y += star.y_vel * dt
                 if star.rect.bottom > star.start_y:
                     star.enter_revealed_state()
+                self.stars.reindex(star)
 
     def adjust_sprite_position(self, dt):
         """
@@ -229,10 +257,11 @@ class CollisionHandler(object):
                     self.check_for_enemy_vertical_collision(sprite)
                     if sprite.state == c.WALKING:
                         self.check_for_ground(sprite)
+                    # it may have landed dead and moved to a dead group
+                    tools.reindex(sprite)
 
     def check_for_enemy_horiz_collision(self, enemy):
-        collideable = pg.sprite.Group(self.blockers, self.item_boxes, self.enemy_blockers)
-        collider = pg.sprite.spritecollideany(enemy, collideable)
+        collider = first_collision(enemy, self.blockers, self.item_boxes, self.enemy_blockers)
 
         if collider:
             if enemy.direction == c.RIGHT:
@@ -246,8 +275,7 @@ class CollisionHandler(object):
 
 
     def check_for_enemy_vertical_collision(self, enemy):
-        collideable = pg.sprite.Group(self.blockers, self.item_boxes)
-        collider = pg.sprite.spritecollideany(enemy, collideable)
+        collider = first_collision(enemy, self.blockers, self.item_boxes)
 
 
         if collider:
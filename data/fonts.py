@@ -0,0 +1,121 @@
+"""
+Shared caches for fonts and rendered text, so states don't reload
+ttf files and rasterise the same strings every time they start up.
+"""
+
+from collections import OrderedDict
+import pygame as pg
+from . import setup, memory
+from . import constants as c
+
+
+class LRUCache(object):
+    """
+    Small least-recently-used cache built on an OrderedDict.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """
+        Return the cached value for key (marking it as recently used),
+        or None if it isn't cached.
+        """
+        try:
+            value = self.items.pop(key)
+        except KeyError:
+            return None
+        self.items[key] = value
+        return value
+
+    def put(self, key, value):
+        """
+        Cache a value, evicting the oldest entries if the cache is full.
+        """
+        self.items.pop(key, None)
+        self.items[key] = value
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+FONT_CACHE = {}
+TEXT_CACHE = LRUCache(128)
+GLYPH_CACHE = LRUCache(512)
+
+
+def get_font(name, size):
+    """
+    Return a pg.font.Font for one of the fonts in setup.FONTS,
+    loading it only the first time it is asked for.
+    """
+    key = name, size
+    font = FONT_CACHE.get(key)
+    if font is None:
+        font = pg.font.Font(setup.FONTS[name], size)
+        FONT_CACHE[key] = font
+    return font
+
+
+def render(text, name=c.MAIN_FONT, size=22, color=c.WHITE, antialias=True):
+    """
+    Render a string with the given font, reusing the surface if the
+    same text has been rendered before.  The returned surface is shared,
+    so don't draw on it.
+    """
+    key = name, size, text, tuple(color), bool(antialias)
+    image = TEXT_CACHE.get(key)
+    if image is None:
+        image = memory.track(get_font(name, size).render(text, antialias, color),
+                             'text', 'text cache')
+        TEXT_CACHE.put(key, image)
+    return image
+
+
+def get_glyph(char, name, size, color, antialias=True):
+    """
+    Return the rendered image of a single character.
+    """
+    key = name, size, char, tuple(color), bool(antialias)
+    image = GLYPH_CACHE.get(key)
+    if image is None:
+        image = memory.track(get_font(name, size).render(char, antialias, color),
+                             'text', 'glyph cache')
+        GLYPH_CACHE.put(key, image)
+    return image
+
+
+def draw_glyphs(surface, text, topleft, name=c.MAIN_FONT, size=22,
+                color=c.WHITE, antialias=True):
+    """
+    Draw text by blitting cached per-character images.  Meant for strings
+    that change every frame (counters, timers) where caching the whole
+    string would only churn the text cache.  Returns the rect drawn to.
+    """
+    x, y = topleft
+    rect = pg.Rect(x, y, 0, 0)
+    for char in text:
+        glyph = get_glyph(char, name, size, color, antialias)
+        rect.union_ip(surface.blit(glyph, (x, y)))
+        x += glyph.get_width()
+    return rect
+
+
+def clear():
+    """
+    Drop all cached text images.  Fonts are kept.  Returns whether
+    there was anything to drop.
+    """
+    cached = len(TEXT_CACHE) + len(GLYPH_CACHE)
+    TEXT_CACHE.clear()
+    GLYPH_CACHE.clear()
+    return cached > 0
+
+
+memory.add_cache('text', clear)
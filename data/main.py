@@ -3,7 +3,7 @@ from data.states import level
 from data.states import controls
 from data.states import livesleft
 from data.states import gameover
-from . import setup, tools
+from . import setup, tools, perf, replay, memory, quality
 
 MAIN_MENU = 'main menu'
 LEVEL1 = 'level1'
@@ -11,19 +11,47 @@ CONTROLS = 'controls'
 LIVES_LEFT = 'lives left'
 GAME_OVER = 'game over'
 
-def main():
+def main(start_state=MAIN_MENU, fps=60, frame_dt=None, fixed_dt=None, max_frames=None,
+         profile=False, trace=None, record=None, replay_file=None, memory_budget=None,
+         quality_budget=None, render_scale=None):
     """
     Add states to control here.
     """
-    run_it = tools.Control(setup.ORIGINAL_CAPTION)
-    state_dict = {MAIN_MENU: main_menu.Menu(),
-                  LEVEL1: level.Level(LEVEL1),
-                  CONTROLS: controls.Controls(),
-                  LIVES_LEFT: livesleft.LivesLeft(),
-                  GAME_OVER: gameover.GameOver()
+    run_it = tools.Control(setup.ORIGINAL_CAPTION, setup.DISPLAY)
+    if replay_file:
+        run_it.replay = replay.Replay(replay_file)
+        start_state = run_it.replay.start_state
+    elif record:
+        run_it.recorder = replay.Recorder(record, start_state)
+    run_it.fps = fps
+    run_it.frame_dt = frame_dt
+    run_it.fixed_dt = fixed_dt
+    run_it.max_frames = max_frames
+    run_it.profiler.enabled = profile
+    if memory_budget:
+        memory.REGISTRY.budget = int(memory_budget * memory.MB)
+    if render_scale:
+        quality.SETTINGS['render scale'] = render_scale
+    if quality_budget:
+        run_it.quality = run_it.overlay.quality = quality.QualityController(quality_budget / 1000.0)
+    if trace:
+        perf.TRACER.start(trace)
+    run_it.setup_states(make_state_dict(), start_state)
+    run_it.main()
 
-                  }
+    if run_it.frame_times:
+        print(tools.format_frame_summary(run_it.frame_times, run_it.elapsed))
+        if run_it.profiler.enabled:
+            print('\n'.join(run_it.profiler.format_stats()))
+            print('\n'.join(memory.REGISTRY.report()))
+        if run_it.quality is not None:
+            print('{} quality changes, ending at:'.format(run_it.quality.changes))
+            print('\n'.join(run_it.quality.format_stats()))
 
-    run_it.setup_states(state_dict, MAIN_MENU)
-    run_it.main()
 
+def make_state_dict():
+    return {MAIN_MENU: main_menu.Menu(),
+            LEVEL1: level.Level(LEVEL1),
+            CONTROLS: controls.Controls(),
+            LIVES_LEFT: livesleft.LivesLeft(),
+            GAME_OVER: gameover.GameOver()}
@@ -0,0 +1,206 @@
+"""
+Surface memory accounting.  Code that keeps surfaces around registers
+them with memory.track(surface, category, owner).  The registry only
+holds weak references, so a surface drops out of the totals as soon as
+it is freed.  Sizes are the bytes of pixel data (pitch times height);
+a subsurface shares its parent's pixels, so the parent is counted
+instead.
+
+Caches that can be rebuilt register an evict function with
+memory.add_cache(name, evict, owner).  REGISTRY.budget (in bytes, 0 for
+none) is enforced by REGISTRY.enforce(keep), which Control calls after
+every state flip: caches are evicted in the order they were added until
+the total is back under budget, with a warning if that isn't enough.
+Caches owned by anything in keep (the state just started and the one it
+leads to) are left alone, as they would only be rebuilt right away.
+"""
+
+from __future__ import division
+import gc
+import threading
+import warnings
+import weakref
+from collections import OrderedDict, deque
+import pygame as pg
+
+MB = 1024 * 1024
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+def root_surface(surface):
+    """
+    Return the surface that owns the pixels of a (possibly nested)
+    subsurface.
+    """
+    parent = surface.get_parent()
+    while parent is not None:
+        surface = parent
+        parent = surface.get_parent()
+    return surface
+
+
+class SurfaceRegistry(object):
+    """
+    Tracks live surfaces by category and owner.  A freed surface's
+    weakref callback only queues it in freed, as it can run whenever the
+    garbage collector does, even inside track; queued surfaces are taken
+    out of the entries the next time they or the total are read.
+    """
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.entries = {}
+        self.caches = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.over_budget = False
+        self.lock = threading.Lock()
+        self.freed = deque()
+
+    @property
+    def total(self):
+        with self.lock:
+            self.forget_freed()
+            return self.bytes
+
+    def forget_freed(self):
+        """
+        Drop the entries of freed surfaces.  Called with the lock held.
+        """
+        while self.freed:
+            key, ref = self.freed.popleft()
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self.entries[key]
+                self.bytes -= entry[3]
+
+    def track(self, surface, category, owner):
+        """
+        Count a surface until it is freed.  A surface that is already
+        tracked keeps its first category and owner.
+        """
+        image, surface = surface, root_surface(surface)
+        key = id(surface)
+
+        def forget(ref):
+            self.freed.append((key, ref))
+
+        size = surface_bytes(surface)
+        with self.lock:
+            self.forget_freed()
+            previous = self.entries.get(key)
+            if previous is None or previous[0]() is not surface:
+                self.entries[key] = (weakref.ref(surface, forget), category, owner, size)
+                self.bytes += size
+        return image
+
+    def track_all(self, images, category, owner):
+        """
+        Track every surface in a (possibly nested) list or dict of images,
+        skipping anything else in it.
+        """
+        if isinstance(images, dict):
+            images = images.values()
+        for image in images:
+            if isinstance(image, (dict, list, tuple)):
+                self.track_all(image, category, owner)
+            elif isinstance(image, pg.Surface):
+                self.track(image, category, owner)
+
+    def add_cache(self, name, evict, owner=None):
+        """
+        Register a function that drops a cache of surfaces that can be
+        rebuilt.  It returns whether it freed anything.
+        """
+        self.caches[name] = (evict, owner)
+
+    def totals(self, by_owner=False):
+        """
+        Return an OrderedDict of category (or (category, owner)) to
+        [surface count, bytes], largest first.
+        """
+        totals = {}
+        with self.lock:
+            self.forget_freed()
+            entries = list(self.entries.values())
+        for ref, category, owner, size in entries:
+            key = (category, owner) if by_owner else category
+            total = totals.setdefault(key, [0, 0])
+            total[0] += 1
+            total[1] += size
+        return OrderedDict(sorted(totals.items(), key=lambda item: -item[1][1]))
+
+    def enforce(self, keep=()):
+        """
+        Evict caches, except those owned by anything in keep, until the
+        total is within budget.  Returns the names of the caches evicted.
+        """
+        evicted = []
+        if not self.budget or self.total <= self.budget:
+            self.over_budget = False
+            return evicted
+        for name, (evict, owner) in list(self.caches.items()):
+            if owner is not None and any(owner is kept for kept in keep):
+                continue
+            if evict():
+                evicted.append(name)
+                self.evictions += 1
+                # sprites hold their state methods, so free them from cycles too
+                gc.collect()
+                if self.total <= self.budget:
+                    break
+        if self.total > self.budget and not self.over_budget:
+            warnings.warn('Surface memory at {:.1f} MB is over the {:.1f} MB budget, '
+                          'with nothing left to evict'.format(self.total / MB,
+                                                              self.budget / MB),
+                          RuntimeWarning)
+        self.over_budget = self.total > self.budget
+        return evicted
+
+    def format_stats(self, limit=6):
+        """
+        Return short lines of the largest categories, for the overlay.
+        """
+        budget = ' / {:.1f}'.format(self.budget / MB) if self.budget else ''
+        lines = ['{:<16}{:>8.1f}{}'.format('surface MB', self.total / MB, budget)]
+        for category, (count, size) in list(self.totals().items())[:limit]:
+            lines.append('{:<16}{:>8.1f}{:>8}'.format(category, size / MB, count))
+        return lines
+
+    def report(self):
+        """
+        Return lines with the totals of every category and owner.
+        """
+        lines = ['{:<10}{:<28}{:>8}{:>12}'.format('category', 'owner', 'count', 'MB')]
+        for (category, owner), (count, size) in self.totals(by_owner=True).items():
+            lines.append('{:<10}{:<28}{:>8}{:>12.2f}'.format(category, owner, count,
+                                                            size / MB))
+        lines.append('{:<38}{:>8}{:>12.2f}'.format('total', len(self.entries),
+                                                  self.total / MB))
+        if self.budget:
+            lines.append('budget {:.1f} MB, {} cache evictions'.format(self.budget / MB,
+                                                                       self.evictions))
+        return lines
+
+
+REGISTRY = SurfaceRegistry()
+
+
+def track(surface, category, owner):
+    """
+    Count a surface in the registry until it is freed, and return it:
+
+        self.map_image = memory.track(self.renderer.make_map(), 'map', self.name)
+    """
+    return REGISTRY.track(surface, category, owner)
+
+
+def track_all(images, category, owner):
+    REGISTRY.track_all(images, category, owner)
+    return images
+
+
+def add_cache(name, evict, owner=None):
+    REGISTRY.add_cache(name, evict, owner)
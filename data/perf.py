@@ -0,0 +1,305 @@
+"""
+Frame timing instrumentation.  Control and the states wrap each phase of
+a frame in perf.phase(name); when the profiler is enabled the time spent
+in each phase is kept in a fixed-size ring buffer per phase.
+
+For offline analysis, the tracer records phases and any other code
+wrapped in perf.span(name) as Chrome trace events (load the file in
+chrome://tracing or ui.perfetto.dev).
+"""
+
+from __future__ import division
+import array
+import atexit
+import json
+import os
+import threading
+import timeit
+from collections import OrderedDict
+
+
+def percentile(sorted_values, percent):
+    """
+    Return the value below which the given percent of a sorted list falls.
+    """
+    if not sorted_values:
+        return 0.0
+    index = int(round((len(sorted_values) - 1) * percent / 100))
+    return sorted_values[index]
+
+
+class RingBuffer(object):
+    """
+    Fixed-size buffer of floats that overwrites its oldest value when full.
+    """
+    def __init__(self, size):
+        self.values = array.array('d', [0.0] * size)
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+
+    def items(self):
+        return self.values[:self.count]
+
+
+class NullPhase(object):
+    """
+    Context manager that does nothing, used while profiling is off.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class PhaseTimer(object):
+    """
+    Context manager adding the time spent inside it to a profiler phase.
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = timeit.default_timer() - self.start
+        totals = self.profiler.frame_totals
+        totals[self.name] = totals.get(self.name, 0.0) + elapsed
+        return False
+
+
+class FrameProfiler(object):
+    """
+    Collects per-phase frame timings.  Phase times within a frame are
+    summed, and at the end of each frame pushed into that phase's ring
+    buffer (phases that didn't run that frame record zero).
+    """
+    def __init__(self, size=300):
+        self.size = size
+        self.enabled = False
+        self.buffers = OrderedDict()
+        self.timers = {}
+        self.frame_totals = {}
+        self.frame_start = 0.0
+        self.reset()
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        if name not in self.buffers:
+            self.buffers[name] = RingBuffer(self.size)
+        try:
+            return self.timers[name]
+        except KeyError:
+            timer = self.timers[name] = PhaseTimer(self, name)
+            return timer
+
+    def begin_frame(self):
+        self.frame_totals = {}
+        self.frame_start = timeit.default_timer()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frame_totals['frame'] = timeit.default_timer() - self.frame_start
+        for name, buffer in self.buffers.items():
+            buffer.append(self.frame_totals.get(name, 0.0))
+
+    def reset(self):
+        self.buffers.clear()
+        self.buffers['frame'] = RingBuffer(self.size)
+        self.frame_totals = {}
+
+    def stats(self):
+        """
+        Return a list of (phase, average, p99, worst) in milliseconds.
+        """
+        stats = []
+        for name, buffer in self.buffers.items():
+            values = sorted(buffer.items())
+            if not values:
+                continue
+            average = 1000 * sum(values) / len(values)
+            stats.append((name, average,
+                          1000 * percentile(values, 99), 1000 * values[-1]))
+        return stats
+
+    def format_stats(self):
+        lines = ['{:<16}{:>8}{:>8}{:>8}'.format('phase ms', 'avg', 'p99', 'max')]
+        for name, average, p99, worst in self.stats():
+            lines.append('{:<16}{:>8.2f}{:>8.2f}{:>8.2f}'.format(name, average, p99, worst))
+        return lines
+
+
+class Overlay(object):
+    """
+    Draws the profiler's rolling statistics, and the surface memory
+    totals when given a memory registry and the quality settings when
+    given a quality controller, in the corner of the screen.
+    The text is only rebuilt every refresh_frames frames.
+    """
+    def __init__(self, profiler, registry=None, refresh_frames=30):
+        self.profiler = profiler
+        self.registry = registry
+        self.quality = None
+        self.refresh_frames = refresh_frames
+        self.frame_count = 0
+        self.lines = []
+        self.font = 'Fixedsys500c'
+        self.font_size = 14
+
+    def draw(self, surface):
+        from . import fonts
+
+        if self.frame_count % self.refresh_frames == 0:
+            self.lines = self.profiler.format_stats()
+            if self.registry is not None:
+                self.lines.extend(self.registry.format_stats())
+            if self.quality is not None:
+                self.lines.extend(self.quality.format_stats())
+        self.frame_count += 1
+
+        font = fonts.get_font(self.font, self.font_size)
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in self.lines) + 10
+        height = line_height * len(self.lines) + 10
+        surface.fill((0, 0, 0), (0, 0, width, height))
+        for i, line in enumerate(self.lines):
+            topleft = 5, 5 + i * line_height
+            fonts.draw_glyphs(surface, line, topleft, self.font, self.font_size)
+
+
+class TraceSpan(object):
+    """
+    Context manager recording a complete ("X") trace event, optionally
+    wrapping another context manager such as a profiler phase.
+    """
+    def __init__(self, tracer, name, inner=NULL_PHASE):
+        self.tracer = tracer
+        self.name = name
+        self.inner = inner
+        self.start = 0.0
+
+    def __enter__(self):
+        self.inner.__enter__()
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *args):
+        end = timeit.default_timer()
+        self.tracer.add_span(self.name, self.start, end)
+        return self.inner.__exit__(*args)
+
+
+class Tracer(object):
+    """
+    Records spans as Chrome trace events.  Events are buffered in memory
+    and written out whenever max_events are pending, when stop() is
+    called, and at interpreter exit.  Spans come from loading threads as
+    well as the main one, so the buffer and the file are only touched
+    under lock.
+    """
+    def __init__(self, max_events=10000):
+        self.max_events = max_events
+        self.enabled = False
+        self.events = []
+        self.file = None
+        self.first_event = True
+        self.thread_names = {}
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.exit_registered = False
+
+    def start(self, path):
+        self.stop()
+        with self.lock:
+            self.file = open(path, 'w')
+            self.file.write('[\n')
+            self.first_event = True
+            self.thread_names = {}
+            self.enabled = True
+            if not self.exit_registered:
+                atexit.register(self.stop)
+                self.exit_registered = True
+
+    def stop(self):
+        with self.lock:
+            if self.file is None:
+                return
+            self.enabled = False
+            self.write_events()
+            self.file.write('\n]\n')
+            self.file.close()
+            self.file = None
+
+    def span(self, name, inner=NULL_PHASE):
+        if not self.enabled:
+            return inner
+        return TraceSpan(self, name, inner)
+
+    def add_span(self, name, start, end):
+        thread = threading.current_thread()
+        tid = thread.ident
+        event = {'name': name, 'ph': 'X',
+                 'ts': start * 1000000, 'dur': (end - start) * 1000000,
+                 'pid': self.pid, 'tid': tid}
+        with self.lock:
+            if tid not in self.thread_names:
+                self.thread_names[tid] = thread.name
+                self.events.append({'name': 'thread_name', 'ph': 'M',
+                                    'pid': self.pid, 'tid': tid,
+                                    'args': {'name': thread.name}})
+            self.events.append(event)
+            if len(self.events) >= self.max_events:
+                self.write_events()
+
+    def flush(self):
+        with self.lock:
+            self.write_events()
+
+    def write_events(self):
+        """
+        Write out the pending events.  Called with the lock held.
+        """
+        if self.file is None:
+            return
+        events, self.events = self.events, []
+        for event in events:
+            if not self.first_event:
+                self.file.write(',\n')
+            self.file.write(json.dumps(event))
+            self.first_event = False
+        self.file.flush()
+
+
+PROFILER = FrameProfiler()
+TRACER = Tracer()
+
+
+def phase(name):
+    """
+    Time a phase of the current frame, and trace it if tracing is on:
+
+        with perf.phase('player'):
+            self.player.update(keys, current_time, dt)
+    """
+    return TRACER.span(name, PROFILER.phase(name))
+
+
+def span(name):
+    """
+    Trace a block of code without adding it to the frame profile.
+    """
+    return TRACER.span(name)
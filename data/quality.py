@@ -0,0 +1,107 @@
+"""
+Adaptive quality.  Game code reads its quality settings from SETTINGS;
+each setting is a lever with a list of values from best looking to
+cheapest.  When Control has a QualityController, it feeds it every
+frame's work time, and the controller pulls levers one step at a time
+while frames run over budget, and releases them, last pulled first,
+once there is plenty of headroom again.
+"""
+
+from __future__ import division
+from collections import OrderedDict
+from . import perf
+
+SETTINGS = {}
+LEVERS = OrderedDict()
+
+
+def add_lever(name, values):
+    """
+    Register a setting with its values, best looking first, and set it
+    to the first.  Levers are pulled in the order they were added.
+    """
+    LEVERS[name] = list(values)
+    SETTINGS[name] = values[0]
+
+
+# blend the player's bouncy and damage tints
+add_lever('tint', [True, False])
+# update (animate) enemies out of view only every this many ticks
+add_lever('enemy interval', [1, 2, 4])
+# multiply enemy and item box animation frame times by this
+add_lever('animation scale', [1, 2])
+# draw levels at this fraction of the screen's resolution, then scale up
+add_lever('render scale', [1, 0.75, 0.5])
+
+
+class QualityController(object):
+    """
+    Watches a rolling window of frame times against a budget in seconds.
+    A lever is pulled when the window's p90 goes over budget, and
+    released when it has been under headroom times the budget for
+    raise_frames frames.  The window starts again after every change,
+    so each setting is judged on frames drawn with it.
+    """
+    def __init__(self, budget, window=30, headroom=0.6, raise_frames=180):
+        self.budget = budget
+        self.window = window
+        self.headroom = headroom
+        self.raise_frames = raise_frames
+        self.frames = perf.RingBuffer(window)
+        self.frames_since_change = 0
+        self.pulled = []
+        self.changes = 0
+
+    def add_frame(self, frame_time):
+        """
+        Record one frame's work time and adjust quality if needed.
+        """
+        self.frames.append(frame_time)
+        self.frames_since_change += 1
+        if self.frames.count < self.window:
+            return
+        p90 = perf.percentile(sorted(self.frames.items()), 90)
+        if p90 > self.budget:
+            self.lower()
+        elif (p90 < self.budget * self.headroom and
+              self.frames_since_change >= self.raise_frames):
+            self.raise_quality()
+
+    def lower(self):
+        """
+        Pull the first lever that isn't at its cheapest.
+        """
+        for name, values in LEVERS.items():
+            index = values.index(SETTINGS[name])
+            if index < len(values) - 1:
+                SETTINGS[name] = values[index + 1]
+                self.pulled.append(name)
+                self.changed()
+                return True
+        return False
+
+    def raise_quality(self):
+        """
+        Release the lever pulled last.
+        """
+        if not self.pulled:
+            return False
+        name = self.pulled.pop()
+        values = LEVERS[name]
+        SETTINGS[name] = values[values.index(SETTINGS[name]) - 1]
+        self.changed()
+        return True
+
+    def changed(self):
+        self.changes += 1
+        self.frames = perf.RingBuffer(self.window)
+        self.frames_since_change = 0
+
+    def format_stats(self):
+        """
+        Return short lines of the current settings, for the overlay.
+        """
+        lines = ['{:<16}{:>8}'.format('quality', '-{}'.format(len(self.pulled)))]
+        for name in LEVERS:
+            lines.append('{:<16}{:>8}'.format(name, str(SETTINGS[name])))
+        return lines
@@ -0,0 +1,130 @@
+"""
+Record the player's input so a run can be replayed exactly, e.g. headless
+for before/after performance comparisons.
+
+A recording holds the RNG seed and start state, then for every frame the
+clock reading (as the change in milliseconds since the previous frame),
+the key events and the keys held down.  All of it is packed with struct:
+
+    header:  '<4sBIB' magic, version, seed, length of start state name,
+             followed by the name itself
+    frame:   '<dB' clock delta, number of events
+             '<BI' per event: 0 for KEYDOWN or 1 for KEYUP, key
+             '<B'  number of keys held
+             '<I'  per held key
+
+Keys are always keycodes (pg.K_*), which need 32 bits on pygame 2.
+"""
+
+import random
+import struct
+import pygame as pg
+
+MAGIC = b'BSRP'
+VERSION = 2
+
+HEADER = struct.Struct('<4sBIB')
+FRAME = struct.Struct('<dB')
+EVENT = struct.Struct('<BI')
+COUNT = struct.Struct('<B')
+KEY = struct.Struct('<I')
+
+EVENT_TYPES = (pg.KEYDOWN, pg.KEYUP)
+
+# pg.key.get_pressed() is indexed by scancode on pygame 2, though it can
+# still be looked up by keycode, so held keys are found by keycode.
+KEYCODES = sorted(set(getattr(pg, name) for name in dir(pg)
+                      if name.startswith('K_') and name != 'K_LAST'))
+
+
+class KeyState(object):
+    """
+    Stand-in for pg.key.get_pressed() built from a set of held keys.
+    """
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return 1 if key in self.pressed else 0
+
+
+def pressed_keys(keys):
+    """
+    Return the keys held down in a pg.key.get_pressed() or KeyState.
+    """
+    if isinstance(keys, KeyState):
+        return sorted(keys.pressed)
+    return [key for key in KEYCODES if keys[key]]
+
+
+class Recorder(object):
+    """
+    Writes a recording frame by frame.
+    """
+    def __init__(self, path, start_state, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        random.seed(seed)
+        name = start_state.encode('utf-8')
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, len(name)))
+        self.file.write(name)
+        self.last_ticks = 0.0
+
+    def add_frame(self, events, keys, ticks):
+        key_events = [event for event in events if event.type in EVENT_TYPES]
+        held = pressed_keys(keys)
+        parts = [FRAME.pack(ticks - self.last_ticks, len(key_events))]
+        for event in key_events:
+            parts.append(EVENT.pack(EVENT_TYPES.index(event.type), event.key))
+        parts.append(COUNT.pack(len(held)))
+        parts.extend(KEY.pack(key) for key in held)
+        self.file.write(b''.join(parts))
+        self.last_ticks = ticks
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class Replay(object):
+    """
+    Reads a recording back one frame at a time.  Reseeds the random
+    module with the recorded seed when opened.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        magic, version, self.seed, length = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} recording'.format(path, VERSION))
+        self.offset = HEADER.size
+        self.start_state = str(self.data[self.offset:self.offset + length].decode('utf-8'))
+        self.offset += length
+        self.ticks = 0.0
+        random.seed(self.seed)
+
+    @property
+    def finished(self):
+        return self.offset >= len(self.data)
+
+    def next_frame(self):
+        """
+        Return the next frame's (events, keys, ticks).
+        """
+        delta, event_count = FRAME.unpack_from(self.data, self.offset)
+        self.offset += FRAME.size
+        events = []
+        for i in range(event_count):
+            event_type, key = EVENT.unpack_from(self.data, self.offset)
+            self.offset += EVENT.size
+            events.append(pg.event.Event(EVENT_TYPES[event_type], key=key))
+        key_count, = COUNT.unpack_from(self.data, self.offset)
+        self.offset += COUNT.size
+        held = []
+        for i in range(key_count):
+            held.append(KEY.unpack_from(self.data, self.offset)[0])
+            self.offset += KEY.size
+        self.ticks += delta
+        return events, KeyState(held), self.ticks
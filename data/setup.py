@@ -4,18 +4,52 @@ creates dictionaries of resources.
 """
 
 import os
+import threading
+import warnings
 import pygame as pg
-from . import tools
+from . import tools, memory, textures
 
 GAME = 'BEGIN GAME'
 ORIGINAL_CAPTION = 'Bouncy Shoes'
 
+
+def init_threads():
+    """
+    pygame's mixer calls back into Python from SDL's audio thread when a
+    sound finishes.  Python 2 only sets up thread support when the first
+    thread is started, so start one before any sound can play.
+    """
+    thread = threading.Thread(target=lambda: None)
+    thread.start()
+    thread.join()
+
+
+init_threads()
 os.environ['SDL_VIDEO_CENTERED'] = '1'
 pg.init()
 pg.event.set_allowed([pg.KEYDOWN, pg.KEYUP, pg.QUIT])
 pg.display.set_caption(ORIGINAL_CAPTION)
-SCREEN = pg.display.set_mode((800, 608))
+# the dummy driver used for headless runs defaults to an 8-bit palette
+DEPTH = 32 if os.environ.get('SDL_VIDEODRIVER') == 'dummy' else 0
+# the game is drawn at 800x608 and scaled to a window of BOUNCY_WINDOW, 'WxH'
+WINDOW = os.environ.get('BOUNCY_WINDOW')
+if WINDOW:
+    WINDOW = tuple(int(n) for n in WINDOW.lower().split('x'))
+DISPLAY_OPTIONS = ((800, 608), WINDOW or None, 'BOUNCY_FULLSCREEN' in os.environ,
+                   'BOUNCY_SMOOTH' in os.environ, DEPTH)
+# BOUNCY_RENDERER is 'texture', or 'software' for the SDL2 software renderer
+RENDERER = os.environ.get('BOUNCY_RENDERER', 'surface')
+if RENDERER != 'surface' and not textures.AVAILABLE:
+    warnings.warn(textures.UNAVAILABLE + ', drawing on surfaces', RuntimeWarning)
+    RENDERER = 'surface'
+if RENDERER == 'surface':
+    DISPLAY = tools.Display(*DISPLAY_OPTIONS)
+else:
+    DISPLAY = textures.TextureDisplay(*DISPLAY_OPTIONS, software=RENDERER == 'software')
+SCREEN = DISPLAY.screen
 SCREEN_RECT = SCREEN.get_rect()
+memory.track(SCREEN, 'display', 'screen')
+memory.track(DISPLAY.window, 'display', 'window')
 
 FONTS = tools.load_all_fonts(os.path.join('resources', 'fonts'))
 MUSIC = tools.load_all_music(os.path.join('resources', 'music'))
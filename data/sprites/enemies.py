@@ -1,20 +1,25 @@
 import pygame as pg
-from .. import setup, tools
+from .. import setup, tools, memory, quality
 from .. import constants as c
 
 
 class Enemy(pg.sprite.Sprite):
     """
-    Basic enemy for game.
+    Basic enemy for game.  With render off, the images are RectImages
+    shared by every render-free enemy of the same name.
     """
-    def __init__(self, x, y, name, direction=c.LEFT):
+    rect_image_dicts = {}
+    snapshot_attributes = ('state', 'direction', 'index', 'timer', 'x_vel', 'y_vel',
+                           'death_group', 'image', 'image_list')
+
+    def __init__(self, x, y, name, direction=c.LEFT, render=True):
         super(Enemy, self).__init__()
+        self.render = render
         self.state_dict = self.make_state_dict()
         self.state = c.FREE_FALL
-        self.walking_image_dict = self.make_walking_image_dict(name)
+        self.walking_image_dict, self.death_image_dict = self.make_image_dicts(name)
         self.direction = direction
         self.image_list = self.walking_image_dict[self.direction]
-        self.death_image_dict = self.make_death_image_dict()
         self.index = 0
         self.timer = 0.0
         self.image = self.image_list[self.index]
@@ -34,6 +39,21 @@ class Enemy(pg.sprite.Sprite):
 
         return state_dict
 
+    def make_image_dicts(self, name):
+        """
+        Return the walking and death image dicts, as RectImages when not
+        rendering.
+        """
+        if not self.render and name in Enemy.rect_image_dicts:
+            return Enemy.rect_image_dicts[name]
+
+        image_dicts = [self.make_walking_image_dict(name), self.make_death_image_dict()]
+        if not self.render:
+            image_dicts = Enemy.rect_image_dicts[name] = tools.make_rect_images(image_dicts)
+        else:
+            memory.track_all(image_dicts, 'sprites', name)
+        return image_dicts
+
     def make_walking_image_dict(self, name):
         """
         Make the dictionary of the two
@@ -71,6 +91,12 @@ class Enemy(pg.sprite.Sprite):
         state_function = self.state_dict[self.state]
         state_function(current_time, dt)
 
+    def snapshot(self):
+        return tools.snapshot_sprite(self, self.snapshot_attributes)
+
+    def restore(self, snapshot):
+        tools.restore_sprite(self, self.snapshot_attributes, snapshot)
+
     def walking_state(self, current_time, dt):
         """
         Update enemy while it is walking.
@@ -83,7 +109,7 @@ class Enemy(pg.sprite.Sprite):
         """
         Animate sprite.
         """
-        if (current_time - self.timer) > 300:
+        if (current_time - self.timer) > 300 * quality.SETTINGS['animation scale']:
             self.timer = current_time
             if self.index < (len(self.image_list) - 1):
                 self.index += 1
@@ -4,22 +4,37 @@ Main controllable player.
 from __future__ import division
 import copy
 import pygame as pg
-from .. import tools, setup
+from .. import tools, setup, memory, quality
 from .. import constants as c
 
+# on a textured display every new image is uploaded as a texture, so there
+# tints are made for alphas in steps of this, and kept.  drawn on surfaces
+# they are made each frame at the exact alpha.
+TEXTURE_TINT_STEP = 15
+
 
 class Player(pg.sprite.Sprite):
     """
-    User controlled player.
+    User controlled player.  With render off, the images are RectImages
+    shared by every render-free player, and no tinting is done.  On a
+    textured display tinted jumping images are kept in tints, so each is
+    made and uploaded once.
     """
-    def __init__(self, x, y, level):
+    rect_image_dicts = None
+    snapshot_attributes = ('state', 'direction', 'index', 'timer', 'bouncy_timer',
+                           'x_vel', 'y_vel', 'tint_alpha', 'damage_alpha', 'max_speed',
+                           'allow_jump', 'damaged', 'image', 'image_list')
+
+    def __init__(self, x, y, level, render=True):
         super(Player, self).__init__()
         self.get_image = tools.get_image
+        self.render = render
         self.state_dict = self.make_state_dict()
         self.state = c.STANDING
-        self.walking_image_dict = self.make_walking_image_dict()
-        self.standing_image_dict = self.make_standing_image_dict()
-        self.jumping_image_dict = self.make_jumping_image_dict()
+        image_dicts = self.make_image_dicts()
+        self.walking_image_dict = image_dicts[0]
+        self.standing_image_dict = image_dicts[1]
+        self.jumping_image_dict = image_dicts[2]
         self.index = 0
         self.timer = 0.0
         self.bouncy_timer = 0.0
@@ -31,7 +46,9 @@ class Player(pg.sprite.Sprite):
         self.max_speed = c.WALK_SPEED
         self.allow_jump = False
         self.damaged = False
+        self.image_list = self.walking_image_dict[self.direction]
         self.image = self.standing_image_dict[self.direction]
+        self.tints = {}
         self.rect = self.image.get_rect(x=x, bottom=y)
         self.level_bottom = level.level_rect.bottom
 
@@ -153,10 +170,8 @@ class Player(pg.sprite.Sprite):
         """
         Fade a color tint based on player height.
         """
-        self.image = copy.copy(self.jumping_image_dict[self.direction])
-        tinted_image = copy.copy(self.image).convert_alpha()
-        tinted_image.fill((0, 255, 0, self.tint_alpha), special_flags=pg.BLEND_RGBA_MULT)
-        self.image.blit(tinted_image, (0, 0))
+        if self.render and quality.SETTINGS['tint']:
+            self.image = self.get_tint((0, 255, 0), self.tint_alpha)
 
         if self.y_vel <= 0:
             percent = (self.y_vel / c.START_JUMP_VEL)
@@ -173,14 +188,49 @@ class Player(pg.sprite.Sprite):
         Turn red tint when damaged.
         """
         if self.damaged:
-            self.image = copy.copy(self.jumping_image_dict[self.direction])
-            tinted_image = copy.copy(self.image).convert_alpha()
-            tinted_image.fill((255, 0, 0, self.damage_alpha), special_flags=pg.BLEND_RGBA_MULT)
-            self.image.blit(tinted_image, (0, 0))
+            if self.render and quality.SETTINGS['tint']:
+                self.image = self.get_tint((255, 0, 0), self.damage_alpha)
             self.damage_alpha -= 5
             if self.damage_alpha < 0:
                 self.damage_alpha = 0
 
+    def get_tint(self, color, alpha):
+        """
+        Return the jumping image tinted with color at alpha.  On a textured
+        display alpha is rounded down to a TEXTURE_TINT_STEP and the image
+        is kept in tints.
+        """
+        textured = setup.RENDERER != 'surface'
+        if textured:
+            alpha = alpha // TEXTURE_TINT_STEP * TEXTURE_TINT_STEP
+            key = color, self.direction, alpha
+            if key in self.tints:
+                return self.tints[key]
+        image = copy.copy(self.jumping_image_dict[self.direction])
+        tinted_image = copy.copy(image).convert_alpha()
+        tinted_image.fill(color + (alpha,), special_flags=pg.BLEND_RGBA_MULT)
+        image.blit(tinted_image, (0, 0))
+        memory.track(image, 'tint', 'player')
+        if textured:
+            self.tints[key] = image
+        return image
+
+    def make_image_dicts(self):
+        """
+        Return the walking, standing and jumping image dicts, as
+        RectImages when not rendering.
+        """
+        if not self.render and Player.rect_image_dicts is not None:
+            return Player.rect_image_dicts
+
+        image_dicts = [self.make_walking_image_dict(),
+                       self.make_standing_image_dict(),
+                       self.make_jumping_image_dict()]
+        if not self.render:
+            image_dicts = Player.rect_image_dicts = tools.make_rect_images(image_dicts)
+        else:
+            memory.track_all(image_dicts, 'sprites', 'player')
+        return image_dicts
 
     def make_walking_image_dict(self):
         """
@@ -250,6 +300,12 @@ class Player(pg.sprite.Sprite):
         state_function = self.state_dict[self.state]
         state_function(keys, current_time, dt)
 
+    def snapshot(self):
+        return tools.snapshot_sprite(self, self.snapshot_attributes)
+
+    def restore(self, snapshot):
+        tools.restore_sprite(self, self.snapshot_attributes, snapshot)
+
     def enter_walking(self):
         """
         Transition into walking state.
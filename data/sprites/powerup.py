@@ -1,17 +1,22 @@
 import pygame as pg
-from .. import tools, setup
+from .. import tools, setup, memory, quality
 from .. import constants as c
 
 
 class ItemBox(pg.sprite.Sprite):
     """
-    Item box for powerups.
+    Item box for powerups.  With render off, the images are RectImages
+    shared by every render-free item box.
     """
-    def __init__(self, x, y):
+    rect_images = None
+    snapshot_attributes = ('state', 'index', 'timer', 'first_half', 'y_vel', 'image')
+
+    def __init__(self, x, y, render=True):
         super(ItemBox, self).__init__()
         self.name = 'item box'
         self.get_image = tools.get_image
-        self.image_list = self.make_image_list()
+        self.render = render
+        self.image_list, self.opened_image = self.make_images()
         self.index = 0
         self.image = self.image_list[self.index]
         self.rect = self.image.get_rect(x=x, bottom=y)
@@ -21,7 +26,21 @@ class ItemBox(pg.sprite.Sprite):
         self.first_half = True
         self.y_vel = 0
         self.start_y = y
-        self.opened_image = self.make_opened_image()
+
+    def make_images(self):
+        """
+        Return the animation images and the opened image, as RectImages
+        when not rendering.
+        """
+        if not self.render and ItemBox.rect_images is not None:
+            return ItemBox.rect_images
+
+        images = [self.make_image_list(), self.make_opened_image()]
+        if not self.render:
+            images = ItemBox.rect_images = tools.make_rect_images(images)
+        else:
+            memory.track_all(images, 'sprites', self.name)
+        return images
 
     def make_image_list(self):
         """
@@ -63,6 +82,12 @@ class ItemBox(pg.sprite.Sprite):
         state_function = self.state_dict[self.state]
         state_function(current_time)
 
+    def snapshot(self):
+        return tools.snapshot_sprite(self, self.snapshot_attributes)
+
+    def restore(self, snapshot):
+        tools.restore_sprite(self, self.snapshot_attributes, snapshot)
+
     def normal_state(self, current_time):
         """
         Update when box in normal state.
@@ -72,24 +97,25 @@ class ItemBox(pg.sprite.Sprite):
 
     def animate(self, current_time):
         self.image = self.image_list[self.index]
+        scale = quality.SETTINGS['animation scale']
 
         if self.first_half:
             if self.index == 0:
-                if (current_time - self.timer) > 375:
+                if (current_time - self.timer) > 375 * scale:
                     self.index += 1
                     self.timer = current_time
             elif self.index < 2:
-                if (current_time - self.timer) > 125:
+                if (current_time - self.timer) > 125 * scale:
                     self.index += 1
                     self.timer = current_time
             elif self.index == 2:
-                if (current_time - self.timer) > 125:
+                if (current_time - self.timer) > 125 * scale:
                     self.index -= 1
                     self.first_half = False
                     self.timer = current_time
         else:
             if self.index == 1:
-                if (current_time - self.timer) > 125:
+                if (current_time - self.timer) > 125 * scale:
                     self.index -= 1
                     self.first_half = True
                     self.timer = current_time
@@ -125,12 +151,24 @@ class ItemBox(pg.sprite.Sprite):
 
 class BouncyStar(pg.sprite.Sprite):
     """
-    Powerup to give our hero a bouncy power.
+    Powerup to give our hero a bouncy power.  Every star shares one image,
+    so its collision mask is made once and kept on the class.
     """
-    def __init__(self, x, y):
+    mask = None
+    rect_image = None
+    snapshot_attributes = ('state', 'y_vel')
+
+    def __init__(self, x, y, render=True):
         super(BouncyStar, self).__init__()
         self.name = 'bouncy star'
-        self.image = setup.GFX['star']
+        if BouncyStar.mask is None:
+            BouncyStar.mask = pg.mask.from_surface(setup.GFX['star'])
+        if render:
+            self.image = setup.GFX['star']
+        else:
+            if BouncyStar.rect_image is None:
+                BouncyStar.rect_image = tools.RectImage(setup.GFX['star'])
+            self.image = BouncyStar.rect_image
         self.rect = self.image.get_rect(centerx=x, bottom=y)
         self.y_vel = 0
         self.start_y = y
@@ -145,11 +183,8 @@ class BouncyStar(pg.sprite.Sprite):
         self.state = c.REVEALED
         self.rect.bottom = self.start_y
 
+    def snapshot(self):
+        return tools.snapshot_sprite(self, self.snapshot_attributes)
 
-
-
-
-
-
-
-
+    def restore(self, snapshot):
+        tools.restore_sprite(self, self.snapshot_attributes, snapshot)
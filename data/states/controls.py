@@ -2,23 +2,31 @@
 Main menu state
 """
 import pygame as pg
-from .. import tools, setup
+from .. import tools, setup, fonts
 from .. import constants as c
 from ..sprites import player
 
 class Controls(tools._State):
     def __init__(self):
         super(Controls, self).__init__()
+        self.level_rect = setup.SCREEN.get_rect()
+
+    def prepare(self):
+        """
+        Render the instructions and build the walking player.
+        """
+        text = 'Arrows for direction, a for jump, s for run'
+        text2 = 'Help 8-bit the Alien find his way to the magic door!'
+        self.prepared = {'text': fonts.render(text, c.MAIN_FONT, 22, c.WHITE),
+                         'text2': fonts.render(text2, c.MAIN_FONT, 22, c.WHITE),
+                         'player': player.Player(50, 400, self)}
 
     def startup(self, current_time, game_data):
         self.game_data = game_data
         self.next = c.LEVEL1
-        self.level_rect = setup.SCREEN.get_rect()
-        text = 'Arrows for direction, a for jump, s for run'
-        text2 = 'Help 8-bit the Alien find his way to the magic door!'
-        self.font = pg.font.Font(setup.FONTS[c.MAIN_FONT], 22)
-        self.rendered_text = self.font.render(text, 1, c.WHITE)
-        self.rendered_text2 = self.font.render(text2, 1, c.WHITE)
+        prepared = self.take_prepared()
+        self.rendered_text = prepared['text']
+        self.rendered_text2 = prepared['text2']
         location = self.level_rect.centerx, self.level_rect.y+150
         location2 = self.level_rect.centerx, self.level_rect.y+250
         self.text_rect = self.rendered_text.get_rect(center=location)
@@ -26,7 +34,7 @@ class Controls(tools._State):
         self.name = c.MAIN_MENU
         self.background = setup.GFX['spacebackground2']
         self.background_rect = self.background.get_rect(bottom=self.level_rect.bottom)
-        self.player = player.Player(50, 400, self)
+        self.player = prepared['player']
         self.player.state = c.AUTOWALK
 
     def update(self, surface, keys, current_time, dt):
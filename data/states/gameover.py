@@ -2,27 +2,33 @@
 Main menu state
 """
 import pygame as pg
-from .. import tools, setup
+from .. import tools, setup, fonts
 from .. import constants as c
 from ..sprites import player
 
 class GameOver(tools._State):
     def __init__(self):
         super(GameOver, self).__init__()
+        self.level_rect = setup.SCREEN.get_rect()
+
+    def prepare(self):
+        """
+        Render the game over text and build the walking player.
+        """
+        self.prepared = {'text': fonts.render('GAME OVER', 'alienleague', 60, c.WHITE),
+                         'player': player.Player(50, 400, self)}
 
     def startup(self, current_time, game_data):
         self.game_data = game_data
         self.next = c.MAIN_MENU
-        self.level_rect = setup.SCREEN.get_rect()
-        text = 'GAME OVER'
-        self.font = pg.font.Font(setup.FONTS['alienleague'], 60)
-        self.rendered_text = self.font.render(text, 1, c.WHITE)
+        prepared = self.take_prepared()
+        self.rendered_text = prepared['text']
         location = self.level_rect.centerx, self.level_rect.y+150
         self.text_rect = self.rendered_text.get_rect(center=location)
         self.name = c.MAIN_MENU
         self.background = setup.GFX['spacebackground2']
         self.background_rect = self.background.get_rect(bottom=self.level_rect.bottom)
-        self.player = player.Player(50, 400, self)
+        self.player = prepared['player']
         self.player.state = c.AUTOWALK
         self.allow_input = False
         self.timer = current_time
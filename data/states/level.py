@@ -1,37 +1,92 @@
 """
 State for levels.
 """
+import random
+import weakref
 import pygame as pg
-from .. import tools, setup, tilerender, collision
+from .. import tools, setup, tilerender, collision, perf, memory, quality
 from .. import constants as c
 from ..sprites import player, powerup, enemies
 
+# no sprite moves further than this in one tick
+CULL_MARGIN = 128
+# corpses stamped into the map at once, the oldest are wiped past this
+MAX_BAKED_CORPSES = 64
+
 
 class Level(tools._State):
-    def __init__(self, name):
+    """
+    A level loaded from a tmx map.  With render off, it is a simulation
+    only: the tile images aren't loaded, the map isn't rendered, sprites
+    get RectImages instead of surfaces and nothing is drawn.
+
+    While the level isn't being played, its map and sprites are a cache
+    the memory budget can evict; prepare() loads them again.
+
+    Enemies that have died and landed never move again, so they are
+    stamped into map_image and dropped from the dead groups rather than
+    drawn every frame.  The map is wiped clean of them at startup.
+
+    The map and sprites are drawn straight to the screen, offset by the
+    viewport.  With the 'render scale' quality
+    setting below 1, the level is drawn
+    on the display's low resolution surface from a scaled copy of the map
+    and scaled copies of the sprite images, which are kept until the
+    scale changes or their originals are freed.
+    """
+    def __init__(self, name, render=True):
         super(Level, self).__init__()
         self.name = name
         self.tmx_map = setup.TMX[name]
+        self.render = render
+        self.renderer = None
+        self.player = None
+        self.baked = []
+        self.scaled_map = None
+        self.scaled_images = weakref.WeakKeyDictionary()
+        self.ticks = 0
+        self.active = False
+        self.fixed_step = True
+        self.previous_positions = {}
+        memory.add_cache('level ' + name, self.evict, self)
+
+    def prepare(self):
+        """
+        Load and render the map once, then build a fresh set of sprites
+        for the next startup.
+        """
+        if self.renderer is None:
+            self.renderer = tilerender.Renderer(self.tmx_map, self.render)
+            if self.render:
+                self.map_image = self.renderer.make_map()
+            self.level_rect = pg.Rect((0, 0), self.renderer.size)
+
+        if self.prepared is None:
+            self.prepared = {'player': self.make_player(),
+                             'sprites': self.make_sprites(),
+                             'blockers': self.make_blockers('blocker'),
+                             'enemy blockers': self.make_blockers('enemy blocker'),
+                             'item boxes': self.make_item_boxes(),
+                             'doors': self.make_doors()}
 
     def startup(self, current_time, game_data):
+        self.active = True
         self.game_data = game_data
         self.current_time = current_time
         self.state = c.NORMAL
-        self.renderer = tilerender.Renderer(self.tmx_map)
-        self.map_image = self.renderer.make_map()
-
-        self.viewport = self.make_viewport(self.map_image)
-        self.level_surface = self.make_level_surface(self.map_image)
-        self.level_rect = self.level_surface.get_rect()
-        self.player = self.make_player()
-        self.sprites = self.make_sprites()
-        self.blockers = self.make_blockers('blocker')
-        self.enemy_blockers = self.make_blockers('enemy blocker')
-        self.item_boxes = self.make_item_boxes()
-        self.stars = pg.sprite.Group()
-        self.doors = self.make_doors()
-        self.dead_enemy_group1 = pg.sprite.Group()
-        self.dead_enemy_group2 = pg.sprite.Group()
+        prepared = self.take_prepared()
+        self.set_baked([])
+
+        self.viewport = self.make_viewport()
+        self.player = prepared['player']
+        self.sprites = prepared['sprites']
+        self.blockers = prepared['blockers']
+        self.enemy_blockers = prepared['enemy blockers']
+        self.item_boxes = prepared['item boxes']
+        self.stars = tools.IndexedGroup()
+        self.doors = prepared['doors']
+        self.dead_enemy_group1 = tools.IndexedGroup()
+        self.dead_enemy_group2 = tools.IndexedGroup()
         self.collision_handler = collision.CollisionHandler(self.player,
                                                             self.sprites,
                                                             self.blockers,
@@ -43,60 +98,129 @@ class Level(tools._State):
                                                             self,
                                                             self.doors)
         self.state_dict = self.make_state_dict()
+        self.previous_positions = {}
         self.main_theme = setup.MUSIC['main_theme']
         if not pg.mixer.music.get_busy():
             pg.mixer.music.load(self.main_theme)
             pg.mixer.music.set_volume(0.4)
             pg.mixer.music.play(-1)
 
-    def make_viewport(self, map_image):
+    def cleanup(self):
+        self.active = False
+        return super(Level, self).cleanup()
+
+    def evict(self):
         """
-        Create the viewport to view the level through.
+        Drop the map, its images and the sprites, unless the level is
+        being played.  Returns whether anything was dropped.
         """
-        map_rect = map_image.get_rect()
-        return setup.SCREEN.get_rect(bottom=map_rect.bottom)
-
-    def make_level_surface(self, map_image):
+        if self.active or self.renderer is None:
+            return False
+        self.renderer = None
+        self.map_image = None
+        self.scaled_map = None
+        self.scaled_images.clear()
+        self.baked = []
+        self.prepared = None
+        if self.player is not None:
+            for group in self.snapshot_groups():
+                group.empty()
+            self.player = None
+            self.collision_handler = None
+            self.previous_positions = {}
+        return True
+
+    def snapshot(self):
+        """
+        Return the level's mutable state: the clock, viewport, game data,
+        the random module's state, and every moving sprite's attributes
+        and group.  Images are kept by reference, never copied.  A snapshot
+        can only be restored until the next startup, which builds new
+        sprites.
         """
-        Create the surface all images blit to.
+        groups = [[(sprite, sprite.snapshot()) for sprite in group]
+                  for group in self.snapshot_groups()]
+        return {'player': (self.player, self.player.snapshot()),
+                'groups': groups,
+                'current time': self.current_time,
+                'state': self.state,
+                'done': self.done,
+                'next': self.next,
+                'viewport': tuple(self.viewport),
+                'game data': dict(self.game_data),
+                'previous positions': dict(self.previous_positions),
+                'baked': list(self.baked),
+                'random': random.getstate()}
+
+    def restore(self, snapshot, game_data=None):
         """
-        map_rect = map_image.get_rect()
-        map_width = map_rect.width
-        map_height = map_rect.height
-        size = map_width, map_height
+        Put the level back as it was when snapshot was taken.  Sprites
+        made since then are dropped.  With game_data given, it is used
+        in place of the game data in the snapshot, e.g. to restart from
+        a checkpoint with the lives that are left.
+        """
+        player, player_snapshot = snapshot['player']
+        if player is not self.player:
+            raise ValueError('Snapshot was taken before the last startup')
+        player.restore(player_snapshot)
+        for group, sprites in zip(self.snapshot_groups(), snapshot['groups']):
+            group.empty()
+            for sprite, sprite_snapshot in sprites:
+                sprite.restore(sprite_snapshot)
+                group.add(sprite)
+
+        self.current_time = snapshot['current time']
+        self.state = snapshot['state']
+        self.done = snapshot['done']
+        self.next = snapshot['next']
+        self.viewport = pg.Rect(snapshot['viewport'])
+        game_data = dict(snapshot['game data'] if game_data is None else game_data)
+        self.game_data.clear()
+        self.game_data.update(game_data)
+        self.previous_positions = dict(snapshot['previous positions'])
+        self.set_baked(snapshot['baked'])
+        random.setstate(snapshot['random'])
+
+    def snapshot_groups(self):
+        """
+        Return the groups whose sprites can move, change or come and go.
+        """
+        return [self.sprites, self.dead_enemy_group1, self.dead_enemy_group2,
+                self.item_boxes, self.stars]
 
-        return pg.Surface(size).convert()
+    def make_viewport(self):
+        """
+        Create the viewport to view the level through.
+        """
+        return setup.SCREEN.get_rect(bottom=self.level_rect.bottom)
 
     def make_player(self):
         for object in self.renderer.tmx_data.getObjects():
-            properties = object.__dict__
-            if properties['name'] == 'player start point':
-                x = properties['x']
-                y = properties['y']
-                return player.Player(x, y, self)
+            if object.name == 'player start point':
+                x = object.x
+                y = object.y
+                return player.Player(x, y, self, self.render)
 
     def make_sprites(self):
-        sprite_group = pg.sprite.Group()
+        sprite_group = tools.IndexedGroup()
 
         for object in self.renderer.tmx_data.getObjects():
-            properties = object.__dict__
-            if properties['type'] == 'enemy':
-                name = properties['name']
-                x = properties['x']
-                y = properties['y']
-                sprite_group.add(enemies.Enemy(x, y, name))
+            if object.type == 'enemy':
+                name = object.name
+                x = object.x
+                y = object.y
+                sprite_group.add(enemies.Enemy(x, y, name, render=self.render))
 
         return sprite_group
 
     def make_doors(self):
-        sprite_group = pg.sprite.Group()
+        sprite_group = tools.OrderedGroup()
 
         for object in self.renderer.tmx_data.getObjects():
-            properties = object.__dict__
-            if properties['name'] == 'door':
-                name = properties['name']
-                x = properties['x']
-                y = properties['y']
+            if object.name == 'door':
+                name = object.name
+                x = object.x
+                y = object.y
                 sprite = pg.sprite.Sprite()
                 sprite.rect = pg.Rect(0, 0, 70, 70)
                 sprite.rect.x = x
@@ -111,12 +235,11 @@ class Level(tools._State):
         """
         Make the collideable blockers the player can collide with.
         """
-        blockers = pg.sprite.Group()
+        blockers = tools.OrderedGroup()
         for object in self.renderer.tmx_data.getObjects():
-            properties = object.__dict__
-            if properties['name'] == blocker_name:
-                x = properties['x']
-                y = properties['y'] - 70
+            if object.name == blocker_name:
+                x = object.x
+                y = object.y - 70
                 width = height = 70
                 blocker = pg.sprite.Sprite()
                 blocker.state = None
@@ -129,14 +252,13 @@ class Level(tools._State):
         """
         Make item box sprite group.
         """
-        item_boxes = pg.sprite.Group()
+        item_boxes = tools.IndexedGroup()
         for object in self.renderer.tmx_data.getObjects():
-            properties = object.__dict__
-            if properties['name'] == 'item box':
-                x = properties['x']
-                y = properties['y'] - 70
+            if object.name == 'item box':
+                x = object.x
+                y = object.y - 70
                 width = height = 70
-                box = powerup.ItemBox(x, y)
+                box = powerup.ItemBox(x, y, self.render)
                 item_boxes.add(box)
 
         return item_boxes
@@ -149,26 +271,97 @@ class Level(tools._State):
 
         return state_dict
 
-    def normal_mode(self, surface, keys, current_time, dt):
+    def normal_mode(self, keys, current_time, dt):
         """
         Update level normally.
         """
-        self.dead_enemy_group1.update(current_time, dt)
-        self.player.update(keys, current_time, dt)
-        self.dead_enemy_group2.update(current_time, dt)
-        self.sprites.update(current_time, dt)
-        self.item_boxes.update(current_time)
-        self.collision_handler.update(keys, current_time, dt)
-        self.viewport_update(dt)
-        self.delete_old_enemies()
-        self.draw_level(surface)
+        with perf.phase('dead groups'):
+            self.dead_enemy_group1.update(current_time, dt)
+        with perf.phase('player'):
+            self.player.update(keys, current_time, dt)
+        with perf.phase('dead groups'):
+            self.dead_enemy_group2.update(current_time, dt)
+        with perf.phase('enemies'):
+            self.update_enemies(current_time, dt)
+        with perf.phase('item boxes'):
+            self.item_boxes.update(current_time)
+        with perf.phase('collision'):
+            self.collision_handler.update(keys, current_time, dt)
+        with perf.phase('dead groups'):
+            self.bake_corpses()
+        with perf.phase('viewport'):
+            self.viewport_update(dt)
+            self.delete_old_enemies()
+
+    def update_enemies(self, current_time, dt):
+        """
+        Update the enemies.  With the 'enemy interval' quality setting
+        above 1, those out of view are only updated every that many
+        ticks, a different share of them each tick.  Enemy updates only
+        animate; they still move every tick.
+        """
+        interval = quality.SETTINGS['enemy interval']
+        if interval == 1:
+            self.sprites.update(current_time, dt)
+            return
+        self.ticks += 1
+        area = self.viewport.inflate(2 * CULL_MARGIN, 2 * CULL_MARGIN)
+        visible = self.sprites.sprites_in(area)
+        for sprite in visible:
+            sprite.update(current_time, dt)
+        visible = set(visible)
+        for sprite in self.sprites.sprite_list[self.ticks % interval::interval]:
+            if sprite not in visible:
+                sprite.update(current_time, dt)
 
     def update(self, surface, keys, current_time, dt):
         """
         Update state.
         """
         state_function = self.state_dict[self.state]
-        state_function(surface, keys, current_time, dt)
+        state_function(keys, current_time, dt)
+        self.draw_level(surface)
+
+    def step(self, keys, current_time, dt):
+        """
+        Advance the level one fixed tick, remembering where the moving
+        sprites were so draw() can interpolate.
+        """
+        self.previous_positions = self.get_positions()
+        state_function = self.state_dict[self.state]
+        state_function(keys, current_time, dt)
+
+    def draw(self, surface, interpolation):
+        """
+        Draw the level with moving sprites placed between their previous
+        and current tick positions.
+        """
+        if not self.render:
+            return
+        current_positions = self.get_positions()
+        viewport = self.viewport.copy()
+        for sprite, (x, y) in current_positions.items():
+            if sprite in self.previous_positions:
+                old_x, old_y = self.previous_positions[sprite]
+                sprite.rect.x = int(round(old_x + (x - old_x) * interpolation))
+                sprite.rect.y = int(round(old_y + (y - old_y) * interpolation))
+        self.viewport_update(0)
+
+        self.draw_level(surface)
+
+        for sprite, position in current_positions.items():
+            sprite.rect.topleft = position
+        self.viewport = viewport
+
+    def get_positions(self):
+        """
+        Return the positions of every sprite that can move.
+        """
+        positions = {self.player: self.player.rect.topleft}
+        for group in (self.sprites, self.item_boxes, self.stars):
+            for sprite in group:
+                positions[sprite] = sprite.rect.topleft
+        return positions
 
     def viewport_update(self, dt):
         """
@@ -180,16 +373,156 @@ class Level(tools._State):
 
     def draw_level(self, surface):
         """
-        Blit all images to screen.
+        Blit the map and the sprites in view straight to the screen,
+        or hand them to a textured display as a copy list.
+        """
+        if not self.render:
+            return
+        display = setup.DISPLAY
+        scale = quality.SETTINGS['render scale']
+        with perf.phase('draw'):
+            self.render_view()
+            if surface is setup.SCREEN and display.textured:
+                display.queue(self.map_image, self.viewport.copy(), self.screen_blits())
+                return
+            if scale != 1 and surface is setup.SCREEN:
+                self.draw_level_scaled(display.low_res(scale), scale)
+                return
+            surface.blit(self.map_image, (0, 0), self.viewport)
+            tools.blit_all(surface, self.screen_blits())
+
+    def render_view(self):
+        """
+        Render the parts of a chunked map coming into view, a margin
+        ahead of the viewport.
+        """
+        if self.renderer.chunked:
+            area = self.viewport.inflate(2 * CULL_MARGIN, 2 * CULL_MARGIN)
+            for rect in self.renderer.render_visible(self.map_image, area):
+                self.map_changed(rect)
+
+    def map_changed(self, rect):
+        """
+        Pass on a change to an area of map_image to the scaled map and
+        the display.
+        """
+        self.rescale_area(rect)
+        setup.DISPLAY.invalidate(self.map_image, rect)
+
+    def screen_blits(self):
+        """
+        Return visible_sprites() moved to screen positions.
+        """
+        x, y = self.viewport.topleft
+        return [(image, (rect.x - x, rect.y - y)) for image, rect in self.visible_sprites()]
+
+    def draw_level_scaled(self, surface, scale):
+        """
+        Draw the view at scale times its size.
+        """
+        map_image = self.get_scaled_map(scale)
+        x = int(self.viewport.x * scale)
+        y = int(self.viewport.y * scale)
+        surface.blit(map_image, (0, 0), pg.Rect((x, y), surface.get_size()))
+        scaled_image = self.get_scaled_image
+        tools.blit_all(surface, [(scaled_image(image, scale),
+                                  (int(rect.x * scale) - x, int(rect.y * scale) - y))
+                                 for image, rect in self.visible_sprites()])
+
+    def get_scaled_map(self, scale):
+        """
+        Return map_image scaled, making it the first time it is asked for
+        at this scale.
+        """
+        if self.scaled_map is not None:
+            map_image, map_scale, scaled = self.scaled_map
+            if map_image is self.map_image and map_scale == scale:
+                return scaled
+        # drop the old copy before making the new one
+        self.scaled_map = None
+        width, height = self.map_image.get_size()
+        size = int(width * scale), int(height * scale)
+        scaled = memory.track(setup.DISPLAY.scale(self.map_image, size), 'map',
+                              self.renderer.name)
+        self.scaled_map = self.map_image, scale, scaled
+        return scaled
+
+    def get_scaled_image(self, image, scale):
+        cached = self.scaled_images.get(image)
+        if cached is None or cached[0] != scale:
+            width, height = image.get_size()
+            size = max(1, int(width * scale)), max(1, int(height * scale))
+            cached = scale, setup.DISPLAY.scale(image, size)
+            self.scaled_images[image] = cached
+        return cached[1]
+
+    def rescale_area(self, rect):
+        """
+        Bring the scaled map up to date with an area of map_image that
+        changed.
+        """
+        if self.scaled_map is None or self.scaled_map[0] is not self.map_image:
+            return
+        map_image, scale, scaled = self.scaled_map
+        area = pg.Rect(int(rect.x * scale), int(rect.y * scale),
+                       int(rect.width * scale) + 2, int(rect.height * scale) + 2)
+        area = area.clip(scaled.get_rect())
+        source = pg.Rect(int(area.x / scale), int(area.y / scale),
+                         int(area.width / scale), int(area.height / scale))
+        source = source.clip(map_image.get_rect())
+        if area.width and area.height and source.width and source.height:
+            scaled.blit(setup.DISPLAY.scale(map_image.subsurface(source), area.size),
+                        area)
+
+    def visible_sprites(self):
+        """
+        Return (image, rect) for every sprite in view, bottom layer first.
+        Sprites are looked up in a margin around the viewport, as draw()
+        moves them back towards their previous tick after indexing.
+        """
+        area = self.viewport.inflate(2 * CULL_MARGIN, 2 * CULL_MARGIN)
+        blits = [(sprite.image, sprite.rect)
+                 for sprite in self.dead_enemy_group1.sprites_in(area)]
+        blits.append((self.player.image, self.player.rect))
+        for group in (self.dead_enemy_group2, self.sprites, self.stars, self.item_boxes):
+            blits.extend((sprite.image, sprite.rect) for sprite in group.sprites_in(area))
+        return blits
+
+    def bake_corpses(self):
+        """
+        Take the enemies lying dead on the ground out of the dead groups,
+        stamping them into the map.  Only the last MAX_BAKED_CORPSES
+        stay stamped.
+        """
+        corpses = []
+        for group in (self.dead_enemy_group1, self.dead_enemy_group2):
+            if group:
+                for sprite in group.sprites():
+                    if sprite.state == c.DEAD_ON_GROUND:
+                        sprite.kill()
+                        corpses.append((sprite.image, sprite.rect.copy()))
+        if corpses and self.render:
+            self.set_baked((self.baked + corpses)[-MAX_BAKED_CORPSES:])
+
+    def set_baked(self, corpses):
+        """
+        Change the (image, rect) corpses stamped into the map to the given
+        ones.  Corpses no longer wanted are wiped by redrawing the tiles
+        under them, then whatever they overlapped is stamped again.
         """
-        self.level_surface.blit(self.map_image, self.viewport, self.viewport)
-        self.dead_enemy_group1.draw(self.level_surface)
-        self.level_surface.blit(self.player.image, self.player.rect)
-        self.dead_enemy_group2.draw(self.level_surface)
-        self.sprites.draw(self.level_surface)
-        self.stars.draw(self.level_surface)
-        self.item_boxes.draw(self.level_surface)
-        surface.blit(self.level_surface, (0, 0), self.viewport)
+        if not self.render or corpses == self.baked:
+            return
+        corpses = list(corpses)
+        wiped = [rect for image, rect in self.baked if (image, rect) not in corpses]
+        added = [corpse for corpse in corpses if corpse not in self.baked]
+        for rect in wiped:
+            self.renderer.render_area(self.map_image, rect)
+        for image, rect in corpses:
+            if (image, rect) in added or rect.collidelist(wiped) != -1:
+                self.map_image.blit(image, rect)
+        for rect in wiped + [rect for image, rect in added]:
+            self.map_changed(rect)
+        self.baked = corpses
 
     def delete_old_enemies(self):
         for sprite in self.sprites:
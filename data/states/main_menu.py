@@ -2,7 +2,7 @@
 Main menu state
 """
 import pygame as pg
-from .. import tools, setup
+from .. import tools, setup, fonts
 from .. import constants as c
 from ..sprites import player
 
@@ -12,8 +12,7 @@ class Menu(tools._State):
         self.next = c.CONTROLS
         self.level_rect = setup.SCREEN.get_rect()
         text = 'BOUNCY SHOES'
-        self.font = pg.font.Font(setup.FONTS['alienleague'], 100)
-        self.rendered_text = self.font.render(text, 1, c.WHITE)
+        self.rendered_text = fonts.render(text, 'alienleague', 100, c.WHITE)
         location = self.level_rect.centerx, self.level_rect.y+150
         self.text_rect = self.rendered_text.get_rect(center=location)
         self.game_data = tools.create_game_data_dict()
@@ -0,0 +1,144 @@
+"""
+Texture display backend, on the SDL2 Renderer and Texture API pygame
+has in pygame._sdl2 (pygame 2 and later).  Surfaces are uploaded as
+textures the first time they are drawn and kept until the surface is
+freed, so images sprites keep, like animation frames and the player's
+cached tints, are uploaded once; a surface made anew every frame would
+be uploaded every frame.  The map is uploaded in CHUNK sized pieces, as
+renderers limit texture sizes.
+
+A level frame is a copy list: the viewport's area of the map and the
+sprites, which the renderer composites itself, on the GPU where there is
+one.  Other states still draw on screen, which is uploaded to a
+streaming texture when presented.  The renderer scales the logical size
+to the window.
+
+AVAILABLE is False where pygame has no SDL2 renderer; setup then keeps
+to the surface backend with a warning, and TextureDisplay raises.
+"""
+
+import os
+import weakref
+import pygame as pg
+from . import tools
+
+try:
+    from pygame._sdl2 import video
+except ImportError:
+    video = None
+
+AVAILABLE = video is not None
+UNAVAILABLE = ('the texture renderer needs pygame 2 or later, which has pygame._sdl2; '
+               'this is pygame {}'.format(pg.version.ver))
+CHUNK = 1024
+
+
+class TextureDisplay(tools.Display):
+    """
+    A Display that presents through an SDL2 Renderer, the software one
+    if software is True so it runs headless.  The overlay is drawn on
+    window, a transparent surface composited over the frame.
+    """
+    textured = True
+
+    def __init__(self, logical_size, window_size=None, fullscreen=False, smooth=False,
+                 depth=0, software=False):
+        if not AVAILABLE:
+            raise RuntimeError(UNAVAILABLE)
+        flags = pg.FULLSCREEN if fullscreen else 0
+        if window_size is None:
+            window_size = (0, 0) if fullscreen else logical_size
+        # images are still converted to the display's format
+        display = pg.display.set_mode(window_size, flags, depth)
+        self.window_size = display.get_size()
+        self.logical_size = tuple(logical_size)
+        self.smooth = smooth
+        # read by SDL as each texture is made
+        os.environ['SDL_RENDER_SCALE_QUALITY'] = '1' if smooth else '0'
+        self.renderer = video.Renderer(video.Window.from_display_module(),
+                                       accelerated=0 if software else -1)
+        self.renderer.logical_size = self.logical_size
+        self.screen = pg.Surface(self.logical_size).convert(display)
+        self.window = pg.Surface(self.logical_size, pg.SRCALPHA)
+        self.screen_texture = video.Texture(self.renderer, self.logical_size, streaming=True)
+        self.uploaded = weakref.WeakKeyDictionary()
+        self.copies = None
+        self.low_res_surfaces = {}
+        self.source = self.screen
+        # set keep_frames to read each frame back into last_frame, for tests
+        self.keep_frames = False
+        self.last_frame = None
+
+    def get_texture(self, image):
+        texture = self.uploaded.get(image)
+        if texture is None:
+            texture = video.Texture.from_surface(self.renderer, image)
+            self.uploaded[image] = texture
+        return texture
+
+    def get_chunks(self, image):
+        """
+        Return the (texture, rect) chunks of a large image.
+        """
+        chunks = self.uploaded.get(image)
+        if chunks is None:
+            chunks = []
+            width, height = image.get_size()
+            for y in range(0, height, CHUNK):
+                for x in range(0, width, CHUNK):
+                    rect = pg.Rect(x, y, CHUNK, CHUNK).clip(image.get_rect())
+                    chunks.append((video.Texture.from_surface(self.renderer,
+                                                              image.subsurface(rect)),
+                                   rect))
+            self.uploaded[image] = chunks
+        return chunks
+
+    def invalidate(self, image, rect):
+        """
+        Upload an area of an image that has been drawn on again.
+        """
+        chunks = self.uploaded.get(image)
+        if chunks is None:
+            return
+        if not isinstance(chunks, list):
+            del self.uploaded[image]
+            return
+        for texture, chunk in chunks:
+            area = chunk.clip(rect)
+            if area.width and area.height:
+                texture.update(image.subsurface(area), area.move(-chunk.x, -chunk.y))
+
+    def queue(self, background, area, blits):
+        """
+        Take this frame as the area of a large background image and a list
+        of (image, position) on top of it, instead of drawing on screen.
+        """
+        self.copies = background, area, blits
+
+    def present(self):
+        renderer = self.renderer
+        renderer.clear()
+        if self.copies is None:
+            self.screen_texture.update(self.screen)
+            self.screen_texture.draw()
+        else:
+            background, area, blits = self.copies
+            self.copies = None
+            for texture, chunk in self.get_chunks(background):
+                visible = chunk.clip(area)
+                if visible.width and visible.height:
+                    texture.draw(visible.move(-chunk.x, -chunk.y),
+                                 visible.move(-area.x, -area.y))
+            get_texture = self.get_texture
+            for image, position in blits:
+                texture = get_texture(image)
+                texture.draw(None, pg.Rect(position, image.get_size()))
+        self.window.fill((0, 0, 0, 0))
+
+    def flip(self, overlay=False):
+        if overlay:
+            texture = video.Texture.from_surface(self.renderer, self.window)
+            texture.draw()
+        if self.keep_frames:
+            self.last_frame = self.renderer.to_surface()
+        self.renderer.present()
@@ -2,45 +2,193 @@
 Module used to render tmx maps
 """
 
+import os
+import Queue
+from multiprocessing.pool import ThreadPool
 import pygame as pg
 import pytmx
+from . import perf, memory
+
+# threads rendering a map, each into its own bands of rows.  one, so the
+# serial path, until threads are shown to be faster on a multi-core machine
+WORKERS = 1
+# bands per thread, so a thread with easy bands can take more of them
+BANDS_PER_WORKER = 2
+# side of the squares a chunked map is rendered in, as they come into view
+REGION = 1024
 
 
 class Renderer(object):
     """
-    This object renders tile maps (tmx) from Tiled.
+    This object renders tile maps (tmx) from Tiled.  Without images, only
+    the map data is loaded and nothing can be rendered.
+
+    A map with chunked (infinite) layers decodes its chunks, and makes
+    their tile images, as they are first read, so its map surface is only
+    rendered a region at a time as the view reaches it, see render_visible.
+    The surface itself is still made at the full size of the map.
     """
-    def __init__(self, filename):
-        tm = pytmx.load_pygame(filename, pixelalpha=True)
+    def __init__(self, filename, images=True):
+        self.name = os.path.basename(filename)
+        if images:
+            tm = pytmx.load_pygame(filename, pixelalpha=True)
+            memory.track_all(tm.images, 'tiles', self.name)
+        else:
+            tm = pytmx.load_tmx(filename)
         self.size = tm.width * tm.tilewidth, tm.height * tm.tileheight
         self.tmx_data = tm
+        self.overhang = None
+        self.overhang_images = 0
+        self.chunked = any(isinstance(layer.data, pytmx.TiledChunkedData)
+                           for layer in tm.tilelayers)
+        self.rendered = set()
+        self.tracked = len(tm.images)
 
-    def render(self, surface):
+    def render(self, surface, workers=None):
+        """
+        Render the whole map, in bands of rows.  With more than one worker
+        the bands are shared out over a pool of threads, each drawing into
+        its own subsurface from its own copies of the tile images: SDL keeps
+        a blit map on every source surface, for the last surface it was
+        blitted to, so threads must not blit the same tile at once.
+        """
+        workers = workers or WORKERS
+        if self.tmx_data.background_color:
+            surface.fill(self.tmx_data.background_color)
 
-        tw = self.tmx_data.tilewidth
         th = self.tmx_data.tileheight
-        gt = self.tmx_data.getTileImageByGid
+        rows = self.tmx_data.height
+        count = max(1, min(rows, workers * BANDS_PER_WORKER))
+        bands = []
+        for i in range(count):
+            top = rows * i // count * th
+            bottom = rows * (i + 1) // count * th
+            bands.append(pg.Rect(0, top, surface.get_width(), bottom - top))
+        bands[-1].height = surface.get_height() - bands[-1].top
 
-        if self.tmx_data.background_color:
-            surface.fill(self.tmx_data.background_color)
+        # chunks are decoded as bands read them, which isn't thread safe
+        if workers == 1 or count == 1 or self.chunked:
+            for band in bands:
+                self.render_tiles(surface.subsurface(band), band)
+            return
+        # copied here, as copying blits from the shared tiles too
+        images = self.tmx_data.images
+        copies = [[image.copy() if image else image for image in images]
+                  for i in range(min(workers, count))]
+        queue = Queue.Queue()
+        for band in bands:
+            queue.put(band)
+
+        def render_bands(images):
+            while True:
+                try:
+                    band = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                self.render_tiles(surface.subsurface(band), band, images)
+
+        pool = ThreadPool(len(copies))
+        try:
+            pool.map(render_bands, copies)
+        finally:
+            pool.close()
+            pool.join()
+
+    def render_area(self, surface, rect):
+        """
+        Redraw the map under rect, wiping anything drawn over it since.
+        """
+        rect = rect.clip(surface.get_rect())
+        if not rect:
+            return
+        surface.fill(self.tmx_data.background_color or (0, 0, 0), rect)
+        self.render_tiles(surface.subsurface(rect), rect)
+
+    def render_visible(self, surface, rect):
+        """
+        Render the regions of a chunked map's surface that rect touches
+        and that haven't been rendered yet.  Returns their rects.
+        """
+        rect = rect.clip(surface.get_rect())
+        rendered = []
+        for y in range(rect.top // REGION, (rect.bottom - 1) // REGION + 1):
+            for x in range(rect.left // REGION, (rect.right - 1) // REGION + 1):
+                if (x, y) not in self.rendered:
+                    self.rendered.add((x, y))
+                    region = pg.Rect(x * REGION, y * REGION, REGION, REGION)
+                    self.render_area(surface, region)
+                    rendered.append(region.clip(surface.get_rect()))
+        images = self.tmx_data.images
+        if len(images) > self.tracked:
+            memory.track_all(images[self.tracked:], 'tiles', self.name)
+            self.tracked = len(images)
+        return rendered
+
+    def get_overhang(self):
+        """
+        Return how far the largest tile image reaches past one cell, right
+        and down.  Chunked maps only load tile images as their chunks are
+        read, so their tilesets' tile sizes are counted too, and the result
+        is worked out again whenever more images have been loaded.
+        """
+        images = self.tmx_data.images
+        if self.overhang is None or len(images) != self.overhang_images:
+            tw = self.tmx_data.tilewidth
+            th = self.tmx_data.tileheight
+            sizes = [image.get_size() for image in images if image]
+            if self.chunked:
+                for ts in self.tmx_data.tilesets:
+                    sizes.append((ts.tilewidth, ts.tileheight))
+                    sizes.append((ts.tileheight, ts.tilewidth))
+            self.overhang_images = len(images)
+            self.overhang = (max([w - tw for w, h in sizes] + [0]),
+                             max([h - th for w, h in sizes] + [0]))
+        return self.overhang
+
+    def render_tiles(self, target, rect, images=None):
+        """
+        Draw every visible layer, in order, on target, a surface standing
+        for the map's rect.  Only the cells whose images reach into rect
+        are drawn, from images, by gid, if given.
+        """
+        tw = self.tmx_data.tilewidth
+        th = self.tmx_data.tileheight
+        if images is None:
+            gt = self.tmx_data.getTileImageByGid
+        else:
+            gt = images.__getitem__
+        right, down = self.get_overhang()
+        start = max(0, (rect.left - right) // tw)
+        stop = min(self.tmx_data.width, (rect.right - 1) // tw + 1)
+        rows = range(max(0, (rect.top - down) // th),
+                     min(self.tmx_data.height, (rect.bottom - 1) // th + 1))
+        blit = target.blit
 
         for layer in self.tmx_data.visibleLayers:
             if isinstance(layer, pytmx.TiledLayer):
-                for x, y, gid in layer:
-                    tile = gt(gid)
-                    if tile:
-                        surface.blit(tile, (x * tw, y * th))
-
-            elif isinstance(layer, pytmx.TiledObjectGroup):
-                pass
+                data = layer.data
+                for y in rows:
+                    for x, gid in enumerate(data[y][start:stop], start):
+                        tile = gt(gid)
+                        if tile:
+                            blit(tile, (x * tw - rect.left, y * th - rect.top))
 
             elif isinstance(layer, pytmx.TiledImageLayer):
                 image = gt(layer.gid)
                 if image:
-                    surface.blit(image, (0, 0))
+                    blit(image, (-rect.left, -rect.top))
 
     def make_map(self):
-        temp_surface = pg.Surface(self.size)
-        self.render(temp_surface)
-        return temp_surface
+        """
+        Make the map surface.  A chunked map's is only filled, its tiles
+        are rendered by render_visible.
+        """
+        with perf.span('make_map'):
+            temp_surface = pg.Surface(self.size)
+            if self.chunked:
+                temp_surface.fill(self.tmx_data.background_color or (0, 0, 0))
+                self.rendered = set()
+            else:
+                self.render(temp_surface)
+        return memory.track(temp_surface, 'map', self.name)
 
@@ -1,7 +1,10 @@
 from __future__ import division
 import os
+import threading
+import timeit
 import pygame as pg
 from . import constants as c
+from . import perf, memory, quality
 
 
 
@@ -10,9 +13,37 @@ class Control(object):
     Control class for entire project. Contains the game loop and contains
     the event loop which passes events to States as needed.  Logic for flipping
     states is also found here.
+
+    Setting fixed_dt (in seconds) switches to a fixed timestep: states that
+    support it are stepped in constant ticks from an accumulator (at most
+    max_steps per frame) and drawn with positions interpolated between the
+    last two ticks.  current_time is then game time rather than wall time.
+
+    For benchmarking, fps = 0 runs uncapped, frame_dt (in seconds) replaces
+    the wall clock with one that advances by exactly frame_dt per frame, and
+    max_frames ends the loop after that many frames.  Frame times are kept
+    in frame_times, and the loop's total run time in elapsed.
+
+    A replay.Recorder set as recorder logs every frame's input and clock,
+    and a replay.Replay set as replay feeds them back in place of the real
+    keyboard and clock, ending the loop when the recording runs out.
+
+    F6 toggles per-phase frame timing and an overlay of its rolling
+    averages, p99 and worst times, and of surface memory.  The memory
+    budget is enforced after every state flip.  perf.TRACER.start(path)
+    records the same phases, plus state flips and loading, as a Chrome
+    trace.
+
+    A quality.QualityController set as quality is given every frame's
+    work time, before the frame rate cap sleeps, and adjusts the game's
+    quality settings to keep it within its budget.
+
+    Given a Display, states draw on its screen and each frame is presented
+    to the window through it, with the overlay drawn at window resolution.
     """
-    def __init__(self, caption):
-        self.screen = pg.display.get_surface()
+    def __init__(self, caption, display=None):
+        self.display = display
+        self.screen = display.screen if display else pg.display.get_surface()
         self.done = False
         self.clock = pg.time.Clock()
         self.caption = caption
@@ -23,32 +54,143 @@ class Control(object):
         self.keys = pg.key.get_pressed()
         self.state_dict = {}
         self.state_name = None
+        self.preload_name = None
+        self.preload_thread = None
+        self.fixed_dt = None
+        self.max_steps = 5
+        self.accumulator = 0.0
+        self.frame_dt = None
+        self.simulated_ticks = 0.0
+        self.max_frames = None
+        self.frame_times = []
+        self.elapsed = 0.0
+        self.profiler = perf.PROFILER
+        self.overlay = perf.Overlay(self.profiler, memory.REGISTRY)
+        self.show_overlay = False
+        self.recorder = None
+        self.replay = None
+        self.replay_ticks = 0.0
+        self.ticks = 0.0
+        self.quality = None
 
     def setup_states(self, state_dict, start_state):
         self.state_dict = state_dict
         self.state_name = start_state
         self.state = self.state_dict[self.state_name]
+        with perf.span('startup ' + self.state_name):
+            self.state.startup(self.current_time, create_game_data_dict())
+
+    def get_ticks(self):
+        """
+        Return the clock in milliseconds: the wall clock normally, the
+        recorded clock when replaying, or a simulated clock that advances
+        frame_dt per call when that is set.
+        """
+        if self.replay is not None:
+            self.ticks = self.replay_ticks
+        elif self.frame_dt is None:
+            self.ticks = pg.time.get_ticks()
+        else:
+            self.simulated_ticks += self.frame_dt * 1000
+            self.ticks = self.simulated_ticks
+        return self.ticks
 
     def update(self):
+        if self.fixed_dt:
+            self.update_fixed()
+            return
+
         self.last_time = self.current_time
-        self.current_time = pg.time.get_ticks()
+        self.current_time = self.get_ticks()
         self.delta_time = (self.current_time - self.last_time) / 1000
+        self.check_state()
+        self.state.update(self.screen, self.keys,
+                          self.current_time, self.delta_time)
+
+    def update_fixed(self):
+        """
+        Advance the game in fixed_dt ticks, then draw once.
+        """
+        ticks = self.get_ticks()
+        self.delta_time = (ticks - self.last_time) / 1000
+        self.last_time = ticks
+        self.check_state()
+
+        if not self.state.fixed_step:
+            self.current_time += self.delta_time * 1000
+            self.state.update(self.screen, self.keys,
+                              self.current_time, self.delta_time)
+            return
+
+        self.accumulator += self.delta_time
+        steps = 0
+        while self.accumulator >= self.fixed_dt and not self.state.done:
+            if steps == self.max_steps:
+                self.accumulator %= self.fixed_dt
+                break
+            self.current_time += self.fixed_dt * 1000
+            self.state.step(self.keys, self.current_time, self.fixed_dt)
+            self.accumulator -= self.fixed_dt
+            steps += 1
+        self.state.draw(self.screen, self.accumulator / self.fixed_dt)
+
+    def check_state(self):
+        """
+        Quit or flip to the next state when the current one is finished.
+        """
         if self.state.quit:
             self.done = True
         elif self.state.done:
             self.flip_state()
-        self.state.update(self.screen, self.keys,
-                          self.current_time, self.delta_time)
+        if self.state.next != self.preload_name:
+            self.start_preload(self.state.next)
 
     def flip_state(self):
-        previous, self.state_name = self.state_name, self.state.next
-        persist = self.state.cleanup()
-        self.state = self.state_dict[self.state_name]
-        self.state.startup(self.current_time, persist)
-        self.state.previous = previous
+        with perf.span('flip_state'):
+            previous, self.state_name = self.state_name, self.state.next
+            persist = self.state.cleanup()
+            self.state = self.state_dict[self.state_name]
+            with perf.span('wait for preload'):
+                self.wait_for_preload()
+            with perf.span('startup ' + self.state_name):
+                self.state.startup(self.current_time, persist)
+            self.state.previous = previous
+            self.preload_name = None
+            # the next state is prepared straight after, so keep its caches
+            memory.REGISTRY.enforce(keep=(self.state, self.state_dict.get(self.state.next)))
+
+    def start_preload(self, state_name):
+        """
+        Run the prepare phase of the state that comes next on a worker
+        thread, so its startup doesn't stall the frame it is flipped on.
+        """
+        self.wait_for_preload()
+        self.preload_name = state_name
+        if state_name in self.state_dict:
+            state = self.state_dict[state_name]
+            self.preload_thread = threading.Thread(target=self.preload,
+                                                   args=(state_name, state))
+            self.preload_thread.daemon = True
+            self.preload_thread.start()
+
+    def preload(self, state_name, state):
+        with perf.span('prepare ' + state_name):
+            state.prepare()
+
+    def wait_for_preload(self):
+        """
+        Block until a running preload has finished.
+        """
+        if self.preload_thread is not None:
+            self.preload_thread.join()
+            self.preload_thread = None
 
     def event_loop(self):
-        self.events = pg.event.get()
+        if self.replay is not None:
+            self.events, self.keys, self.replay_ticks = self.replay.next_frame()
+            pg.event.pump()
+        else:
+            self.events = pg.event.get()
 
         for event in self.events:
             if event.type == pg.QUIT:
@@ -56,33 +198,163 @@ class Control(object):
             elif event.type == pg.KEYDOWN:
                 if event.key == pg.K_ESCAPE:
                     self.done = True
-                self.keys = pg.key.get_pressed()
+                self.read_keys()
                 self.toggle_show_fps(event.key)
+                self.toggle_overlay(event.key)
                 self.state.get_event(event)
             elif event.type == pg.KEYUP:
-                self.keys = pg.key.get_pressed()
+                self.read_keys()
                 self.state.get_event(event)
 
+    def read_keys(self):
+        """
+        Refresh the held keys from the keyboard, unless they come from
+        a replay.
+        """
+        if self.replay is None:
+            self.keys = pg.key.get_pressed()
+
     def toggle_show_fps(self, key):
         if key == pg.K_F5:
             self.show_fps = not self.show_fps
             if not self.show_fps:
                 pg.display.set_caption(self.caption)
 
+    def toggle_overlay(self, key):
+        if key == pg.K_F6:
+            self.show_overlay = not self.show_overlay
+            self.profiler.enabled = self.show_overlay
+            self.profiler.reset()
+
     def main(self):
         """
         Main loop for entire program.
         """
+        timed = self.max_frames is not None or self.replay is not None
+        self.frame_times = []
+        start_time = timeit.default_timer()
         while not self.done:
-            self.event_loop()
-            self.update()
-            pg.display.update()
+            frame_start = timeit.default_timer()
+            self.profiler.begin_frame()
+            with perf.phase('events'):
+                self.event_loop()
+            with perf.phase('update'):
+                self.update()
+            window = self.screen
+            if self.display is not None:
+                with perf.phase('present'):
+                    self.display.present()
+                window = self.display.window
+            if self.show_overlay:
+                self.overlay.draw(window)
+            with perf.phase('display'):
+                if self.display is not None:
+                    self.display.flip(self.show_overlay)
+                else:
+                    pg.display.update()
+            self.profiler.end_frame()
+            if self.recorder is not None:
+                self.recorder.add_frame(self.events, self.keys, self.ticks)
+            frame_time = timeit.default_timer() - frame_start
+            if self.quality is not None:
+                self.quality.add_frame(frame_time)
+            if timed:
+                self.frame_times.append(frame_time)
+            if self.max_frames is not None and len(self.frame_times) >= self.max_frames:
+                self.done = True
+            if self.replay is not None and self.replay.finished:
+                self.done = True
             self.clock.tick(self.fps)
             if self.show_fps:
                 fps = self.clock.get_fps()
                 with_fps = "{} - {:.2f} FPS".format(self.caption, fps)
                 pg.display.set_caption(with_fps)
 
+        self.elapsed = timeit.default_timer() - start_time
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+class Display(object):
+    """
+    The window and the surfaces the game is drawn on.  States draw on
+    screen, which is always logical_size; when the window is another
+    size, screen is a separate surface and present() scales it into the
+    window.  A state can draw a frame at a lower resolution instead, on
+    the surface low_res() returns, and that frame is presented.  Scaling
+    is nearest neighbour, or smooth if asked for, and always into the
+    window itself, so presenting allocates nothing.
+
+    Levels check textured; a display that is can take a frame as a copy
+    list through queue() instead of having it drawn on screen.
+    """
+    textured = False
+
+    def __init__(self, logical_size, window_size=None, fullscreen=False, smooth=False,
+                 depth=0):
+        flags = pg.FULLSCREEN if fullscreen else 0
+        if window_size is None:
+            window_size = (0, 0) if fullscreen else logical_size
+        self.window = pg.display.set_mode(window_size, flags, depth)
+        self.window_size = self.window.get_size()
+        self.logical_size = tuple(logical_size)
+        self.smooth = smooth
+        if self.window_size == self.logical_size:
+            self.screen = self.window
+        else:
+            self.screen = pg.Surface(self.logical_size).convert(self.window)
+        self.low_res_surfaces = {}
+        self.source = self.screen
+
+    def low_res(self, scale):
+        """
+        Return a surface of scale times the logical size to draw this
+        frame on, instead of on screen.
+        """
+        size = int(self.logical_size[0] * scale), int(self.logical_size[1] * scale)
+        surface = self.low_res_surfaces.get(size)
+        if surface is None:
+            self.low_res_surfaces.clear()
+            surface = pg.Surface(size).convert(self.window)
+            self.low_res_surfaces[size] = surface
+        self.source = surface
+        return surface
+
+    def scale(self, surface, size, dest=None):
+        """
+        Scale a surface with the display's scaling filter.
+        """
+        if self.smooth and surface.get_bitsize() >= 24:
+            if dest is None:
+                return pg.transform.smoothscale(surface, size)
+            return pg.transform.smoothscale(surface, size, dest)
+        if dest is None:
+            return pg.transform.scale(surface, size)
+        return pg.transform.scale(surface, size, dest)
+
+    def present(self):
+        """
+        Put this frame's surface in the window.
+        """
+        source, self.source = self.source, self.screen
+        if source is self.window:
+            return
+        if source.get_size() == self.window_size:
+            self.window.blit(source, (0, 0))
+        else:
+            self.scale(source, self.window_size, self.window)
+
+    def invalidate(self, image, rect):
+        """
+        Note that an area of an image kept by the display has changed.
+        """
+        pass
+
+    def flip(self, overlay=False):
+        """
+        Show the presented frame, with the overlay if it was drawn.
+        """
+        pg.display.update()
 
 class _State(object):
     """
@@ -96,10 +368,34 @@ class _State(object):
         self.next = None
         self.previous = None
         self.game_data = {}
+        self.prepared = None
+        self.fixed_step = False
+        self.step_keys = None
+        self.step_time = 0.0
+        self.step_dt = 0.0
 
     def get_event(self, event):
         pass
 
+    def prepare(self):
+        """
+        Do the slow loading needed before startup (map rendering, frame
+        slicing, text rendering) and store the results in self.prepared.
+        Control may run this on a worker thread while another state is
+        still active, so it must not draw to the screen or touch other states.
+        """
+        pass
+
+    def take_prepared(self):
+        """
+        Return what prepare() built, running it now if it hasn't been run
+        since the last startup.
+        """
+        if self.prepared is None:
+            self.prepare()
+        prepared, self.prepared = self.prepared, None
+        return prepared
+
     def startup(self, current_time, game_data):
         self.game_data = game_data
         self.start_time = current_time
@@ -111,6 +407,27 @@ class _State(object):
     def update(self, surface, keys, current_time, dt):
         pass
 
+    def step(self, keys, current_time, dt):
+        """
+        Advance the state by one tick without drawing.  Only called by
+        Control's fixed timestep, for states with fixed_step set.  The
+        default just remembers the tick so draw() can hand it to update().
+        """
+        self.step_keys = keys
+        self.step_time = current_time
+        self.step_dt += dt
+
+    def draw(self, surface, interpolation):
+        """
+        Draw the state, placing moving sprites the given fraction of the
+        way from their previous tick to their current one.  The default
+        runs update() over the ticks stepped since the last draw.
+        """
+        if self.step_keys is None:
+            return
+        dt, self.step_dt = self.step_dt, 0.0
+        self.update(surface, self.step_keys, self.step_time, dt)
+
 
 def load_all_gfx(directory, colorkey=(255,0,255), accept=('.png', '.jpg', '.bmp')):
     graphics = {}
@@ -123,7 +440,7 @@ def load_all_gfx(directory, colorkey=(255,0,255), accept=('.png', '.jpg', '.bmp'
             else:
                 img = img.convert()
                 img.set_colorkey(colorkey)
-            graphics[name] = img
+            graphics[name] = memory.track(img, 'gfx', name)
     return graphics
 
 def load_all_music(directory, accept=('.wav', '.mp3', '.ogg', '.mdi')):
@@ -160,15 +477,202 @@ def get_image(x, y, width, height, sprite_sheet):
 
     return image
 
+class OrderedGroup(pg.sprite.Group):
+    """
+    Sprite group that iterates in the order sprites were added.  A plain
+    Group iterates in hash order, which follows memory addresses, so which
+    of several overlapping sprites a collision finds first could change
+    from one run to the next.
+    """
+    def __init__(self, *sprites):
+        self.sprite_list = []
+        super(OrderedGroup, self).__init__(*sprites)
+
+    def sprites(self):
+        return list(self.sprite_list)
+
+    def add_internal(self, sprite):
+        super(OrderedGroup, self).add_internal(sprite)
+        self.sprite_list.append(sprite)
+
+    def remove_internal(self, sprite):
+        super(OrderedGroup, self).remove_internal(sprite)
+        self.sprite_list.remove(sprite)
+
+class IndexedGroup(OrderedGroup):
+    """
+    OrderedGroup that also files its sprites in a grid of cell_size
+    squares, so the sprites in an area can be found without testing every
+    one.  The grid only knows where a sprite was when it was added or last
+    reindexed, so code that moves a sprite calls reindex() on it.
+    """
+    cell_size = 256
+
+    def __init__(self, *sprites):
+        self.cells = {}
+        self.sprite_cells = {}
+        self.order = {}
+        self.added = 0
+        super(IndexedGroup, self).__init__(*sprites)
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        columns = range(rect.left // size, max(rect.left, rect.right - 1) // size + 1)
+        rows = range(rect.top // size, max(rect.top, rect.bottom - 1) // size + 1)
+        return tuple((column, row) for column in columns for row in rows)
+
+    def file(self, sprite):
+        cells = self.cells_for(sprite.rect)
+        self.sprite_cells[sprite] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(sprite)
+
+    def unfile(self, sprite):
+        for cell in self.sprite_cells.pop(sprite, ()):
+            members = self.cells[cell]
+            members.discard(sprite)
+            if not members:
+                del self.cells[cell]
+
+    def add_internal(self, sprite):
+        super(IndexedGroup, self).add_internal(sprite)
+        self.order[sprite] = self.added
+        self.added += 1
+        self.file(sprite)
+
+    def remove_internal(self, sprite):
+        super(IndexedGroup, self).remove_internal(sprite)
+        del self.order[sprite]
+        self.unfile(sprite)
+
+    def reindex(self, sprite):
+        """
+        Move a sprite to the cells under its current rect.
+        """
+        if self.sprite_cells.get(sprite) != self.cells_for(sprite.rect):
+            self.unfile(sprite)
+            self.file(sprite)
+
+    def sprites_in(self, rect):
+        """
+        Return the sprites whose rects overlap rect, in the group's order.
+        """
+        found = set()
+        for cell in self.cells_for(rect):
+            members = self.cells.get(cell)
+            if members:
+                found.update(members)
+        found = [sprite for sprite in found if rect.colliderect(sprite.rect)]
+        found.sort(key=self.order.get)
+        return found
+
+def reindex(sprite):
+    """
+    Update a moved sprite's place in every IndexedGroup it belongs to.
+    """
+    for group in sprite.groups():
+        if isinstance(group, IndexedGroup):
+            group.reindex(sprite)
+
+def blit_all(surface, blits):
+    """
+    Blit a list of (image, position) pairs in one call where pygame has
+    Surface.blits, or one by one where it doesn't.
+    """
+    if hasattr(surface, 'blits'):
+        surface.blits(blits, doreturn=False)
+    else:
+        for image, position in blits:
+            surface.blit(image, position)
+
+class RectImage(object):
+    """
+    Stand-in for a sprite image in render-free simulations.  Keeps the
+    size and collision mask of the surface it replaces, but no pixels,
+    so it can be shared by every sprite using that image.
+    """
+    def __init__(self, surface):
+        self.size = surface.get_size()
+        self.mask = pg.mask.from_surface(surface)
+
+    def get_size(self):
+        return self.size
+
+    def get_rect(self, **kwargs):
+        rect = pg.Rect((0, 0), self.size)
+        for name, value in kwargs.items():
+            setattr(rect, name, value)
+        return rect
+
+def make_rect_images(images):
+    """
+    Replace the surfaces in a (possibly nested) list or dict of images
+    with RectImages.
+    """
+    if isinstance(images, dict):
+        return dict((key, make_rect_images(value)) for key, value in images.items())
+    if isinstance(images, list):
+        return [make_rect_images(image) for image in images]
+    return RectImage(images)
+
+def snapshot_sprite(sprite, attributes):
+    """
+    Return a sprite's rect and the named attributes as a flat tuple.
+    Values are kept by reference, so images aren't copied.
+    """
+    return (tuple(sprite.rect),) + tuple(getattr(sprite, name) for name in attributes)
+
+def restore_sprite(sprite, attributes, snapshot):
+    """
+    Put back what snapshot_sprite took.
+    """
+    sprite.rect = pg.Rect(snapshot[0])
+    for name, value in zip(attributes, snapshot[1:]):
+        setattr(sprite, name, value)
+
 def create_game_data_dict():
     return {c.LIVES: 3}
 
+def frame_summary(frame_times, elapsed):
+    """
+    Summarise a list of frame times (in seconds) taken over elapsed seconds.
+    Times in the result are in milliseconds.
+    """
+    times = sorted(frame_times)
+    frames = len(times)
+    return {'frames': frames,
+            'fps': frames / elapsed if elapsed else 0.0,
+            'mean': 1000 * sum(times) / frames if frames else 0.0,
+            'p50': 1000 * perf.percentile(times, 50),
+            'p90': 1000 * perf.percentile(times, 90),
+            'p99': 1000 * perf.percentile(times, 99),
+            'max': 1000 * times[-1] if times else 0.0}
+
+def format_frame_summary(frame_times, elapsed):
+    summary = frame_summary(frame_times, elapsed)
+    return ("{frames} frames, {fps:.1f} FPS | frame ms: mean {mean:.2f} "
+            "p50 {p50:.2f} p90 {p90:.2f} p99 {p99:.2f} max {max:.2f}").format(**summary)
+
+def get_mask(sprite):
+    """
+    Return the sprite's collision mask: its own mask attribute if it has
+    one, the mask of a RectImage, or one made from its image.
+    """
+    mask = getattr(sprite, 'mask', None)
+    if mask is None:
+        mask = getattr(sprite.image, 'mask', None)
+    if mask is None:
+        mask = pg.mask.from_surface(sprite.image)
+    return mask
+
 def rect_than_mask(one, two):
     """
     Test for rect collision, followed by mask collision.
     """
-
-    return pg.sprite.collide_rect(one, two) and pg.sprite.collide_mask(one, two)
+    if not pg.sprite.collide_rect(one, two):
+        return False
+    offset = two.rect.x - one.rect.x, two.rect.y - one.rect.y
+    return get_mask(one).overlap(get_mask(two), offset)
 
 
 
@@ -1,9 +1,18 @@
-from itertools import chain, product
-from xml.etree import ElementTree
+from array import array
+from collections import MutableMapping, MutableSequence, OrderedDict
+from itertools import chain, product, imap
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
 from .utils import decode_gid, types, parse_properties, read_points
 from .constants import *
 
-__all__ = ['TiledMap', 'TiledTileset', 'TiledLayer', 'TiledObject', 'TiledObjectGroup', 'TiledImageLayer']
+__all__ = ['TiledMap', 'TiledTileset', 'TiledLayer', 'TiledChunkedData', 'TiledObject',
+           'TiledObjectGroup', 'TiledImageLayer']
+
+# chunks of an infinite layer kept decoded at once, per layer
+MAX_DECODED_CHUNKS = 256
 
 
 class TiledElement(object):
@@ -71,6 +80,13 @@ class TiledMap(TiledElement):
         self.imagemap = {}  # mapping of gid and trans flags to real gids
         self.maxgid = 1
 
+        # properties of tileset tiles by real gid, for gids registered late
+        self.real_tile_properties = {}
+
+        # set by a loader that can make the images of gids registered after
+        # loading, when chunks of infinite layers are decoded
+        self.image_loader = None
+
         if filename:
             self.load()
 
@@ -266,6 +282,11 @@ class TiledMap(TiledElement):
                 self.maxgid += 1
                 self.imagemap[(real_gid, flags)] = (gid, flags)
                 self.gidmap[real_gid].append((gid, flags))
+                p = self.real_tile_properties.get(real_gid)
+                if p is not None:
+                    self.tile_properties[gid] = p
+                if self.image_loader is not None:
+                    self.images.append(self.image_loader(real_gid, flags))
                 return gid
         else:
             return 0
@@ -289,28 +310,83 @@ class TiledMap(TiledElement):
     def load(self):
         """
         parse a map node from a tiled tmx file
-        """
-        etree = ElementTree.parse(self.filename).getroot()
-        self.set_properties(etree)
 
+        the file is streamed: layers, image layers and objects are built as
+        their elements end, then dropped from the tree, so the whole document
+        is never held at once.
+        """
         # initialize the gid mapping
         self.imagemap[(0, 0)] = 0
 
-        self.background_color = etree.get('backgroundcolor', self.background_color)
-
         # *** do not change this load order!  gid mapping errors will occur if changed ***
-        for node in etree.findall('layer'):
-            self.addTileLayer(TiledLayer(self, node))
+        # tile layers register their gids as they are read.  image layers
+        # follow every tile layer, tile objects register after all of them,
+        # and tilesets are read last, as they look up the registered gids.
+        imagelayers = []
+        group = None
+        tilesets = []
+        root = None
+        path = []
+
+        for event, node in ElementTree.iterparse(self.filename, ('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = node
+                elif node.tag == 'objectgroup' and path[-1] is root:
+                    group = TiledObjectGroup(self)
+                path.append(node)
+                continue
+
+            path.pop()
+            parent = path[-1] if path else None
+            if parent is root:
+                if node.tag == 'layer':
+                    self.addTileLayer(TiledLayer(self, node))
+                    root.remove(node)
+
+                elif node.tag == 'imagelayer':
+                    imagelayers.append(TiledImageLayer(self, node))
+                    root.remove(node)
 
-        for node in etree.findall('imagelayer'):
-            self.addImageLayer(TiledImageLayer(self, node))
+                elif node.tag == 'objectgroup':
+                    group.parse(node)
+                    self.objectgroups.append(group)
+                    group = None
+                    root.remove(node)
 
-        for node in etree.findall('objectgroup'):
-            self.objectgroups.append(TiledObjectGroup(self, node))
+                elif node.tag == 'tileset':
+                    tilesets.append(node)
 
-        for node in etree.findall('tileset'):
+            elif node.tag == 'object' and group is not None and parent.tag == 'objectgroup':
+                group.add_object(node)
+                parent.remove(node)
+
+        self.set_properties(root)
+        self.background_color = root.get('backgroundcolor', self.background_color)
+
+        for layer in imagelayers:
+            self.addImageLayer(layer)
+
+        for group in self.objectgroups:
+            gids = group.gids
+            for i, gid in enumerate(gids):
+                if gid:
+                    gids[i] = self.register_gid(gid)
+
+        for node in tilesets:
             self.tilesets.append(TiledTileset(self, node))
 
+        # an infinite map is as big as its chunks reach
+        chunked = [layer.data for layer in self.tilelayers
+                   if isinstance(layer.data, TiledChunkedData)]
+        if chunked:
+            self.width = max([self.width] + [data.width for data in chunked])
+            self.height = max([self.height] + [data.height for data in chunked])
+            for layer in self.tilelayers:
+                if isinstance(layer.data, TiledChunkedData):
+                    layer.width = layer.data.width = self.width
+                    layer.height = layer.data.height = self.height
+
         # "tile objects", objects with a GID, have need to have their
         # attributes set after the tileset is loaded, so this step must be performed last
         for o in self.objects:
@@ -456,6 +532,7 @@ class TiledTileset(TiledElement):
             p = parse_properties(child)
             p['width'] = self.tilewidth
             p['height'] = self.tileheight
+            self.parent.real_tile_properties[real_gid + self.firstgid] = p
             for gid, flags in self.parent.map_gid(real_gid + self.firstgid):
                 self.parent.setTileProperties(gid, p)
 
@@ -492,83 +569,256 @@ class TiledLayer(TiledElement):
     def parse(self, node):
         """
         parse a layer element
+
+        the data of an infinite map's layer is split in chunks, which are kept
+        as they are and decoded as they are read, see TiledChunkedData.
         """
-        from utils import group
-        from itertools import product, imap
-        from struct import unpack
         import array
 
         self.set_properties(node)
 
-        data = None
-        next_gid = None
-
         data_node = node.find('data')
 
         encoding = data_node.get("encoding", None)
-        if encoding == "base64":
-            from base64 import decodestring
+        compression = data_node.get("compression", None)
 
-            data = decodestring(data_node.text.strip())
+        chunks = data_node.findall('chunk')
+        if chunks:
+            self.data = TiledChunkedData(self.parent, encoding, compression, chunks)
+            self.width = self.data.width
+            self.height = self.data.height
+            return
 
-        elif encoding == "csv":
-            next_gid = imap(int, "".join(
-                line.strip() for line in data_node.text.strip()
-            ).split(","))
+        next_gid = read_gids(data_node, encoding, compression)
 
-        elif encoding:
-            msg = "TMX encoding type: {0} is not supported."
-            raise Exception, msg.format(encoding)
+        # using bytes here limits the layer to 256 unique tiles
+        # may be a limitation for very detailed maps, but most maps are not
+        # so detailed.
+        [self.data.append(array.array("H")) for i in xrange(self.height)]
 
-        compression = data_node.get("compression", None)
-        if compression == "gzip":
-            from StringIO import StringIO
-            import gzip
+        for (y, x) in product(xrange(self.height), xrange(self.width)):
+            self.data[y].append(self.parent.register_gid(*decode_gid(next(next_gid))))
 
-            fh = gzip.GzipFile(fileobj=StringIO(data))
-            data = fh.read()
-            fh.close()
 
-        elif compression == "zlib":
-            import zlib
+def read_gids(node, encoding, compression, text=None, tiles=None):
+    """
+    return an iterator of the raw gids in a layer's data or chunk element,
+    or in its text (or tile gids, for xml) kept from it
+    """
+    from utils import group
+    from struct import unpack
 
-            data = zlib.decompress(data)
+    if node is not None:
+        text = node.text
+        if encoding is None:
+            tiles = [int(child.get('gid')) for child in node.findall('tile')]
 
-        elif compression:
-            msg = "TMX compression type: {0} is not supported."
-            raise Exception, msg.format(str(attr["compression"]))
+    data = None
+    next_gid = None
 
-        # if data is None, then it was not decoded or decompressed, so
-        # we assume here that it is going to be a bunch of tile elements
-        # TODO: this will probably raise an exception if there are no tiles
-        if encoding == next_gid is None:
-            def get_children(parent):
-                for child in parent.findall('tile'):
-                    yield int(child.get('gid'))
+    if encoding == "base64":
+        from base64 import decodestring
 
-            next_gid = get_children(data_node)
+        data = decodestring(text.strip())
 
-        elif data:
-            # data is a list of gids. cast as 32-bit ints to format properly
-            # create iterator to efficiently parse data
-            next_gid = imap(lambda i: unpack("<L", "".join(i))[0], group(data, 4))
+    elif encoding == "csv":
+        next_gid = imap(int, "".join(
+            line.strip() for line in text.strip()
+        ).split(","))
 
-        # using bytes here limits the layer to 256 unique tiles
-        # may be a limitation for very detailed maps, but most maps are not
-        # so detailed.
-        [self.data.append(array.array("H")) for i in xrange(self.height)]
+    elif encoding:
+        msg = "TMX encoding type: {0} is not supported."
+        raise Exception, msg.format(encoding)
 
-        for (y, x) in product(xrange(self.height), xrange(self.width)):
-            self.data[y].append(self.parent.register_gid(*decode_gid(next(next_gid))))
+    if compression == "gzip":
+        from StringIO import StringIO
+        import gzip
+
+        fh = gzip.GzipFile(fileobj=StringIO(data))
+        data = fh.read()
+        fh.close()
+
+    elif compression == "zlib":
+        import zlib
+
+        data = zlib.decompress(data)
 
+    elif compression:
+        msg = "TMX compression type: {0} is not supported."
+        raise Exception, msg.format(compression)
 
-class TiledObjectGroup(TiledElement, list):
+    # if data is None, then it was not decoded or decompressed, so
+    # we assume here that it is going to be a bunch of tile elements
+    # TODO: this will probably raise an exception if there are no tiles
+    if encoding == next_gid is None:
+        next_gid = iter(tiles)
+
+    elif data:
+        # data is a list of gids. cast as 32-bit ints to format properly
+        # create iterator to efficiently parse data
+        next_gid = imap(lambda i: unpack("<L", "".join(i))[0], group(data, 4))
+
+    return next_gid
+
+
+class TiledChunkedData(object):
+    """
+    tile data of an infinite map's layer, in chunks.  chunks are kept as
+    read from the file, and only decoded, registering their gids, when a
+    tile in them is first read.  at most MAX_DECODED_CHUNKS stay decoded,
+    the least recently read are dropped first.  chunks without tiles are
+    never stored, and read as 0.
+
+    reads like the rows of a fixed layer: data[y][x], or data[y][start:stop]
+    to read a run of tiles with one lookup per chunk.  the layer starts at
+    tile 0, 0; chunks at negative coordinates are left out.
+    """
+
+    def __init__(self, parent, encoding, compression, nodes):
+        self.parent = parent
+        self.encoding = encoding
+        self.compression = compression
+        self.chunks = {}
+        self.decoded = OrderedDict()
+        self.decodes = 0
+        self.chunk_width = self.chunk_height = 0
+        self.width = self.height = 0
+
+        for node in nodes:
+            x, y, w, h = [int(node.get(k)) for k in ('x', 'y', 'width', 'height')]
+            if not self.chunk_width:
+                self.chunk_width, self.chunk_height = w, h
+            elif (w, h) != (self.chunk_width, self.chunk_height):
+                msg = "Chunks of a layer must all be {0}x{1}, found {2}x{3}"
+                raise Exception, msg.format(self.chunk_width, self.chunk_height, w, h)
+            if x % w or y % h:
+                msg = "Chunk at {0},{1} isn't aligned to the chunk size"
+                raise Exception, msg.format(x, y)
+            if x < 0 or y < 0:
+                continue
+
+            tiles = None
+            if encoding is None:
+                tiles = [int(child.get('gid')) for child in node.findall('tile')]
+            self.chunks[(x // w, y // h)] = (node.text, tiles)
+            self.width = max(self.width, x + w)
+            self.height = max(self.height, y + h)
+
+    def chunk(self, cx, cy):
+        """
+        return the rows of gids of a chunk, by chunk column and row, or
+        None if it has no tiles
+        """
+        key = cx, cy
+        rows = self.decoded.pop(key, None)
+        if rows is None:
+            encoded = self.chunks.get(key)
+            if encoded is None:
+                return None
+            rows = self.decode(*encoded)
+            if len(self.decoded) >= MAX_DECODED_CHUNKS:
+                self.decoded.popitem(last=False)
+        self.decoded[key] = rows
+        return rows
+
+    def decode(self, text, tiles):
+        next_gid = read_gids(None, self.encoding, self.compression, text, tiles)
+        register_gid = self.parent.register_gid
+        rows = []
+        for y in xrange(self.chunk_height):
+            rows.append(array('H', [register_gid(*decode_gid(next(next_gid)))
+                                    for x in xrange(self.chunk_width)]))
+        self.decodes += 1
+        return rows
+
+    def read_row(self, y, start, stop):
+        """
+        return a list of the gids in row y from column start to stop
+        """
+        stop = min(stop, self.width)
+        w, h = self.chunk_width, self.chunk_height
+        gids = []
+        x = max(0, start)
+        while x < stop:
+            cx = x // w
+            end = min(stop, (cx + 1) * w)
+            rows = self.chunk(cx, y // h)
+            if rows is None:
+                gids.extend([0] * (end - x))
+            else:
+                gids.extend(rows[y % h][x - cx * w:end - cx * w])
+            x = end
+        return gids
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [TiledChunkedRow(self, i) for i in xrange(*y.indices(self.height))]
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("layer row out of range")
+        return TiledChunkedRow(self, y)
+
+    def __iter__(self):
+        for y in xrange(self.height):
+            yield TiledChunkedRow(self, y)
+
+
+class TiledChunkedRow(object):
+    """
+    one row of a TiledChunkedData
+    """
+    __slots__ = ('data', 'y')
+
+    def __init__(self, data, y):
+        self.data = data
+        self.y = y
+
+    def __len__(self):
+        return self.data.width
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            start, stop, step = x.indices(self.data.width)
+            if step == 1:
+                return self.data.read_row(self.y, start, stop)
+            return self.data.read_row(self.y, 0, self.data.width)[x]
+        if x < 0:
+            x += self.data.width
+        if not 0 <= x < self.data.width:
+            raise IndexError("layer column out of range")
+        return self.data.read_row(self.y, x, x + 1)[0]
+
+    def __iter__(self):
+        return iter(self.data.read_row(self.y, 0, self.data.width))
+
+
+def whole(value):
+    """
+    return a float from a geometry column as an int if it is whole, as it
+    was parsed
+    """
+    return int(value) if value.is_integer() else value
+
+
+class TiledObjectGroup(TiledElement, MutableSequence):
     """
     Stores TiledObjects.  Supports any operation of a normal list.
+
+    objects are kept in columns (name, type, x, y, width, height, gid),
+    with any other attributes and properties stored only for the objects
+    that have them.  x, y, width and height are stored as floats and read
+    back as ints when they are whole.  TiledObjects are made as they are
+    asked for, and only view the columns at their index, so one kept
+    across an insert, delete, sort or reverse may show another object.
+    pop() returns a copy of the object it removes.
     """
     reserved = "visible name color x y width height opacity object properties".split()
 
-    def __init__(self, parent, node):
+    def __init__(self, parent, node=None):
         TiledElement.__init__(self)
         self.parent = parent
 
@@ -577,75 +827,300 @@ class TiledObjectGroup(TiledElement, list):
         self.color = None
         self.opacity = 1
         self.visible = 1
-        self.parse(node)
+
+        self.names = []
+        self.types = []
+        # geometry may be fractional, see whole()
+        self.xs = array('d')
+        self.ys = array('d')
+        self.widths = array('d')
+        self.heights = array('d')
+        # gids carrying flip flags don't fit a signed 32 bit long
+        self.gids = array('L')
+        # a dict of any other attributes, or None, per object
+        self.extra = []
+        self.columns = {'name': self.names, 'type': self.types, 'x': self.xs, 'y': self.ys,
+                        'width': self.widths, 'height': self.heights, 'gid': self.gids}
+        self.table = (self.names, self.types, self.xs, self.ys, self.widths, self.heights,
+                      self.gids, self.extra)
+
+        if node is not None:
+            self.parse(node)
 
     def __repr__(self):
         return "<{0}: \"{1}\">".format(self.__class__.__name__, self.name)
 
-    def parse(self, node):
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TiledObject(self, i) for i in xrange(*index.indices(len(self)))]
+        return TiledObject(self, self.position(index))
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield TiledObject(self, index)
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            self.set_row(self.position(index), self.object_row(value))
+            return
+        rows = [self.object_row(o) for o in value]
+        start, stop, step = index.indices(len(self))
+        if step == 1:
+            del self[index]
+            for i, row in enumerate(rows, start):
+                self.insert_row(i, row)
+            return
+        indexes = xrange(start, stop, step)
+        if len(rows) != len(indexes):
+            msg = "attempt to assign sequence of size {0} to extended slice of size {1}"
+            raise ValueError(msg.format(len(rows), len(indexes)))
+        for i, row in zip(indexes, rows):
+            self.set_row(i, row)
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice):
+            index = self.position(index)
+        for column in self.table:
+            del column[index]
+
+    def insert(self, index, o):
+        self.insert_row(index, self.object_row(o))
+
+    def pop(self, index=-1):
+        if not len(self):
+            raise IndexError("pop from empty object group")
+        row = self.row(self.position(index))
+        del self[index]
+        group = TiledObjectGroup(self.parent)
+        group.insert_row(0, row)
+        return group[0]
+
+    def reverse(self):
+        self.set_rows([self.row(i) for i in reversed(xrange(len(self)))])
+
+    def sort(self, cmp=None, key=None, reverse=False):
+        objects = list(self)
+        objects.sort(cmp, key, reverse)
+        self.set_rows([self.row(o._index) for o in objects])
+
+    def position(self, index):
         """
-        parse a objectgroup element and return a object group
+        return index as a position in the group, counting back from the end
+        if negative
         """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("object index out of range")
+        return index
 
-        self.set_properties(node)
+    def row(self, index):
+        """
+        return a copy of everything stored for the object at index
+        """
+        row = [column[index] for column in self.table]
+        if row[-1] is not None:
+            row[-1] = dict(row[-1])
+        return row
 
-        for child in node.findall('object'):
-            o = TiledObject(self.parent, child)
-            self.append(o)
+    def set_row(self, index, row):
+        for column, value in zip(self.table, row):
+            column[index] = value
 
+    def set_rows(self, rows):
+        for index, row in enumerate(rows):
+            self.set_row(index, row)
 
-class TiledObject(TiledElement):
-    reserved = "visible name type x y width height gid properties polygon polyline image".split()
+    def insert_row(self, index, row):
+        for column, value in zip(self.table, row):
+            column.insert(index, value)
 
-    def __init__(self, parent, node):
-        TiledElement.__init__(self)
-        self.parent = parent
+    def object_row(self, o):
+        """
+        return a row for a copy of a TiledObject's attributes
+        """
+        values = dict(o.__dict__)
+        values.pop('parent', None)
+        return self.make_row(values.pop('name', None), values.pop('type', None),
+                             values.pop('x', 0), values.pop('y', 0), values.pop('width', 0),
+                             values.pop('height', 0), values.pop('gid', 0), values)
+
+    def make_row(self, name, object_type, x, y, width, height, gid, extra):
+        # names and types repeat a lot, so share the strings
+        if isinstance(name, str):
+            name = intern(name)
+        if isinstance(object_type, str):
+            object_type = intern(object_type)
+        defaults = TiledObject.defaults
+        extra = dict((k, v) for k, v in extra.items()
+                     if not (k in defaults and type(v) is type(defaults[k]) and v == defaults[k]))
+        return [name, object_type, x, y, width, height, gid, extra or None]
 
-        # defaults from the specification
-        self.name = None
-        self.type = None
-        self.x = 0
-        self.y = 0
-        self.width = 0
-        self.height = 0
-        self.rotation = 0
-        self.gid = 0
-        self.visible = 1
+    def parse(self, node):
+        """
+        parse a objectgroup element and return a object group
+        """
 
-        self.parse(node)
+        self.set_properties(node)
 
-    def __repr__(self):
-        return "<{0}: \"{1}\">".format(self.__class__.__name__, self.name)
+        for child in node.findall('object'):
+            self.add_object(child)
 
-    def parse(self, node):
-        self.set_properties(node)
+    def add_object(self, node):
+        """
+        parse an object element into the group's columns
+        """
+        values = dict((k, types[str(k)](v)) for (k, v) in node.items())
 
-        # correctly handle "tile objects" (object with gid set)
-        if self.gid:
-            self.gid = self.parent.register_gid(self.gid)
+        for k, v in parse_properties(node).items():
+            if k in TiledObject.reserved:
+                msg = "{0} \"{1}\" has a property called \"{2}\""
+                print msg.format('TiledObject', values.get('name'), k)
+                msg = "This name is reserved for {0} objects and cannot be used."
+                print msg.format('TiledObject')
+                print "Please change the name in Tiled and try again."
+                raise ValueError
+            values[k] = types[str(k)](v)
+
+        # "tile objects" (objects with gid set) have their gid registered
+        # by the map once every tile layer is loaded
 
         points = None
 
         polygon = node.find('polygon')
         if polygon is not None:
             points = read_points(polygon.get('points'))
-            self.closed = True
+            values['closed'] = True
 
         polyline = node.find('polyline')
         if polyline is not None:
             points = read_points(polyline.get('points'))
-            self.closed = False
+            values['closed'] = False
 
+        x = values.pop('x', 0)
+        y = values.pop('y', 0)
+        width = values.pop('width', 0)
+        height = values.pop('height', 0)
         if points:
             x1 = x2 = y1 = y2 = 0
-            for x, y in points:
-                if x < x1: x1 = x
-                if x > x2: x2 = x
-                if y < y1: y1 = y
-                if y > y2: y2 = y
-            self.width = abs(x1) + abs(x2)
-            self.height = abs(y1) + abs(y2)
-            self.points = tuple([(i[0] + self.x, i[1] + self.y) for i in points])
+            for px, py in points:
+                if px < x1: x1 = px
+                if px > x2: x2 = px
+                if py < y1: y1 = py
+                if py > y2: y2 = py
+            width = abs(x1) + abs(x2)
+            height = abs(y1) + abs(y2)
+            values['points'] = tuple([(i[0] + x, i[1] + y) for i in points])
+
+        self.insert_row(len(self), self.make_row(values.pop('name', None),
+                                                 values.pop('type', None), x, y, width,
+                                                 height, values.pop('gid', 0), values))
+
+
+class TiledObject(object):
+    """
+    A view of one object in a TiledObjectGroup.  Attributes read and
+    write the group's storage; __dict__ is a dict-like view of all of
+    them, as callers used to read it directly.
+    """
+    __slots__ = ('_group', '_index')
+
+    reserved = "visible name type x y width height gid properties polygon polyline image".split()
+    columns = ('name', 'type', 'x', 'y', 'width', 'height', 'gid')
+    geometry = frozenset(('x', 'y', 'width', 'height'))
+
+    # defaults from the specification, not stored per object
+    defaults = {'rotation': 0, 'visible': 1}
+
+    def __init__(self, group, index):
+        object.__setattr__(self, '_group', group)
+        object.__setattr__(self, '_index', index)
+
+    def __repr__(self):
+        return "<{0}: \"{1}\">".format(self.__class__.__name__, self.name)
+
+    def __eq__(self, other):
+        return (isinstance(other, TiledObject) and self._group is other._group and
+                self._index == other._index)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._group), self._index))
+
+    def __getattr__(self, key):
+        try:
+            return self.__dict__[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self.__dict__[key] = value
+
+    @property
+    def __dict__(self):
+        return TiledObjectProperties(self._group, self._index)
+
+    # the columns are read straight from the group, the quickest way in
+    name = property(lambda self: self._group.names[self._index])
+    type = property(lambda self: self._group.types[self._index])
+    x = property(lambda self: whole(self._group.xs[self._index]))
+    y = property(lambda self: whole(self._group.ys[self._index]))
+    width = property(lambda self: whole(self._group.widths[self._index]))
+    height = property(lambda self: whole(self._group.heights[self._index]))
+    gid = property(lambda self: self._group.gids[self._index])
+
+
+class TiledObjectProperties(MutableMapping):
+    """
+    dict-like view of the attributes of the object at index in a group
+    """
+    __slots__ = ('group', 'index')
+
+    def __init__(self, group, index):
+        self.group = group
+        self.index = index
+
+    def __getitem__(self, key):
+        column = self.group.columns.get(key)
+        if column is not None:
+            value = column[self.index]
+            return whole(value) if key in TiledObject.geometry else value
+        if key == 'parent':
+            return self.group.parent
+        extra = self.group.extra[self.index]
+        if extra is not None and key in extra:
+            return extra[key]
+        return TiledObject.defaults[key]
+
+    def __setitem__(self, key, value):
+        column = self.group.columns.get(key)
+        if column is not None:
+            column[self.index] = value
+        elif key != 'parent':
+            if self.group.extra[self.index] is None:
+                self.group.extra[self.index] = {}
+            self.group.extra[self.index][key] = value
+
+    def __delitem__(self, key):
+        extra = self.group.extra[self.index] or {}
+        if key not in extra:
+            raise KeyError(key)
+        del extra[key]
+
+    def __iter__(self):
+        extra = self.group.extra[self.index] or {}
+        keys = ['parent'] + list(TiledObject.columns)
+        keys.extend(key for key in TiledObject.defaults if key not in extra)
+        keys.extend(extra)
+        return iter(keys)
+
+    def __len__(self):
+        return sum(1 for key in self)
 
 class TiledImageLayer(TiledElement):
     reserved = "visible source name width height opacity visible".split()
@@ -1,5 +1,7 @@
 import itertools
+import multiprocessing
 import os
+from multiprocessing.pool import ThreadPool
 import pygame
 import pytmx
 from .constants import *
@@ -30,21 +32,25 @@ def handle_transformation(tile, flags):
         return tile
 
 
-def smart_convert(original, colorkey, force_colorkey, pixelalpha):
+def smart_convert(original, colorkey, force_colorkey, pixelalpha, opaque=None):
     """
     this method does several tests on a surface to determine the optimal
     flags and pixel format for each tile surface.
 
     this is done for the best rendering speeds and removes the need to
     convert() the images on your own
+
+    pass opaque if it is already known whether every pixel is opaque.
     """
     tile_size = original.get_size()
 
-    # count the number of pixels in the tile that are not transparent
-    px = pygame.mask.from_surface(original).count()
+    if opaque is None:
+        # count the number of pixels in the tile that are not transparent
+        px = pygame.mask.from_surface(original).count()
+        opaque = px == tile_size[0] * tile_size[1]
 
     # there are no transparent pixels in the image
-    if px == tile_size[0] * tile_size[1]:
+    if opaque:
         tile = original.convert()
 
     # there are transparent pixels, and set to force a colorkey
@@ -70,6 +76,122 @@ def smart_convert(original, colorkey, force_colorkey, pixelalpha):
     return tile
 
 
+class TilesetOpacity(object):
+    """
+    answers whether tiles of a tileset image are fully opaque, from one
+    mask of the whole image instead of a mask per tile.
+    """
+    def __init__(self, image):
+        if not image.get_flags() & pygame.SRCALPHA and image.get_colorkey() is None:
+            self.mask = None
+        else:
+            self.mask = pygame.mask.from_surface(image)
+            w, h = image.get_size()
+            if self.mask.count() == w * h:
+                self.mask = None
+        self.full = {}
+
+    def is_opaque(self, rect):
+        if self.mask is None:
+            return True
+        size = rect[1]
+        full = self.full.get(size)
+        if full is None:
+            full = pygame.mask.Mask(size)
+            full.fill()
+            self.full[size] = full
+        return self.mask.overlap_area(full, rect[0]) == size[0] * size[1]
+
+
+def _load_tileset_image(path):
+    """
+    load a tileset image and work out the opacity of its tiles.
+    """
+    image = pygame.image.load(path)
+    return image, TilesetOpacity(image)
+
+
+def _tileset_tiles(ts, image):
+    """
+    return an iterator of (real_gid, rect) for every tile of a tileset.
+    """
+    w, h = image.get_size()
+
+    # margins and spacing
+    tilewidth = ts.tilewidth + ts.spacing
+    tileheight = ts.tileheight + ts.spacing
+    tile_size = ts.tilewidth, ts.tileheight
+
+    # some tileset images may be slightly larger than the tile area
+    # ie: may include a banner, copyright, ect.  this compensates for that
+    width = int((((w - ts.margin * 2 + ts.spacing) / tilewidth) * tilewidth) - ts.spacing)
+    height = int((((h - ts.margin * 2 + ts.spacing) / tileheight) * tileheight) - ts.spacing)
+
+    # trim off any pixels on the right side that isn't a tile
+    # this happens if extra graphics are included on the left, but they are not actually part of the tileset
+    width -= (w - ts.margin) % tilewidth
+
+    # using product avoids the overhead of nested loops
+    p = itertools.product(xrange(ts.margin, height + ts.margin, tileheight),
+                          xrange(ts.margin, width + ts.margin, tilewidth))
+
+    for real_gid, (y, x) in enumerate(p, ts.firstgid):
+        if x + ts.tilewidth-ts.spacing > width:
+            continue
+
+        yield real_gid, ((x, y), tile_size)
+
+
+def _used_tiles(tmxdata, ts, image):
+    """
+    return a list of (real_gid, rect) for the tiles of a tileset the map
+    uses.
+    """
+    return [(real_gid, rect) for real_gid, rect in _tileset_tiles(ts, image)
+            if tmxdata.map_gid(real_gid)]
+
+
+class LazyTileImages(object):
+    """
+    image loader of a map with chunked layers, whose gids are registered as
+    their chunks are decoded: makes the tile image of each gid as it is
+    registered, from the tileset images already loaded.
+    """
+    def __init__(self, tmxdata, loaded, colorkeys, force_colorkey, pixelalpha):
+        self.force_colorkey = force_colorkey
+        self.pixelalpha = pixelalpha
+        self.tiles = {}
+        for ts, (image, opacity), colorkey in zip(tmxdata.tilesets, loaded, colorkeys):
+            for real_gid, rect in _tileset_tiles(ts, image):
+                self.tiles[real_gid] = image, opacity, rect, colorkey
+
+    def __call__(self, real_gid, flags):
+        try:
+            image, opacity, rect, colorkey = self.tiles[real_gid]
+        except KeyError:
+            return 0
+        tile = handle_transformation(image.subsurface(rect), flags)
+        return smart_convert(tile, colorkey, self.force_colorkey, self.pixelalpha,
+                             opacity.is_opaque(rect))
+
+
+def _convert_tiles(tmxdata, image, opacity, tiles, colorkey, force_colorkey, pixelalpha):
+    """
+    slice and convert tiles out of a tileset image.  returns a list of
+    (gid, tile) for every gid the tiles are used as.
+    """
+    converted = []
+    for real_gid, rect in tiles:
+        original = image.subsurface(rect)
+        opaque = opacity.is_opaque(rect)
+
+        for gid, flags in tmxdata.map_gid(real_gid):
+            tile = handle_transformation(original, flags)
+            tile = smart_convert(tile, colorkey, force_colorkey, pixelalpha, opaque)
+            converted.append((gid, tile))
+    return converted
+
+
 def _load_images_pygame(tmxdata, mapping, *args, **kwargs):
     """
     Utility function to load images.
@@ -97,10 +219,14 @@ def _load_images_pygame(tmxdata, mapping, *args, **kwargs):
     TL;DR:
     Don't attempt to convert() or convert_alpha() the individual tiles.  It is
     already done for you.
+
+    tileset images are loaded, and their tiles sliced and converted, on a
+    pool of "workers" threads (one per core by default).
     """
 
     pixelalpha = kwargs.get("pixelalpha", False)
     force_colorkey = kwargs.get("force_colorkey", False)
+    workers = kwargs.get("workers") or multiprocessing.cpu_count()
 
     if force_colorkey:
         pixelalpha = True
@@ -120,46 +246,51 @@ def _load_images_pygame(tmxdata, mapping, *args, **kwargs):
     # initialize the array of images
     tmxdata.images = [0] * tmxdata.maxgid
 
-    for ts in tmxdata.tilesets:
-        path = os.path.join(os.path.dirname(tmxdata.filename), ts.source)
-        image = pygame.image.load(path)
-        w, h = image.get_size()
-
-        # margins and spacing
-        tilewidth = ts.tilewidth + ts.spacing
-        tileheight = ts.tileheight + ts.spacing
-        tile_size = ts.tilewidth, ts.tileheight
-
-        # some tileset images may be slightly larger than the tile area
-        # ie: may include a banner, copyright, ect.  this compensates for that
-        width = int((((w - ts.margin * 2 + ts.spacing) / tilewidth) * tilewidth) - ts.spacing)
-        height = int((((h - ts.margin * 2 + ts.spacing) / tileheight) * tileheight) - ts.spacing)
-
-        # trim off any pixels on the right side that isn't a tile
-        # this happens if extra graphics are included on the left, but they are not actually part of the tileset
-        width -= (w - ts.margin) % tilewidth
-
-        # using product avoids the overhead of nested loops
-        p = itertools.product(xrange(ts.margin, height + ts.margin, tileheight),
-                              xrange(ts.margin, width + ts.margin, tilewidth))
-
-        colorkey = getattr(ts, 'trans', None)
-        if colorkey:
-            colorkey = pygame.Color('#{0}'.format(colorkey))
-
-        for real_gid, (y, x) in enumerate(p, ts.firstgid):
-            if x + ts.tilewidth-ts.spacing > width:
-                continue
-
-            gids = tmxdata.map_gid(real_gid)
-
-            if gids:
-                original = image.subsurface(((x, y), tile_size))
-
-                for gid, flags in gids:
-                    tile = handle_transformation(original, flags)
-                    tile = smart_convert(tile, colorkey, force_colorkey, pixelalpha)
-                    tmxdata.images[gid] = tile
+    if workers > 1 and tmxdata.tilesets:
+        pool = ThreadPool(workers)
+        map_jobs = pool.map
+    else:
+        pool = None
+        map_jobs = map
+
+    try:
+        # decode every tileset image at once, each file only once
+        paths = [os.path.join(os.path.dirname(tmxdata.filename), ts.source)
+                 for ts in tmxdata.tilesets]
+        unique = sorted(set(paths))
+        loaded = dict(zip(unique, map_jobs(_load_tileset_image, unique)))
+
+        # then convert their tiles in chunks, so one big tileset is shared out too
+        jobs = []
+        colorkeys = []
+        for ts, path in zip(tmxdata.tilesets, paths):
+            image, opacity = loaded[path]
+            tiles = _used_tiles(tmxdata, ts, image)
+            colorkey = getattr(ts, 'trans', None)
+            if colorkey:
+                colorkey = pygame.Color('#{0}'.format(colorkey))
+            colorkeys.append(colorkey)
+
+            size = max(1, -(-len(tiles) // workers))
+            for i in xrange(0, len(tiles), size):
+                jobs.append((image, opacity, tiles[i:i + size], colorkey))
+
+        converted = map_jobs(lambda job: _convert_tiles(tmxdata, job[0], job[1], job[2],
+                                                        job[3], force_colorkey, pixelalpha),
+                             jobs)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    for tiles in converted:
+        for gid, tile in tiles:
+            tmxdata.images[gid] = tile
+
+    # image layers get gids of their own, keyed past every tileset's real
+    # gids so tiles registered lazily from chunks can never share them
+    free_gid = max([ts.firstgid + len(list(_tileset_tiles(ts, loaded[path][0])))
+                    for ts, path in zip(tmxdata.tilesets, paths)] + [1])
 
     # load image layer images
     for layer in tmxdata.all_layers:
@@ -170,14 +301,19 @@ def _load_images_pygame(tmxdata, mapping, *args, **kwargs):
 
             source = getattr(layer, 'source', None)
             if source:
-                real_gid = len(tmxdata.images)
-                gid = tmxdata.register_gid(real_gid)
+                gid = tmxdata.register_gid(free_gid)
+                free_gid += 1
                 layer.gid = gid
                 path = os.path.join(os.path.dirname(tmxdata.filename), source)
                 image = pygame.image.load(path)
                 image = smart_convert(image, colorkey, force_colorkey, pixelalpha)
                 tmxdata.images.append(image)
 
+    # the gids of chunked layers are only registered as their chunks are read
+    if any(isinstance(layer.data, pytmx.TiledChunkedData) for layer in tmxdata.tilelayers):
+        tmxdata.image_loader = LazyTileImages(tmxdata, [loaded[path] for path in paths],
+                                              colorkeys, force_colorkey, pixelalpha)
+
 
 def load_pygame(filename, *args, **kwargs):
     """
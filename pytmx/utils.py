@@ -5,7 +5,7 @@ from .constants import *
 
 
 def read_points(text):
-    return [ tuple(map(lambda x: int(x), i.split(',')))
+    return [ tuple(map(handle_number, i.split(',')))
          for i in text.split() ]
 
 
@@ -40,6 +40,15 @@ def decode_gid(raw_gid):
     return gid, flags
 
 
+def handle_number(text):
+    # tiled writes whole numbers for sizes, but object positions may be
+    # fractional
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
 def handle_bool(text):
     # properly convert strings to a bool
     try:
@@ -65,8 +74,8 @@ types = defaultdict(lambda: str)
 types.update({
     "version": float,
     "orientation": str,
-    "width": int,
-    "height": int,
+    "width": handle_number,
+    "height": handle_number,
     "tilewidth": int,
     "tileheight": int,
     "firstgid": int,
@@ -78,12 +87,13 @@ types.update({
     "id": int,
     "opacity": float,
     "visible": handle_bool,
+    "infinite": handle_bool,
     "encoding": str,
     "compression": str,
     "gid": int,
     "type": str,
-    "x": int,
-    "y": int,
+    "x": handle_number,
+    "y": handle_number,
     "value": str,
 })
 
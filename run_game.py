@@ -3,13 +3,74 @@ This is a side-scrolling platformer about a character
 who can wear shoes that make him bounce really high.
 """
 
+import argparse
+import os
 import sys
-import pygame as pg
-from data import setup
-from data.main import main
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Bouncy Shoes')
+    parser.add_argument('--headless', action='store_true',
+                        help='use the SDL dummy video and audio drivers')
+    parser.add_argument('--state', default='main menu',
+                        help='state to start in, e.g. "level1"')
+    parser.add_argument('--frames', type=int, default=None,
+                        help='quit after this many frames and print frame timings')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='frame rate cap, 0 for uncapped')
+    parser.add_argument('--frame-dt', type=float, default=None,
+                        help='advance the clock by this many seconds per frame '
+                             'instead of following the wall clock')
+    parser.add_argument('--fixed-dt', type=float, default=None,
+                        help='simulate in fixed ticks of this many seconds')
+    parser.add_argument('--profile', action='store_true',
+                        help='time each phase of the frame and print the '
+                             'results with the frame summary')
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help='write a Chrome trace-event file of frame spans')
+    parser.add_argument('--record', metavar='FILE', default=None,
+                        help='record input, clock and RNG seed to a file')
+    parser.add_argument('--replay', metavar='FILE', default=None,
+                        help='replay a recording instead of reading the keyboard')
+    parser.add_argument('--memory-budget', metavar='MB', type=float, default=None,
+                        help='evict rebuildable surface caches to stay under this')
+    parser.add_argument('--quality-budget', metavar='MS', type=float, default=None,
+                        help='lower quality settings while frames take longer than this')
+    parser.add_argument('--render-scale', type=float, default=None, choices=[1, 0.75, 0.5],
+                        help='draw levels at this fraction of 800x608')
+    parser.add_argument('--window', metavar='WxH', default=None,
+                        help='window size to scale the game to')
+    parser.add_argument('--fullscreen', action='store_true',
+                        help='scale the game to the whole screen')
+    parser.add_argument('--smooth', action='store_true',
+                        help='scale smoothly instead of to the nearest pixel')
+    parser.add_argument('--renderer', default='surface',
+                        choices=['surface', 'texture', 'software'],
+                        help='draw on surfaces, or composite textures with an SDL2 '
+                             'renderer (software: without a GPU)')
+    return parser.parse_args()
+
 
 if __name__=='__main__':
+    args = parse_args()
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    if args.window:
+        os.environ['BOUNCY_WINDOW'] = args.window
+    if args.fullscreen:
+        os.environ['BOUNCY_FULLSCREEN'] = '1'
+    if args.smooth:
+        os.environ['BOUNCY_SMOOTH'] = '1'
+    os.environ['BOUNCY_RENDERER'] = args.renderer
+
+    import pygame as pg
+    from data import setup
+    from data.main import main
+
     setup.GAME
-    main()
+    main(args.state, args.fps, args.frame_dt, args.fixed_dt, args.frames,
+         args.profile, args.trace, args.record, args.replay, args.memory_budget,
+         args.quality_budget, args.render_scale)
     pg.quit()
-    sys.exit()
\ No newline at end of file
+    sys.exit()
@@ -0,0 +1,75 @@
+"""
+Tests for data.collision:
+
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+from data import collision, tools
+
+
+class Box(pg.sprite.Sprite):
+    def __init__(self, x, y, width, height):
+        super(Box, self).__init__()
+        self.rect = pg.Rect(x, y, width, height)
+
+
+class FirstCollisionTest(unittest.TestCase):
+    """
+    first_collision replaced building a Group of several groups for every
+    check.  Over the level's OrderedGroups it finds what that temporary
+    group found, had it kept its members in order too.
+    """
+    def setUp(self):
+        generator = random.Random(0)
+
+        def group(count, width, height):
+            return tools.OrderedGroup([Box(generator.randrange(0, 1000), generator.randrange(0, 600),
+                                           width, height) for i in range(count)])
+
+        self.blockers = group(40, 70, 70)
+        self.item_boxes = group(10, 70, 70)
+        self.enemy_blockers = group(10, 10, 70)
+        self.groups = self.blockers, self.item_boxes, self.enemy_blockers
+        self.movers = [Box(generator.randrange(-50, 1050), generator.randrange(-50, 650), 50, 70)
+                       for i in range(500)]
+
+    def test_matches_a_combined_group(self):
+        overlapping = 0
+        for sprite in self.movers:
+            colliders = [s for group in self.groups for s in group
+                         if sprite.rect.colliderect(s.rect)]
+            found = collision.first_collision(sprite, *self.groups)
+            self.assertIs(found, pg.sprite.spritecollideany(sprite, tools.OrderedGroup(*self.groups)))
+            # what the old, unordered group found only differed when
+            # several sprites overlap
+            old = pg.sprite.spritecollideany(sprite, pg.sprite.Group(*self.groups))
+            self.assertEqual(found is None, old is None)
+            if len(colliders) == 1:
+                self.assertIs(found, old)
+            elif colliders:
+                overlapping += 1
+                self.assertIn(old, colliders)
+            self.assertIs(found, colliders[0] if colliders else None)
+        self.assertTrue(overlapping)
+
+    def test_groups_in_order(self):
+        sprite = Box(0, 0, 10, 10)
+        first, second = Box(5, 5, 10, 10), Box(0, 0, 10, 10)
+        self.assertIs(collision.first_collision(sprite, tools.OrderedGroup(first),
+                                                tools.OrderedGroup(second)), first)
+        self.assertIs(collision.first_collision(sprite, tools.OrderedGroup(),
+                                                tools.OrderedGroup(second)), second)
+        self.assertIsNone(collision.first_collision(sprite, tools.OrderedGroup(Box(50, 50, 5, 5))))
+        self.assertIsNone(collision.first_collision(sprite))
+
+
+if __name__ == '__main__':
+    unittest.main()
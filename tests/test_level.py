@@ -0,0 +1,96 @@
+"""
+Tests for data.states.level:
+
+    python -m unittest discover tests
+"""
+
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+from data import setup
+from data import constants as c
+from data.states import level
+
+
+class Corpse(pg.sprite.Sprite):
+    def __init__(self, x, y, color, state=c.DEAD_ON_GROUND):
+        super(Corpse, self).__init__()
+        self.image = pg.Surface((40, 40))
+        self.image.fill(color)
+        self.rect = self.image.get_rect(topleft=(x, y))
+        self.state = state
+
+
+class CorpseBakingTest(unittest.TestCase):
+    def setUp(self):
+        self.level = level.Level('level1')
+        self.level.startup(0.0, {})
+        self.clean = self.level.map_image.copy()
+
+    def tearDown(self):
+        self.level.cleanup()
+        self.level.evict()
+
+    def pixels(self, surface, rect):
+        return pg.image.tostring(surface.subsurface(rect), 'RGB')
+
+    def assertStamped(self, corpse):
+        self.assertEqual(self.pixels(self.level.map_image, corpse.rect),
+                         pg.image.tostring(corpse.image, 'RGB'))
+
+    def assertClean(self, rect):
+        self.assertEqual(self.pixels(self.level.map_image, rect),
+                         self.pixels(self.clean, rect))
+
+    def test_only_corpses_on_the_ground_are_baked(self):
+        dead = Corpse(300, 300, (255, 0, 0))
+        falling = Corpse(400, 300, (0, 255, 0), state=c.FREE_FALL)
+        self.level.dead_enemy_group1.add(dead)
+        self.level.dead_enemy_group2.add(falling)
+        self.level.bake_corpses()
+        self.assertFalse(dead.alive())
+        self.assertTrue(falling.alive())
+        self.assertStamped(dead)
+        self.assertClean(falling.rect)
+        self.assertEqual(self.level.baked, [(dead.image, dead.rect)])
+
+    def test_only_the_last_corpses_stay(self):
+        corpses = [Corpse(200 + 20 * i, 300, (255, i, 0))
+                   for i in range(level.MAX_BAKED_CORPSES + 2)]
+        for corpse in corpses:
+            self.level.dead_enemy_group1.add(corpse)
+            self.level.bake_corpses()
+        self.assertEqual(len(self.level.baked), level.MAX_BAKED_CORPSES)
+        self.assertEqual([image for image, rect in self.level.baked],
+                         [corpse.image for corpse in corpses[2:]])
+        # the first two are wiped, and the first lay under nothing else
+        self.assertClean(corpses[0].rect)
+        self.assertStamped(corpses[-1])
+
+    def test_set_baked_empty_restores_the_map(self):
+        corpses = [Corpse(300, 300, (255, 0, 0)), Corpse(320, 310, (0, 0, 255))]
+        self.level.dead_enemy_group1.add(*corpses)
+        self.level.bake_corpses()
+        area = corpses[0].rect.union(corpses[1].rect)
+        self.assertNotEqual(self.pixels(self.level.map_image, area),
+                            self.pixels(self.clean, area))
+        self.level.set_baked([])
+        self.assertEqual(self.level.baked, [])
+        self.assertClean(area)
+
+    def test_startup_wipes_the_corpses(self):
+        corpse = Corpse(300, 300, (255, 0, 0))
+        self.level.dead_enemy_group1.add(corpse)
+        self.level.bake_corpses()
+        self.level.cleanup()
+        self.level.startup(0.0, {})
+        self.assertEqual(self.level.baked, [])
+        self.assertClean(corpse.rect)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for data.memory:
+
+    python -m unittest discover tests
+"""
+
+import gc
+import os
+import threading
+import unittest
+import weakref
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame as pg
+from data import memory, tools
+
+
+class Cycle(object):
+    """
+    Garbage only the cycle collector frees, holding a surface.
+    """
+    def __init__(self, surface):
+        self.surface = surface
+        self.me = self
+
+
+class CollectingWeakref(object):
+    """
+    Stands in for the weakref module in data.memory, running the garbage
+    collector as each weakref is made, so inside track's lock.
+    """
+    def ref(self, *args):
+        gc.collect()
+        return weakref.ref(*args)
+
+
+class CachedState(tools._State):
+    """
+    A state holding one surface in a cache, rebuilt by prepare.
+    """
+    def __init__(self, name, next_name):
+        super(CachedState, self).__init__()
+        self.next = next_name
+        self.surface = None
+        self.prepares = 0
+        memory.add_cache(name, self.evict, self)
+
+    def prepare(self):
+        if self.surface is None:
+            self.surface = memory.track(pg.Surface((100, 100)), 'test', 'state')
+            self.prepares += 1
+
+    def evict(self):
+        freed, self.surface = self.surface is not None, None
+        return freed
+
+
+class SurfaceRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = memory.SurfaceRegistry()
+
+    def test_freed_surfaces_are_forgotten(self):
+        surface = pg.Surface((10, 10))
+        self.registry.track(surface, 'test', 'owner')
+        self.assertEqual(self.registry.total, memory.surface_bytes(surface))
+        del surface
+        self.assertEqual(self.registry.total, 0)
+        self.assertEqual(self.registry.entries, {})
+
+    def test_collection_inside_track(self):
+        self.registry.track(Cycle(pg.Surface((10, 10))).surface, 'test', 'garbage')
+        gc.disable()
+        memory.weakref = CollectingWeakref()
+        try:
+            surface = pg.Surface((20, 20))
+            thread = threading.Thread(target=self.registry.track,
+                                      args=(surface, 'test', 'owner'))
+            thread.daemon = True
+            thread.start()
+            thread.join(5)
+        finally:
+            memory.weakref = weakref
+            gc.enable()
+        self.assertFalse(thread.is_alive(), 'track deadlocked')
+        self.assertEqual(self.registry.total, memory.surface_bytes(surface))
+
+    def test_enforce_keeps_caches_of_kept_owners(self):
+        owner, other = object(), object()
+        kept = [pg.Surface((10, 10))]
+        dropped = [pg.Surface((10, 10))]
+        self.registry.track(kept[0], 'test', 'kept')
+        self.registry.track(dropped[0], 'test', 'dropped')
+        self.registry.add_cache('kept', lambda: bool(kept and kept.pop()), owner)
+        self.registry.add_cache('dropped', lambda: bool(dropped and dropped.pop()), other)
+        self.registry.budget = 1
+        self.assertEqual(self.registry.enforce(keep=(owner,)), ['dropped'])
+        self.assertEqual(len(kept), 1)
+        self.assertTrue(self.registry.over_budget)
+
+
+class FlipStateTest(unittest.TestCase):
+    def setUp(self):
+        pg.display.init()
+        pg.display.set_mode((1, 1))
+        self.registry = memory.REGISTRY
+        memory.REGISTRY = memory.SurfaceRegistry(budget=1)
+
+    def tearDown(self):
+        memory.REGISTRY = self.registry
+
+    def test_flip_keeps_the_state_that_comes_next(self):
+        # a level leading to a screen that leads back to it, as on death
+        level = CachedState('level', 'screen')
+        screen = CachedState('screen', 'level')
+        other = CachedState('other', None)
+        for state in level, screen, other:
+            state.prepare()
+        control = tools.Control('test')
+        control.setup_states({'level': level, 'screen': screen, 'other': other}, 'level')
+        level.done = True
+        control.flip_state()
+        control.wait_for_preload()
+        self.assertIsNone(other.surface)
+        self.assertIsNotNone(level.surface)
+        self.assertIsNotNone(screen.surface)
+        self.assertEqual(level.prepares, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,344 @@
+"""
+Tests for the vendored pytmx:
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import pygame as pg
+import pytmx
+
+pytmx_module = sys.modules['pytmx.pytmx']
+
+GRAPHICS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'resources', 'graphics')
+FLIP = 0x80000000
+
+OBJECTS_TMX = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.0" orientation="orthogonal" width="4" height="2" tilewidth="16" tileheight="16">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16">
+  <image source="tiles.png" width="64" height="16"/>
+ </tileset>
+ <layer name="ground" width="4" height="2">
+  <data encoding="csv">
+1,2,3,4,
+0,0,0,0
+</data>
+ </layer>
+ <objectgroup name="things">
+  <object name="blocker" type="solid" x="16" y="32" width="48" height="16"/>
+  <object name="ledge" x="10.5" y="20.25" width="5.5" height="1"/>
+  <object name="slope" x="0" y="0">
+   <polygon points="0,0 32,0 32,16"/>
+  </object>
+  <object name="box" type="item" x="64" y="0" width="16" height="16" gid="2" rotation="90">
+   <properties>
+    <property name="contents" value="coin"/>
+   </properties>
+  </object>
+  <object name="flipped" x="80" y="0" width="16" height="16" gid="2147483651"/>
+ </objectgroup>
+</map>
+"""
+
+
+class ObjectGroupTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'objects.tmx')
+        with open(path, 'w') as f:
+            f.write(OBJECTS_TMX)
+        self.tmx = pytmx.load_tmx(path)
+        self.group = self.tmx.objectgroups[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def names(self):
+        return [o.name for o in self.group]
+
+    def test_attributes(self):
+        blocker, ledge, slope, box, flipped = self.group
+        self.assertEqual((blocker.name, blocker.type), ('blocker', 'solid'))
+        self.assertEqual(blocker.rotation, 0)
+        self.assertEqual(blocker.visible, 1)
+        self.assertIs(blocker.parent, self.tmx)
+        self.assertEqual(box.contents, 'coin')
+        # attributes without a type in pytmx.utils.types stay strings
+        self.assertEqual(box.rotation, '90')
+        self.assertEqual(slope.points, ((0, 0), (32, 0), (32, 16)))
+        self.assertTrue(slope.closed)
+        self.assertEqual((slope.width, slope.height), (32, 16))
+        self.assertRaises(AttributeError, getattr, blocker, 'contents')
+
+    def test_geometry_round_trip(self):
+        blocker, ledge = self.group[:2]
+        self.assertEqual((blocker.x, blocker.y, blocker.width, blocker.height), (16, 32, 48, 16))
+        self.assertTrue(all(type(v) is int for v in (blocker.x, blocker.y, blocker.width)))
+        self.assertEqual((ledge.x, ledge.y, ledge.width), (10.5, 20.25, 5.5))
+        self.assertIs(type(ledge.height), int)
+        ledge.x = 3
+        self.assertIs(type(ledge.x), int)
+        ledge.x = 3.75
+        self.assertEqual(ledge.x, 3.75)
+        self.assertEqual(ledge.__dict__['x'], 3.75)
+        self.assertIs(type(ledge.__dict__['y']), float)
+
+    def test_tile_object_gids(self):
+        box, flipped = self.group[3:]
+        self.assertEqual(self.tmx.map_gid(2), [(box.gid, 0)])
+        self.assertNotEqual(flipped.gid, 0)
+        # flip flags need the top bit, past a signed 32 bit long
+        flipped.gid = 0x80000003
+        self.assertEqual(flipped.gid, 0x80000003)
+
+    def test_dict(self):
+        box = self.group[3]
+        values = dict(box.__dict__)
+        self.assertEqual(values['name'], 'box')
+        self.assertEqual(values['contents'], 'coin')
+        self.assertEqual(values['rotation'], '90')
+        self.assertIs(values['parent'], self.tmx)
+        self.assertIn('gid', values)
+        box.__dict__['contents'] = 'star'
+        self.assertEqual(box.contents, 'star')
+        box.extra_life = True
+        self.assertTrue(box.__dict__['extra_life'])
+        del box.__dict__['extra_life']
+        self.assertNotIn('extra_life', box.__dict__)
+        self.assertEqual(vars(self.group[0]).get('contents'), None)
+
+    def test_indexing(self):
+        self.assertEqual(len(self.group), 5)
+        self.assertEqual(self.group[-1].name, 'flipped')
+        self.assertEqual(self.group[-5].name, 'blocker')
+        self.assertRaises(IndexError, self.group.__getitem__, 5)
+        self.assertRaises(IndexError, self.group.__getitem__, -6)
+        self.assertEqual([o.name for o in self.group[1:4:2]], ['ledge', 'box'])
+        self.assertEqual([o.name for o in self.group[::-1]], self.names()[::-1])
+        self.assertEqual([o.name for o in self.group[-2:]], ['box', 'flipped'])
+        self.assertEqual(self.group[10:], [])
+
+    def test_list_operations(self):
+        box = self.group[3]
+        self.assertIn(box, self.group)
+        self.assertEqual(self.group.index(box), 3)
+        self.assertEqual(self.group.count(box), 1)
+
+        popped = self.group.pop(3)
+        self.assertEqual((popped.name, popped.contents, popped.rotation), ('box', 'coin', '90'))
+        self.assertEqual(self.names(), ['blocker', 'ledge', 'slope', 'flipped'])
+
+        self.group.insert(0, popped)
+        self.assertEqual(self.names(), ['box', 'blocker', 'ledge', 'slope', 'flipped'])
+        self.assertEqual(self.group[0].contents, 'coin')
+        self.assertRaises(AttributeError, getattr, self.group[1], 'contents')
+
+        self.group.remove(self.group[2])
+        self.assertEqual(self.names(), ['box', 'blocker', 'slope', 'flipped'])
+
+        self.group.sort(key=lambda o: o.name)
+        self.assertEqual(self.names(), ['blocker', 'box', 'flipped', 'slope'])
+        self.assertEqual(self.group[1].contents, 'coin')
+        self.assertEqual(self.group[3].points, ((0, 0), (32, 0), (32, 16)))
+
+        self.group.reverse()
+        self.assertEqual(self.names(), ['slope', 'flipped', 'box', 'blocker'])
+
+        self.group[0] = self.group[2]
+        self.assertEqual(self.names(), ['box', 'flipped', 'box', 'blocker'])
+        self.group[0].contents = 'star'
+        self.assertEqual(self.group[2].contents, 'coin')
+
+        del self.group[1:3]
+        self.assertEqual(self.names(), ['box', 'blocker'])
+        self.group[1:1] = [popped, popped]
+        self.assertEqual(self.names(), ['box', 'box', 'box', 'blocker'])
+        self.group[::2] = [self.group[3], self.group[3]]
+        self.assertEqual(self.names(), ['blocker', 'box', 'blocker', 'blocker'])
+        self.assertRaises(ValueError, self.group.__setitem__, slice(None, None, 2), [popped])
+        self.group.extend([popped])
+        self.group += [popped]
+        self.assertEqual(len(self.group), 6)
+        self.assertEqual(self.group[-1].contents, 'coin')
+        self.assertEqual(self.group.pop().name, 'box')
+        self.assertEqual(len(self.group), 5)
+
+    def test_append_plain_object(self):
+        class Plain(object):
+            pass
+        o = Plain()
+        o.name, o.x, o.y, o.width, o.height, o.hidden = 'plain', 1, 2.5, 3, 4, True
+        self.group.append(o)
+        added = self.group[-1]
+        self.assertEqual((added.name, added.type, added.x, added.y, added.gid),
+                         ('plain', None, 1, 2.5, 0))
+        self.assertTrue(added.hidden)
+        self.assertEqual(added.rotation, 0)
+
+
+def chunked_tmx(grid, chunk, image_layer=False):
+    """
+    return an infinite map of grid, a list of rows of real gids, in csv
+    chunks of chunk tiles, leaving out the chunks without tiles
+    """
+    height, width = len(grid), len(grid[0])
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<map version="1.0" orientation="orthogonal" width="{0}" height="{1}" '
+             'tilewidth="70" tileheight="70" infinite="1">'.format(width, height),
+             ' <tileset firstgid="1" name="sheet" tilewidth="70" tileheight="70">',
+             '  <image source="{0}" width="910" height="910"/>'.format(
+                 os.path.join(GRAPHICS, 'spritesheet1.png')),
+             '  <tile id="9"><properties><property name="solid" value="1"/></properties></tile>',
+             ' </tileset>',
+             ' <layer name="tiles" width="{0}" height="{1}">'.format(width, height),
+             '  <data encoding="csv">']
+    for top in range(0, height, chunk):
+        for left in range(0, width, chunk):
+            rows = [row[left:left + chunk] for row in grid[top:top + chunk]]
+            if any(any(row) for row in rows):
+                lines.append('   <chunk x="{0}" y="{1}" width="{2}" height="{2}">'.format(
+                    left, top, chunk))
+                lines.append(',\n'.join(','.join(str(gid) for gid in row) for row in rows))
+                lines.append('   </chunk>')
+    lines.extend(['  </data>', ' </layer>'])
+    if image_layer:
+        lines.extend([' <imagelayer name="sky">',
+                      '  <image source="{0}"/>'.format(os.path.join(GRAPHICS, 'spritesheet1.png')),
+                      ' </imagelayer>'])
+    lines.append('</map>')
+    return '\n'.join(lines)
+
+
+class ChunkedLayerTest(unittest.TestCase):
+    # 12x8 tiles in 4x4 chunks; the chunk at 4,4 is empty, and so left out
+    GRID = [[1, 2, 3, 4, 5, 6, 7, 8, 1, 2, 3, 4],
+            [10, 0, 0, 0, 0, 0, 0, 9, 0, 0, 0, 10],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [FLIP | 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, FLIP | 5],
+            [11, 12, 0, 0, 0, 0, 0, 0, 0, 0, 13, 14],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [15, 16, 17, 18, 0, 0, 0, 0, 19, 20, 21, 22]]
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pg.display.init()
+        pg.display.set_mode((1, 1))
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.max_decoded = pytmx_module.MAX_DECODED_CHUNKS
+
+    def tearDown(self):
+        pytmx_module.MAX_DECODED_CHUNKS = self.max_decoded
+        shutil.rmtree(self.directory)
+
+    def load(self, images=True, **options):
+        path = os.path.join(self.directory, 'chunked.tmx')
+        with open(path, 'w') as f:
+            f.write(chunked_tmx(self.GRID, 4, **options))
+        if images:
+            return pytmx.load_pygame(path)
+        return pytmx.load_tmx(path)
+
+    def real_gids(self, tmx, gids):
+        """
+        return the real gids, with flip flags, of internal gids
+        """
+        real = {0: 0}
+        for (real_gid, flags), value in tmx.imagemap.items():
+            if real_gid:
+                # the grid only flips tiles across x
+                real[value[0]] = real_gid | (FLIP if flags else 0)
+        return [real[gid] for gid in gids]
+
+    def test_lazy_decoding(self):
+        tmx = self.load()
+        data = tmx.tilelayers[0].data
+        self.assertIsInstance(data, pytmx.TiledChunkedData)
+        self.assertEqual((tmx.width, tmx.height), (12, 8))
+        self.assertEqual(data.decodes, 0)
+        self.assertEqual(len(data.chunks), 5)
+        data[1][11]
+        self.assertEqual(data.decodes, 1)
+
+    def test_tiles(self):
+        tmx = self.load()
+        data = tmx.tilelayers[0].data
+        for y, row in enumerate(self.GRID):
+            self.assertEqual(self.real_gids(tmx, [data[y][x] for x in range(12)]), row)
+            self.assertEqual(self.real_gids(tmx, list(data[y])), row)
+        self.assertEqual(data.decodes, 5)
+
+    def test_slices_across_chunks(self):
+        tmx = self.load()
+        data = tmx.tilelayers[0].data
+        for y, row in enumerate(self.GRID):
+            for index in (slice(2, 10), slice(3, 5), slice(0, 12), slice(7, 20),
+                          slice(None, None, 3), slice(None, None, -1), slice(-6, -1),
+                          slice(10, 2), slice(5, 5)):
+                self.assertEqual(self.real_gids(tmx, data[y][index]), row[index])
+            self.assertEqual(self.real_gids(tmx, [data[y][-1]]), [row[-1]])
+        self.assertEqual([self.real_gids(tmx, r[:]) for r in data[2:6]], self.GRID[2:6])
+        self.assertEqual(self.real_gids(tmx, data[-1][:]), self.GRID[-1])
+        self.assertRaises(IndexError, data.__getitem__, 8)
+        self.assertRaises(IndexError, data[0].__getitem__, 12)
+
+    def test_eviction(self):
+        pytmx_module.MAX_DECODED_CHUNKS = 2
+        tmx = self.load()
+        data = tmx.tilelayers[0].data
+        first = [data[y][:] for y in range(8)]
+        self.assertLessEqual(len(data.decoded), 2)
+        decodes = data.decodes
+        maxgid = tmx.maxgid
+        second = [data[y][:] for y in range(8)]
+        self.assertGreater(data.decodes, decodes)
+        self.assertLessEqual(len(data.decoded), 2)
+        self.assertEqual(second, first)
+        # decoding again finds the gids already registered
+        self.assertEqual(tmx.maxgid, maxgid)
+        self.assertEqual(len(tmx.images), maxgid)
+
+    def test_late_gids(self):
+        tmx = self.load()
+        data = tmx.tilelayers[0].data
+        self.assertFalse(tmx.map_gid(10))
+        gid = data[1][0]
+        self.assertEqual(tmx.map_gid(10), [(gid, 0)])
+        self.assertEqual(tmx.getTilePropertiesByGID(gid)['solid'], '1')
+        image = tmx.getTileImageByGid(gid)
+        self.assertEqual(image.get_size(), (70, 70))
+        flipped = data[3][0]
+        self.assertNotEqual(flipped, data[3][1])
+        self.assertEqual(tmx.getTileImageByGid(flipped).get_size(), (70, 70))
+        for row in data:
+            list(row)
+        self.assertEqual(len(tmx.images), tmx.maxgid)
+        self.assertTrue(all(tmx.images[1:]))
+
+    def test_image_layer_gid(self):
+        tmx = self.load(image_layer=True)
+        sky = tmx.imagelayers[0]
+        sky_image = tmx.getTileImageByGid(sky.gid)
+        self.assertEqual(sky_image.get_size(), (910, 910))
+        for row in tmx.tilelayers[0].data:
+            self.assertNotIn(sky.gid, list(row))
+        self.assertIs(tmx.getTileImageByGid(sky.gid), sky_image)
+        first = tmx.tilelayers[0].data[0][0]
+        self.assertEqual(tmx.getTileImageByGid(first).get_size(), (70, 70))
+
+    def test_without_images(self):
+        tmx = self.load(images=False)
+        data = tmx.tilelayers[0].data
+        self.assertEqual(self.real_gids(tmx, data[7][:]), self.GRID[7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Tests for data.quality:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+from data import quality
+
+BUDGET = 0.016
+SLOW = 0.020
+# under budget, but not under headroom times the budget
+CLOSE = 0.012
+FAST = 0.004
+
+
+class QualityControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = dict(quality.SETTINGS)
+        self.controller = quality.QualityController(BUDGET, window=10, headroom=0.5,
+                                                    raise_frames=60)
+
+    def tearDown(self):
+        quality.SETTINGS.update(self.settings)
+
+    def feed(self, frame_time, frames):
+        for i in range(frames):
+            self.controller.add_frame(frame_time)
+
+    def test_waits_for_a_full_window(self):
+        self.feed(SLOW, 9)
+        self.assertEqual(self.controller.changes, 0)
+        self.feed(SLOW, 1)
+        self.assertEqual(self.controller.pulled, ['tint'])
+        self.assertFalse(quality.SETTINGS['tint'])
+
+    def test_each_setting_judged_on_its_own_frames(self):
+        self.feed(SLOW, 19)
+        self.assertEqual(self.controller.pulled, ['tint'])
+        self.feed(SLOW, 1)
+        self.assertEqual(self.controller.pulled, ['tint', 'enemy interval'])
+        self.assertEqual(quality.SETTINGS['enemy interval'], 2)
+
+    def test_a_few_slow_frames_are_ignored(self):
+        # the p90 of ten frames is the ninth slowest
+        for i in range(20):
+            self.feed(CLOSE, 9)
+            self.feed(SLOW, 1)
+        self.assertEqual(self.controller.changes, 0)
+
+    def test_hysteresis(self):
+        self.feed(SLOW, 20)
+        self.assertEqual(self.controller.pulled, ['tint', 'enemy interval'])
+        self.feed(FAST, 59)
+        self.assertEqual(self.controller.changes, 2)
+        self.feed(FAST, 1)
+        # released last pulled first, with raise_frames between releases
+        self.assertEqual(self.controller.pulled, ['tint'])
+        self.assertEqual(quality.SETTINGS['enemy interval'], 1)
+        self.feed(FAST, 59)
+        self.assertEqual(self.controller.pulled, ['tint'])
+        self.feed(FAST, 1)
+        self.assertEqual(self.controller.pulled, [])
+        self.assertTrue(quality.SETTINGS['tint'])
+        self.feed(FAST, 600)
+        self.assertEqual(self.controller.changes, 4)
+
+    def test_no_raise_without_headroom(self):
+        self.feed(SLOW, 10)
+        self.feed(CLOSE, 1000)
+        self.assertEqual(self.controller.pulled, ['tint'])
+        # once there is headroom, quality comes back within a window
+        self.feed(FAST, 10)
+        self.assertEqual(self.controller.pulled, [])
+
+    def test_cheapest_settings_stay(self):
+        self.feed(SLOW, 1000)
+        for name, values in quality.LEVERS.items():
+            self.assertEqual(quality.SETTINGS[name], values[-1])
+        self.assertEqual(len(self.controller.pulled),
+                         sum(len(values) - 1 for values in quality.LEVERS.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
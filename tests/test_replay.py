@@ -0,0 +1,82 @@
+"""
+Tests for data.replay:
+
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import pygame as pg
+from data import replay
+
+# what pg.K_RIGHT and pg.K_LEFT are on pygame 2
+SDL2_RIGHT = 0x4000004F
+SDL2_LEFT = 0x40000050
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'run.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self, frames, seed=1234):
+        recorder = replay.Recorder(self.path, 'level1', seed)
+        for events, keys, ticks in frames:
+            recorder.add_frame(events, keys, ticks)
+        recorder.close()
+
+    def test_round_trip(self):
+        frames = [([], replay.KeyState(), 16.0),
+                  ([pg.event.Event(pg.KEYDOWN, key=pg.K_RIGHT)],
+                   replay.KeyState([pg.K_RIGHT]), 33.5),
+                  ([pg.event.Event(pg.KEYDOWN, key=pg.K_a),
+                    pg.event.Event(pg.KEYUP, key=pg.K_RIGHT)],
+                   replay.KeyState([pg.K_a]), 50.0)]
+        self.record(frames)
+        played = replay.Replay(self.path)
+        self.assertEqual(played.start_state, 'level1')
+        self.assertEqual(played.seed, 1234)
+        for events, keys, ticks in frames:
+            self.assertFalse(played.finished)
+            got_events, got_keys, got_ticks = played.next_frame()
+            self.assertEqual([(e.type, e.key) for e in got_events],
+                             [(e.type, e.key) for e in events])
+            self.assertEqual(got_keys.pressed, keys.pressed)
+            self.assertEqual(got_ticks, ticks)
+        self.assertTrue(played.finished)
+
+    def test_replay_reseeds(self):
+        self.record([])
+        random.seed(1234)
+        expected = random.random()
+        random.seed(0)
+        replay.Replay(self.path)
+        self.assertEqual(random.random(), expected)
+
+    def test_sdl2_keycodes(self):
+        self.record([([pg.event.Event(pg.KEYDOWN, key=SDL2_RIGHT)],
+                      replay.KeyState([SDL2_RIGHT, SDL2_LEFT]), 16.0)])
+        events, keys, ticks = replay.Replay(self.path).next_frame()
+        self.assertEqual(events[0].key, SDL2_RIGHT)
+        self.assertEqual(keys[SDL2_RIGHT], 1)
+        self.assertEqual(keys[SDL2_LEFT], 1)
+
+    def test_pressed_keys_are_keycodes(self):
+        pressed = [0] * (max(replay.KEYCODES) + 1)
+        pressed[pg.K_RIGHT] = pressed[pg.K_SPACE] = 1
+        self.assertEqual(replay.pressed_keys(pressed), sorted([pg.K_RIGHT, pg.K_SPACE]))
+
+    def test_old_version_is_rejected(self):
+        with open(self.path, 'wb') as f:
+            f.write(replay.HEADER.pack(replay.MAGIC, 1, 0, 0))
+        self.assertRaises(ValueError, replay.Replay, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
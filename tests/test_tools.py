@@ -0,0 +1,97 @@
+"""
+Tests for data.tools:
+
+    python -m unittest discover tests
+"""
+
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame as pg
+from data import tools
+
+
+class SteppedState(tools._State):
+    """
+    Records the ticks it is stepped and the interpolation it is drawn at.
+    """
+    def __init__(self):
+        super(SteppedState, self).__init__()
+        self.fixed_step = True
+        self.steps = []
+        self.draws = []
+
+    def step(self, keys, current_time, dt):
+        self.steps.append((current_time, dt))
+
+    def draw(self, surface, interpolation):
+        self.draws.append((len(self.steps), interpolation))
+
+
+class UpdatedState(tools._State):
+    """
+    Records its updates, stepping and drawing as _State does by default.
+    """
+    def __init__(self, fixed_step):
+        super(UpdatedState, self).__init__()
+        self.fixed_step = fixed_step
+        self.updates = []
+
+    def update(self, surface, keys, current_time, dt):
+        self.updates.append((current_time, dt))
+
+
+class FixedTimestepTest(unittest.TestCase):
+    def setUp(self):
+        pg.display.init()
+        pg.display.set_mode((1, 1))
+        self.control = tools.Control('test')
+        self.control.fixed_dt = 0.02
+        self.control.frame_dt = 0.026
+
+    def run_frames(self, state, frames):
+        self.control.setup_states({'state': state}, 'state')
+        for i in range(frames):
+            self.control.update()
+
+    def test_steps_and_interpolation(self):
+        state = SteppedState()
+        self.run_frames(state, 4)
+        # 26 ms frames carry 6 ms more into each, until one takes two steps
+        self.assertEqual([steps for steps, interpolation in state.draws], [1, 2, 3, 5])
+        for (steps, interpolation), expected in zip(state.draws, [0.3, 0.6, 0.9, 0.2]):
+            self.assertAlmostEqual(interpolation, expected)
+        self.assertEqual([dt for time, dt in state.steps], [0.02] * 5)
+        for (time, dt), expected in zip(state.steps, [20, 40, 60, 80, 100]):
+            self.assertAlmostEqual(time, expected)
+
+    def test_at_most_max_steps(self):
+        self.control.frame_dt = 1.0
+        state = SteppedState()
+        self.run_frames(state, 1)
+        self.assertEqual(len(state.steps), self.control.max_steps)
+        self.assertLess(self.control.accumulator, self.control.fixed_dt)
+        self.assertAlmostEqual(self.control.current_time, 100)
+
+    def test_default_draw_updates_once_per_frame(self):
+        state = UpdatedState(fixed_step=True)
+        self.run_frames(state, 4)
+        # the frame with two steps is one update over both
+        self.assertEqual(len(state.updates), 4)
+        for (time, dt), (expected_time, expected_dt) in zip(
+                state.updates, [(20, 0.02), (40, 0.02), (60, 0.02), (100, 0.04)]):
+            self.assertAlmostEqual(time, expected_time)
+            self.assertAlmostEqual(dt, expected_dt)
+
+    def test_variable_step_states(self):
+        state = UpdatedState(fixed_step=False)
+        self.run_frames(state, 3)
+        for (time, dt), expected_time in zip(state.updates, [26, 52, 78]):
+            self.assertAlmostEqual(time, expected_time)
+            self.assertAlmostEqual(dt, 0.026)
+
+
+if __name__ == '__main__':
+    unittest.main()